@@ -2,7 +2,7 @@
 set -euo pipefail
 
 # create-github-release.sh
-# Create a GitHub release with all template zip files
+# Create a GitHub release with all template zip files, layer archives and the layer manifest
 # Usage: create-github-release.sh <version>
 
 if [[ $# -ne 1 ]]; then
@@ -42,5 +42,7 @@ gh release create "$VERSION" \
   .genreleases/spec-kit-template-codebuddy-ps-"$VERSION".zip \
   .genreleases/spec-kit-template-q-sh-"$VERSION".zip \
   .genreleases/spec-kit-template-q-ps-"$VERSION".zip \
+  .genreleases/spec-kit-layer-*-"$VERSION".zip \
+  .genreleases/spec-kit-layers-"$VERSION".json \
   --title "Spec Kit Templates - $VERSION_NO_V" \
   --notes-file release_notes.md
\ No newline at end of file
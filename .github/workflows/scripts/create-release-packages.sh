@@ -8,6 +8,12 @@ set -euo pipefail
 #   Optionally set AGENTS and/or SCRIPTS env vars to limit what gets built.
 #     AGENTS  : space or comma separated subset of: claude gemini copilot cursor-agent qwen opencode windsurf codex (default: all)
 #     SCRIPTS : space or comma separated subset of: sh ps (default: both)
+#   Besides the full per-agent archives, the script emits layered assets:
+#     spec-kit-layer-base-<script>-<version>.zip          shared .specify/ payload
+#     spec-kit-layer-<agent>-<script>-<version>.zip       agent-only overlay
+#     spec-kit-layers-<version>.json                      manifest with sha256 digests
+#   Layers are built reproducibly (sorted entries, fixed mtimes) so an unchanged
+#   base keeps its digest across releases and stays cached on the CLI side.
 #   Examples:
 #     AGENTS=claude SCRIPTS=sh $0 v0.2.0
 #     AGENTS="copilot,gemini" $0 v0.2.0
@@ -37,6 +43,7 @@ rewrite_paths() {
     -e 's@(/?)templates/@.specify/templates/@g'
 }
 
+# Keep in sync with src/specify_cli/agents.py (render_command, COMMAND_FORMATS)
 generate_commands() {
   local agent=$1 ext=$2 arg_format=$3 output_dir=$4 script_variant=$5
   mkdir -p "$output_dir"
@@ -130,7 +137,9 @@ build_variant() {
     esac
   fi
   
-  [[ -d templates ]] && { mkdir -p "$SPEC_DIR/templates"; find templates -type f -not -path "templates/commands/*" -not -name "vscode-settings.json" -exec cp --parents {} "$SPEC_DIR"/ \; ; echo "Copied templates -> .specify/templates"; }
+  # Command templates are shipped as well: `specify-ru agents add|switch` renders them locally
+  # (vscode-settings.json included, for copilot's .vscode/settings.json)
+  [[ -d templates ]] && { mkdir -p "$SPEC_DIR/templates"; find templates -type f -exec cp --parents {} "$SPEC_DIR"/ \; ; echo "Copied templates -> .specify/templates"; }
   
   # NOTE: We substitute {ARGS} internally. Outward tokens differ intentionally:
   #   * Markdown/prompt (claude, copilot, cursor-agent, opencode): $ARGUMENTS
@@ -189,6 +198,57 @@ build_variant() {
   echo "Created $GENRELEASES_DIR/spec-kit-template-${agent}-${script}-${NEW_VERSION}.zip"
 }
 
+# Fixed timestamp for layer entries so identical content yields identical archives
+LAYER_EPOCH="198001010000"
+
+deterministic_zip() {
+  # deterministic_zip <src_dir> <out_zip> [find args...]
+  local src=$1 out=$2; shift 2
+  local abs_out
+  abs_out="$(cd "$(dirname "$out")" && pwd)/$(basename "$out")"
+  rm -f "$abs_out"
+  (
+    cd "$src"
+    find . \( "$@" \) -exec env TZ=UTC touch -h -t "$LAYER_EPOCH" {} +
+    find . \( "$@" \) -print | sed 's@^\./@@' | grep -v '^\.$' | LC_ALL=C sort | TZ=UTC zip -X -q -@ "$abs_out"
+  )
+}
+
+layer_entry() {
+  # layer_entry <zip_path> -> {"name":..., "sha256":..., "size":...}
+  local path=$1
+  local digest size
+  digest=$(sha256sum "$path" | awk '{print $1}')
+  size=$(stat -c %s "$path")
+  printf '{"name":"%s","sha256":"%s","size":%s}' "$(basename "$path")" "$digest" "$size"
+}
+
+build_layers() {
+  local manifest="$GENRELEASES_DIR/spec-kit-layers-${NEW_VERSION}.json"
+  local base_json="" overlay_json="" script agent
+  for script in "${SCRIPT_LIST[@]}"; do
+    # .specify/ is identical for every agent of a script type, take the first one
+    local src="$GENRELEASES_DIR/sdd-${AGENT_LIST[0]}-package-${script}"
+    local base_zip="$GENRELEASES_DIR/spec-kit-layer-base-${script}-${NEW_VERSION}.zip"
+    deterministic_zip "$src" "$base_zip" -path ./.specify -o -path './.specify/*'
+    echo "Created $base_zip"
+    base_json+="${base_json:+,}\"$script\":$(layer_entry "$base_zip")"
+  done
+  for agent in "${AGENT_LIST[@]}"; do
+    local per_script=""
+    for script in "${SCRIPT_LIST[@]}"; do
+      local src="$GENRELEASES_DIR/sdd-${agent}-package-${script}"
+      local overlay_zip="$GENRELEASES_DIR/spec-kit-layer-${agent}-${script}-${NEW_VERSION}.zip"
+      deterministic_zip "$src" "$overlay_zip" -not -path ./.specify -not -path './.specify/*'
+      echo "Created $overlay_zip"
+      per_script+="${per_script:+,}\"$script\":$(layer_entry "$overlay_zip")"
+    done
+    overlay_json+="${overlay_json:+,}\"$agent\":{$per_script}"
+  done
+  printf '{"schema":1,"version":"%s","base":{%s},"overlays":{%s}}\n' "$NEW_VERSION" "$base_json" "$overlay_json" > "$manifest"
+  echo "Created $manifest"
+}
+
 # Determine agent list
 ALL_AGENTS=(claude gemini copilot cursor-agent qwen opencode windsurf codex kilocode auggie roo codebuddy q)
 ALL_SCRIPTS=(sh ps)
@@ -235,5 +295,8 @@ for agent in "${AGENT_LIST[@]}"; do
   done
 done
 
+build_layers
+
 echo "Archives in $GENRELEASES_DIR:"
 ls -1 "$GENRELEASES_DIR"/spec-kit-template-*-"${NEW_VERSION}".zip
+ls -1 "$GENRELEASES_DIR"/spec-kit-layer-*-"${NEW_VERSION}".zip "$GENRELEASES_DIR"/spec-kit-layers-"${NEW_VERSION}".json
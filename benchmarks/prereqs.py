@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Сравнение задержки проверки предпосылок: scripts/bash/check-prerequisites.sh
+против `specify-ru prereqs` (отдельный процесс) и prereqs.resolve (в процессе).
+
+Запуск из корня репозитория:
+
+    python benchmarks/prereqs.py            # временный репозиторий-фикстура
+    python benchmarks/prereqs.py --repo .   # существующий проект на фичевой ветке
+    python benchmarks/prereqs.py -n 50 --flags="--json --require-tasks --include-tasks"
+
+Перед замером выводы bash- и Python-версий сравниваются побайтно.
+"""
+
+import argparse
+import os
+import shlex
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from specify_cli.prereqs import PrerequisiteError, resolve  # noqa: E402
+
+BASH_SCRIPT = ROOT / "scripts" / "bash" / "check-prerequisites.sh"
+CLI = [sys.executable, "-c", "import specify_cli; specify_cli.main()", "prereqs"]
+
+
+def make_fixture(base: Path) -> Path:
+    """Git-репозиторий с фичевой веткой и полным набором документов."""
+    repo = base / "repo"
+    feature = repo / "specs" / "001-demo"
+    (feature / "contracts").mkdir(parents=True)
+    (repo / ".specify").mkdir()
+    for name in ("spec.md", "plan.md", "tasks.md", "research.md", "data-model.md", "quickstart.md"):
+        (feature / name).write_text(f"# {name}\n", encoding="utf-8")
+    (feature / "contracts" / "api.yaml").write_text("openapi: 3.0.0\n", encoding="utf-8")
+
+    git = ["git", "-c", "user.name=bench", "-c", "user.email=bench@example.com"]
+    for args in (["init", "-q"], ["checkout", "-q", "-b", "001-demo"], ["add", "-A"], ["commit", "-q", "-m", "fixture"]):
+        subprocess.run(git + args, cwd=repo, check=True)
+    return repo
+
+
+def run(cmd: list[str], cwd: Path) -> tuple[int, str, str]:
+    env = {**os.environ, "PYTHONPATH": str(ROOT / "src"), "SPECIFY_NO_NATIVE": "1"}
+    result = subprocess.run(cmd, cwd=cwd, capture_output=True, text=True, env=env)
+    return result.returncode, result.stdout, result.stderr
+
+
+def timed(fn, iterations: int) -> list[float]:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def in_process(repo: Path, flags: list[str]) -> None:
+    try:
+        resolve(
+            repo,
+            require_tasks="--require-tasks" in flags,
+            include_tasks="--include-tasks" in flags,
+            paths_only="--paths-only" in flags,
+        )
+    except PrerequisiteError:
+        pass
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repo", type=Path, help="Проект для замера (по умолчанию — временная фикстура)")
+    parser.add_argument("-n", "--iterations", type=int, default=20, help="Число повторов каждого варианта")
+    parser.add_argument("--flags", default="--json", help="Флаги check-prerequisites (по умолчанию --json)")
+    args = parser.parse_args()
+
+    if not shutil.which("bash"):
+        print("bash не найден", file=sys.stderr)
+        return 1
+
+    flags = shlex.split(args.flags)
+    tmp = tempfile.TemporaryDirectory() if args.repo is None else None
+    repo = args.repo.resolve() if args.repo else make_fixture(Path(tmp.name))
+
+    try:
+        bash_out = run(["bash", str(BASH_SCRIPT), *flags], repo)
+        cli_out = run([*CLI, *flags], repo)
+        if bash_out != cli_out:
+            print("Вывод различается:", file=sys.stderr)
+            print(f"  bash:       {bash_out!r}", file=sys.stderr)
+            print(f"  specify-ru: {cli_out!r}", file=sys.stderr)
+            return 1
+        print(f"Вывод совпадает ({' '.join(flags)}): {bash_out[1].strip() or bash_out[2].strip()}")
+
+        variants = {
+            "bash check-prerequisites.sh": lambda: run(["bash", str(BASH_SCRIPT), *flags], repo),
+            "specify-ru prereqs (процесс)": lambda: run([*CLI, *flags], repo),
+            "prereqs.resolve (в процессе)": lambda: in_process(repo, flags),
+        }
+        print(f"\n{'вариант':<32}{'медиана, мс':>14}{'мин, мс':>10}{'макс, мс':>10}")
+        for name, fn in variants.items():
+            samples = timed(fn, args.iterations)
+            print(f"{name:<32}{statistics.median(samples):>14.2f}{min(samples):>10.2f}{max(samples):>10.2f}")
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -26,7 +26,16 @@ get_current_branch() {
         return
     fi
     
-    # Для репозиториев без git ищем последний каталог фичи
+    # Для репозиториев без git ищем последний каталог фичи.
+    # specify-ru отвечает по индексу .specify/cache/index.json без обхода specs/.
+    if [[ -z "${SPECIFY_NO_NATIVE:-}" ]] && command -v specify-ru >/dev/null 2>&1; then
+        local native_branch
+        if native_branch=$(cd "$(get_repo_root)" && specify-ru features current 2>/dev/null) && [[ -n "$native_branch" ]]; then
+            echo "$native_branch"
+            return
+        fi
+    fi
+
     local repo_root=$(get_repo_root)
     local specs_dir="$repo_root/specs"
     
@@ -49,6 +49,20 @@ fi
 
 cd "$REPO_ROOT"
 
+# Если установлен specify-ru, делегируем ему: следующий номер берётся из кэшируемого
+# индекса .specify/cache/index.json без обхода всех каталогов specs/.
+# SPECIFY_NO_NATIVE=1 принудительно включает bash-реализацию.
+if [[ -z "${SPECIFY_NO_NATIVE:-}" ]] && command -v specify-ru >/dev/null 2>&1; then
+    NATIVE_ARGS=(features new)
+    $JSON_MODE && NATIVE_ARGS+=(--json)
+    NATIVE_STATUS=0
+    specify-ru "${NATIVE_ARGS[@]}" "$FEATURE_DESCRIPTION" || NATIVE_STATUS=$?
+    # Код 2 — старая версия CLI без подкоманды; в этом случае продолжаем в bash
+    if [[ $NATIVE_STATUS -ne 2 ]]; then
+        exit $NATIVE_STATUS
+    fi
+fi
+
 SPECS_DIR="$REPO_ROOT/specs"
 mkdir -p "$SPECS_DIR"
 
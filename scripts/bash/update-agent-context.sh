@@ -44,6 +44,18 @@ set -e
 set -u
 set -o pipefail
 
+# Если установлен specify-ru с нативной командой update-context, делегируем ей:
+# она разбирает план один раз и обновляет все файлы за один проход.
+# SPECIFY_NO_NATIVE=1 принудительно включает bash-реализацию.
+if [[ "${BASH_SOURCE[0]}" == "${0}" && -z "${SPECIFY_NO_NATIVE:-}" ]] && command -v specify-ru >/dev/null 2>&1; then
+    native_status=0
+    specify-ru update-context "$@" || native_status=$?
+    # Код 2 — старая версия CLI без подкоманды; в этом случае продолжаем в bash
+    if [[ $native_status -ne 2 ]]; then
+        exit $native_status
+    fi
+fi
+
 #==============================================================================
 # Конфигурация и глобальные переменные
 #==============================================================================
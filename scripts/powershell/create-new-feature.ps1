@@ -56,6 +56,16 @@ try {
 
 Set-Location $repoRoot
 
+# Делегируем specify-ru features new, если CLI доступен: следующий номер берётся из индекса
+# .specify/cache/index.json без обхода specs/ (SPECIFY_NO_NATIVE=1 отключает делегирование)
+if (-not $env:SPECIFY_NO_NATIVE -and (Get-Command specify-ru -ErrorAction SilentlyContinue)) {
+    $nativeArgs = @('features', 'new')
+    if ($Json) { $nativeArgs += '--json' }
+    & specify-ru @nativeArgs $featureDesc
+    # Код 2 — старая версия CLI без подкоманды; в этом случае продолжаем в PowerShell
+    if ($LASTEXITCODE -ne 2) { exit $LASTEXITCODE }
+}
+
 $specsDir = Join-Path $repoRoot 'specs'
 New-Item -ItemType Directory -Path $specsDir -Force | Out-Null
 
@@ -417,6 +417,15 @@ function Print-Summary {
 }
 
 function Main {
+    # Делегируем нативной команде specify-ru update-context, если она доступна
+    # (SPECIFY_NO_NATIVE=1 принудительно включает PowerShell-реализацию)
+    if (-not $env:SPECIFY_NO_NATIVE -and (Get-Command specify-ru -ErrorAction SilentlyContinue)) {
+        $nativeArgs = @('update-context')
+        if ($AgentType) { $nativeArgs += $AgentType }
+        & specify-ru @nativeArgs
+        # Код 2 — старая версия CLI без подкоманды; в этом случае продолжаем в PowerShell
+        if ($LASTEXITCODE -ne 2) { exit $LASTEXITCODE }
+    }
     Validate-Environment
     Write-Info "=== Обновление контекстов агентов для фичи $CURRENT_BRANCH ==="
     if (-not (Parse-PlanData -PlanFile $NEW_PLAN)) { Write-Err 'Не удалось разобрать данные плана'; exit 1 }
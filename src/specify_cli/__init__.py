@@ -27,33 +27,67 @@ Specify-ru CLI — инструмент для подготовки проект
 import os
 import subprocess
 import sys
-import zipfile
 import tempfile
 import shutil
 import shlex
 import json
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import TYPE_CHECKING, Optional, Tuple
 
 import typer
-import httpx
 from rich.console import Console
 from rich.panel import Panel
 from rich.progress import Progress, SpinnerColumn, TextColumn
+from rich.markup import escape
 from rich.text import Text
 from rich.live import Live
 from rich.align import Align
 from rich.table import Table
 from rich.tree import Tree
 from typer.core import TyperGroup
+from platformdirs import user_cache_dir
 
 # For cross-platform keyboard input
 import readchar
-import ssl
-import truststore
 
-ssl_context = truststore.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
-client = httpx.Client(verify=ssl_context)
+if TYPE_CHECKING:
+    import httpx
+
+# httpx and truststore are imported on first network use: script-facing commands
+# (prereqs, features, update-context) never touch the network and start faster without them
+_ssl_context = None
+
+
+def _default_ssl_context():
+    """Системный SSL-контекст (truststore), создаётся при первом обращении."""
+    global _ssl_context
+    if _ssl_context is None:
+        import ssl
+        import truststore
+
+        _ssl_context = truststore.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    return _ssl_context
+
+
+def _new_http_client(verify: bool = True) -> "httpx.Client":
+    """HTTP-клиент с системным хранилищем сертификатов (или без проверки TLS)."""
+    import httpx
+
+    return httpx.Client(verify=_default_ssl_context() if verify else False)
+
+
+def __getattr__(name: str):
+    # Backward compatibility for code that used the former module-level ssl_context/client
+    if name == "ssl_context":
+        return _default_ssl_context()
+    if name == "client":
+        value = _new_http_client()
+        globals()["client"] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 def _github_token(cli_token: str | None = None) -> str | None:
     """Return sanitized GitHub token (cli arg takes precedence) or None."""
@@ -160,6 +194,11 @@ BANNER = """
 """
 
 TAGLINE = "GitHub Spec Kit — набор инструментов для разработки, управляемой спецификациями"
+
+# Layered release assets: shared .specify/ base per script type + per-agent overlay
+LAYER_MANIFEST_PREFIX = "spec-kit-layers-"
+LAYER_SCHEMA_VERSION = 1
+
 class StepTracker:
     """Отслеживает и отображает иерархию шагов без эмодзи в стиле дерева Claude Code.
     Поддерживает автообновление через привязанный коллбэк.
@@ -169,6 +208,7 @@ class StepTracker:
         self.steps = []  # list of dicts: {key, label, status, detail}
         self.status_order = {"pending": 0, "running": 1, "done": 2, "error": 3, "skipped": 4}
         self._refresh_cb = None  # callable to trigger UI refresh
+        self._mark = time.perf_counter()  # last status change; start of steps reported without start()
 
     def attach_refresh(self, cb):
         self._refresh_cb = cb
@@ -190,16 +230,30 @@ class StepTracker:
     def skip(self, key: str, detail: str = ""):
         self._update(key, status="skipped", detail=detail)
 
+    def durations(self) -> dict[str, float]:
+        """Длительность завершённых шагов в секундах (для истории запусков)."""
+        return {s["key"]: s["elapsed"] for s in self.steps if "elapsed" in s}
+
+    def _timing(self, step: dict, status: str) -> None:
+        now = time.perf_counter()
+        if status == "running":
+            step["started"] = now
+        elif status in ("done", "error", "skipped"):
+            step["elapsed"] = now - step.get("started", self._mark)
+        self._mark = now
+
     def _update(self, key: str, status: str, detail: str):
         for s in self.steps:
             if s["key"] == key:
                 s["status"] = status
                 if detail:
                     s["detail"] = detail
+                self._timing(s, status)
                 self._maybe_refresh()
                 return
 
         self.steps.append({"key": key, "label": key, "status": status, "detail": detail})
+        self._timing(self.steps[-1], status)
         self._maybe_refresh()
 
     def _maybe_refresh(self):
@@ -460,319 +514,179 @@ def init_git_repo(project_path: Path, quiet: bool = False) -> Tuple[bool, Option
     Returns:
         Кортеж вида (успешно: bool, сообщение об ошибке: Optional[str])
     """
-    try:
-        original_cwd = Path.cwd()
-        os.chdir(project_path)
-        if not quiet:
-            console.print("[cyan]Инициализируем git-репозиторий...[/cyan]")
-        subprocess.run(["git", "init"], check=True, capture_output=True, text=True)
-        subprocess.run(["git", "add", "."], check=True, capture_output=True, text=True)
-        subprocess.run(["git", "commit", "-m", "Initial commit from Specify template"], check=True, capture_output=True, text=True)
-        if not quiet:
+    from .api import init_git
+
+    if not quiet:
+        console.print("[cyan]Инициализируем git-репозиторий...[/cyan]")
+    success, error_msg = init_git(project_path)
+    if not quiet:
+        if success:
             console.print("[green]✓[/green] Git-репозиторий создан")
-        return True, None
+        else:
+            console.print(f"[red]Ошибка при инициализации git-репозитория:[/red] {error_msg}")
+    return success, error_msg
+
+def _layer_cache_dir() -> Path:
+    """Каталог кэша слоёв шаблона, адресуемых по sha256 содержимого."""
+    return Path(user_cache_dir("specify-ru")) / "layers"
+
+# Labels for steps that api.init_project reports but init does not pre-register
+_STEP_LABELS = {
+    "download": "Скачать шаблон",
+    "flatten": "Убрать лишний уровень вложенности",
+    "fetch": "Получить релиз",
+    "extract": "Распаковать шаблон",
+    "git": "Инициализировать git",
+    "chmod": "Назначить права на выполнение рекурсивно",
+    "cleanup": "Удалить временный архив",
+}
 
-    except subprocess.CalledProcessError as e:
-        error_msg = f"Command: {' '.join(e.cmd)}\nExit code: {e.returncode}"
-        if e.stderr:
-            error_msg += f"\nОшибка: {e.stderr.strip()}"
-        elif e.stdout:
-            error_msg += f"\nВывод: {e.stdout.strip()}"
-        
-        if not quiet:
-            console.print(f"[red]Ошибка при инициализации git-репозитория:[/red] {e}")
-        return False, error_msg
-    finally:
-        os.chdir(original_cwd)
+def _tracker_progress(tracker: StepTracker):
+    """Коллбэк progress для specify_cli.api, отображающий шаги в StepTracker."""
+    def report(step: str, status: str, detail: str = "") -> None:
+        tracker.add(step, _STEP_LABELS.get(step, step))
+        getattr(tracker, status)(step, detail)
+    return report
+
+# Tracker steps that only echo choices made before the run; they carry no timing
+_UNTIMED_STEPS = ("precheck", "ai-select", "script-select")
+
+def _record_run(command: str, tracker: StepTracker, started: float, exit_code: int, **fields) -> None:
+    """Добавить запуск в локальную историю для `specify-ru stats`; ошибки записи не прерывают команду."""
+    from . import history
+
+    if not history.history_enabled():
+        return
+    phases = {key: seconds for key, seconds in tracker.durations().items() if key not in _UNTIMED_STEPS}
+    try:
+        history.append_run(history.make_record(command, started=started, exit_code=exit_code, phases=phases, **fields))
+    except OSError:
+        pass
+
+@contextmanager
+def _download_progress(enabled: bool):
+    """Индикатор скачивания rich; отдаёт коллбэк on_chunk(записано, всего) или None."""
+    if not enabled:
+        yield None
+        return
+    with Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
+        console=console,
+    ) as progress:
+        task = progress.add_task("Скачивание...", total=None)
+        yield lambda written, total: progress.update(task, completed=written, total=total)
+
+def download_template_from_github(ai_assistant: str, download_dir: Path, *, script_type: str = "sh", verbose: bool = True, show_progress: bool = True, client: "httpx.Client" = None, debug: bool = False, github_token: str = None) -> Tuple[Path, dict]:
+    from . import api
 
-def download_template_from_github(ai_assistant: str, download_dir: Path, *, script_type: str = "sh", verbose: bool = True, show_progress: bool = True, client: httpx.Client = None, debug: bool = False, github_token: str = None) -> Tuple[Path, dict]:
-    repo_owner = "zemlyanin7"
-    repo_name = "spec-kit-ru"
     if client is None:
-        client = httpx.Client(verify=ssl_context)
+        client = _new_http_client()
 
     if verbose:
         console.print("[cyan]Получаем информацию о последнем релизе...[/cyan]")
-    api_url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/releases/latest"
-
     try:
-        response = client.get(
-            api_url,
-            timeout=30,
-            follow_redirects=True,
-            headers=_github_auth_headers(github_token),
-        )
-        status = response.status_code
-        if status != 200:
-            msg = f"GitHub API returned {status} for {api_url}"
-            if debug:
-                msg += f"\nResponse headers: {response.headers}\nBody (truncated 500): {response.text[:500]}"
-            raise RuntimeError(msg)
-        try:
-            release_data = response.json()
-        except ValueError as je:
-            raise RuntimeError(f"Не удалось разобрать JSON релиза: {je}\nRaw (truncated 400): {response.text[:400]}")
-    except Exception as e:
+        with _download_progress(show_progress) as on_chunk:
+            zip_path, meta = api.download_template(ai_assistant, script_type, download_dir, client=client, debug=debug, github_token=github_token, on_chunk=on_chunk)
+    except api.TemplateNotFoundError as e:
+        console.print(f"[red]Подходящий файл релиза не найден[/red] для [bold]{ai_assistant}[/bold] (ожидался шаблон: [bold]{e.pattern}[/bold])")
+        console.print(Panel("\n".join(e.assets) or "(нет артефактов)", title="Доступные артефакты", border_style="yellow"))
+        raise typer.Exit(1)
+    except api.ReleaseError as e:
         console.print(f"[red]Ошибка при получении информации о релизе[/red]")
         console.print(Panel(str(e), title="Ошибка запроса", border_style="red"))
         raise typer.Exit(1)
-
-    assets = release_data.get("assets", [])
-    pattern = f"spec-kit-template-{ai_assistant}-{script_type}"
-    matching_assets = [
-        asset for asset in assets
-        if pattern in asset["name"] and asset["name"].endswith(".zip")
-    ]
-
-    asset = matching_assets[0] if matching_assets else None
-
-    if asset is None:
-        console.print(f"[red]Подходящий файл релиза не найден[/red] для [bold]{ai_assistant}[/bold] (ожидался шаблон: [bold]{pattern}[/bold])")
-        asset_names = [a.get('name', '?') for a in assets]
-        console.print(Panel("\n".join(asset_names) or "(нет артефактов)", title="Доступные артефакты", border_style="yellow"))
-        raise typer.Exit(1)
-
-    download_url = asset["browser_download_url"]
-    filename = asset["name"]
-    file_size = asset["size"]
-
-    if verbose:
-        console.print(f"[cyan]Найден шаблон:[/cyan] {filename}")
-        console.print(f"[cyan]Размер:[/cyan] {file_size:,} байт")
-        console.print(f"[cyan]Релиз:[/cyan] {release_data['tag_name']}")
-
-    zip_path = download_dir / filename
-    if verbose:
-        console.print(f"[cyan]Скачиваем шаблон...[/cyan]")
-
-    try:
-        with client.stream(
-            "GET",
-            download_url,
-            timeout=60,
-            follow_redirects=True,
-            headers=_github_auth_headers(github_token),
-        ) as response:
-            if response.status_code != 200:
-                body_sample = response.text[:400]
-                raise RuntimeError(f"Скачивание завершилось с кодом {response.status_code}\nHeaders: {response.headers}\nBody (truncated): {body_sample}")
-            total_size = int(response.headers.get('content-length', 0))
-            with open(zip_path, 'wb') as f:
-                if total_size == 0:
-                    for chunk in response.iter_bytes(chunk_size=8192):
-                        f.write(chunk)
-                else:
-                    if show_progress:
-                        with Progress(
-                            SpinnerColumn(),
-                            TextColumn("[progress.description]{task.description}"),
-                            TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
-                            console=console,
-                        ) as progress:
-                            task = progress.add_task("Скачивание...", total=total_size)
-                            downloaded = 0
-                            for chunk in response.iter_bytes(chunk_size=8192):
-                                f.write(chunk)
-                                downloaded += len(chunk)
-                                progress.update(task, completed=downloaded)
-                    else:
-                        for chunk in response.iter_bytes(chunk_size=8192):
-                            f.write(chunk)
-    except Exception as e:
+    except api.SpecifyError as e:
         console.print(f"[red]Ошибка при скачивании шаблона[/red]")
-        detail = str(e)
-        if zip_path.exists():
-            zip_path.unlink()
-        console.print(Panel(detail, title="Ошибка скачивания", border_style="red"))
+        console.print(Panel(str(e), title="Ошибка скачивания", border_style="red"))
         raise typer.Exit(1)
+
+    if debug and meta.get("layers_error"):
+        console.print(f"[yellow]Манифест слоёв недоступен, используем полный архив:[/yellow] {meta['layers_error']}")
     if verbose:
-        console.print(f"Скачано: {filename}")
-    metadata = {
-        "filename": filename,
-        "size": file_size,
-        "release": release_data["tag_name"],
-        "asset_url": download_url
-    }
-    return zip_path, metadata
+        console.print(f"[cyan]Найден шаблон:[/cyan] {meta['filename']}")
+        console.print(f"[cyan]Размер:[/cyan] {meta['size']:,} байт")
+        console.print(f"[cyan]Релиз:[/cyan] {meta['release']}")
+        if meta.get("cached"):
+            console.print(f"Слои: {meta['cache_hits']} из {len(meta['layers'])} из кэша")
+        else:
+            console.print(f"Скачано: {meta['filename']}")
+    return zip_path, meta
 
-def download_and_extract_template(project_path: Path, ai_assistant: str, script_type: str, is_current_dir: bool = False, *, verbose: bool = True, tracker: StepTracker | None = None, client: httpx.Client = None, debug: bool = False, github_token: str = None) -> Path:
+def download_and_extract_template(project_path: Path, ai_assistant: str, script_type: str, is_current_dir: bool = False, *, verbose: bool = True, tracker: StepTracker | None = None, client: "httpx.Client" = None, debug: bool = False, github_token: str = None) -> Path:
     """Скачать последний релиз и распаковать его для создания проекта.
     Возвращает project_path. Если передан tracker, использует шаги fetch, download, extract, cleanup.
     """
-    current_dir = Path.cwd()
+    from . import api
 
     if tracker:
         tracker.start("fetch", "запрос к GitHub API")
-    try:
-        zip_path, meta = download_template_from_github(
-            ai_assistant,
-            current_dir,
-            script_type=script_type,
-            verbose=verbose and tracker is None,
-            show_progress=(tracker is None),
-            client=client,
-            debug=debug,
-            github_token=github_token
-        )
+    with tempfile.TemporaryDirectory(prefix="specify-ru-") as download_dir:
+        try:
+            zip_path, meta = download_template_from_github(
+                ai_assistant,
+                Path(download_dir),
+                script_type=script_type,
+                verbose=verbose and tracker is None,
+                show_progress=(tracker is None),
+                client=client,
+                debug=debug,
+                github_token=github_token
+            )
+        except Exception as e:
+            if tracker:
+                tracker.error("fetch", str(e))
+            raise
+        layers = meta.get("layers") or [zip_path]
         if tracker:
             tracker.complete("fetch", f"релиз {meta['release']} ({meta['size']:,} байт)")
-            tracker.add("download", "Скачать шаблон")
-            tracker.complete("download", meta['filename'])
-    except Exception as e:
-        if tracker:
-            tracker.error("fetch", str(e))
+            report = _tracker_progress(tracker)
+            if meta.get("cached"):
+                report("download", "complete", f"{meta['filename']} (из кэша: {meta['cache_hits']} из {len(layers)})")
+            else:
+                report("download", "complete", meta["filename"])
+            tracker.add("extract", "Распаковать шаблон")
+            tracker.start("extract")
+        elif verbose:
+            console.print("Распаковываем шаблон...")
+            report = lambda step, status, detail="": detail and console.print(f"[cyan]{detail}[/cyan]")
         else:
-            if verbose:
-                console.print(f"[red]Ошибка при скачивании шаблона:[/red] {e}")
-        raise
-
-    if tracker:
-        tracker.add("extract", "Распаковать шаблон")
-        tracker.start("extract")
-    elif verbose:
-        console.print("Распаковываем шаблон...")
+            report = None
 
-    try:
-        if not is_current_dir:
-            project_path.mkdir(parents=True)
-
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            zip_contents = zip_ref.namelist()
+        try:
+            if not is_current_dir:
+                project_path.mkdir(parents=True)
+            api.extract_template(layers, project_path, merge=is_current_dir, progress=report)
+        except (api.ExtractError, OSError) as e:
             if tracker:
-                tracker.start("zip-list")
-                tracker.complete("zip-list", f"{len(zip_contents)} элементов")
+                tracker.error("extract", str(e))
             elif verbose:
-                console.print(f"[cyan]ZIP-архив содержит {len(zip_contents)} элементов[/cyan]")
-
-            if is_current_dir:
-                with tempfile.TemporaryDirectory() as temp_dir:
-                    temp_path = Path(temp_dir)
-                    zip_ref.extractall(temp_path)
-
-                    extracted_items = list(temp_path.iterdir())
-                    if tracker:
-                        tracker.start("extracted-summary")
-                        tracker.complete("extracted-summary", f"временный каталог: {len(extracted_items)} элементов")
-                    elif verbose:
-                        console.print(f"[cyan]Распаковано {len(extracted_items)} элементов во временный каталог[/cyan]")
-
-                    source_dir = temp_path
-                    if len(extracted_items) == 1 and extracted_items[0].is_dir():
-                        source_dir = extracted_items[0]
-                        if tracker:
-                            tracker.add("flatten", "Убрать лишний уровень вложенности")
-                            tracker.complete("flatten")
-                        elif verbose:
-                            console.print(f"[cyan]Обнаружена вложенная структура каталогов[/cyan]")
-
-                    for item in source_dir.iterdir():
-                        dest_path = project_path / item.name
-                        if item.is_dir():
-                            if dest_path.exists():
-                                if verbose and not tracker:
-                                    console.print(f"[yellow]Объединяем каталог:[/yellow] {item.name}")
-                                for sub_item in item.rglob('*'):
-                                    if sub_item.is_file():
-                                        rel_path = sub_item.relative_to(item)
-                                        dest_file = dest_path / rel_path
-                                        dest_file.parent.mkdir(parents=True, exist_ok=True)
-                                        shutil.copy2(sub_item, dest_file)
-                            else:
-                                shutil.copytree(item, dest_path)
-                        else:
-                            if dest_path.exists() and verbose and not tracker:
-                                console.print(f"[yellow]Перезаписываем файл:[/yellow] {item.name}")
-                            shutil.copy2(item, dest_path)
-                    if verbose and not tracker:
-                        console.print(f"[cyan]Файлы шаблона объединены с текущим каталогом[/cyan]")
-            else:
-                zip_ref.extractall(project_path)
-
-                extracted_items = list(project_path.iterdir())
-                if tracker:
-                    tracker.start("extracted-summary")
-                    tracker.complete("extracted-summary", f"{len(extracted_items)} элементов верхнего уровня")
-                elif verbose:
-                    console.print(f"[cyan]Распаковано {len(extracted_items)} элементов в {project_path}:[/cyan]")
-                    for item in extracted_items:
-                        console.print(f"  - {item.name} ({'каталог' if item.is_dir() else 'файл'})")
-
-                if len(extracted_items) == 1 and extracted_items[0].is_dir():
-                    nested_dir = extracted_items[0]
-                    temp_move_dir = project_path.parent / f"{project_path.name}_temp"
-
-                    shutil.move(str(nested_dir), str(temp_move_dir))
-
-                    project_path.rmdir()
-
-                    shutil.move(str(temp_move_dir), str(project_path))
-                    if tracker:
-                        tracker.add("flatten", "Убрать лишний уровень вложенности")
-                        tracker.complete("flatten")
-                    elif verbose:
-                        console.print(f"[cyan]Убрана вложенная структура каталогов[/cyan]")
-
-    except Exception as e:
-        if tracker:
-            tracker.error("extract", str(e))
-        else:
-            if verbose:
                 console.print(f"[red]Ошибка при распаковке шаблона:[/red] {e}")
                 if debug:
                     console.print(Panel(str(e), title="Ошибка распаковки", border_style="red"))
-
-        if not is_current_dir and project_path.exists():
-            shutil.rmtree(project_path)
-        raise typer.Exit(1)
-    else:
+            if not is_current_dir and project_path.exists():
+                shutil.rmtree(project_path)
+            raise typer.Exit(1)
         if tracker:
             tracker.complete("extract")
-    finally:
-        if tracker:
-            tracker.add("cleanup", "Удалить временный архив")
-
-        if zip_path.exists():
-            zip_path.unlink()
-            if tracker:
-                tracker.complete("cleanup")
-            elif verbose:
-                console.print(f"Удалено: {zip_path.name}")
 
+    if tracker:
+        tracker.add("cleanup", "Удалить временный архив")
+        if meta.get("cached"):
+            tracker.skip("cleanup", "слои остаются в кэше")
+        else:
+            tracker.complete("cleanup")
     return project_path
 
 
 def ensure_executable_scripts(project_path: Path, tracker: StepTracker | None = None) -> None:
     """Убедиться, что POSIX-скрипты .sh в .specify/scripts рекурсивно имеют права на выполнение (на Windows пропускается)."""
-    if os.name == "nt":
-        return  # Windows: skip silently
-    scripts_root = project_path / ".specify" / "scripts"
-    if not scripts_root.is_dir():
-        return
-    failures: list[str] = []
-    updated = 0
-    for script in scripts_root.rglob("*.sh"):
-        try:
-            if script.is_symlink() or not script.is_file():
-                continue
-            try:
-                with script.open("rb") as f:
-                    if f.read(2) != b"#!":
-                        continue
-            except Exception:
-                continue
-            st = script.stat(); mode = st.st_mode
-            if mode & 0o111:
-                continue
-            new_mode = mode
-            if mode & 0o400: new_mode |= 0o100
-            if mode & 0o040: new_mode |= 0o010
-            if mode & 0o004: new_mode |= 0o001
-            if not (new_mode & 0o100):
-                new_mode |= 0o100
-            os.chmod(script, new_mode)
-            updated += 1
-        except Exception as e:
-            failures.append(f"{script.relative_to(scripts_root)}: {e}")
+    from .api import make_scripts_executable
+
+    if os.name == "nt" or not (project_path / ".specify" / "scripts").is_dir():
+        return  # Windows or no scripts: skip silently
+    updated, failures = make_scripts_executable(project_path)
     if tracker:
         detail = f"{updated} обновлено" + (f", {len(failures)} не удалось" if failures else "")
         tracker.add("chmod", "Назначить права на выполнение рекурсивно")
@@ -797,6 +711,10 @@ def init(
     skip_tls: bool = typer.Option(False, "--skip-tls", help="Отключить проверку SSL/TLS (не рекомендуется)"),
     debug: bool = typer.Option(False, "--debug", help="Показать расширенную диагностику для сетевых ошибок и ошибок распаковки"),
     github_token: str = typer.Option(None, "--github-token", help="Токен GitHub для API-запросов (или используйте переменные GH_TOKEN/GITHUB_TOKEN)"),
+    offline: bool = typer.Option(False, "--offline", help="Взять шаблон из пакета, импортированного командой bundle import, без обращения к сети (или SPECIFY_OFFLINE=1)"),
+    release: Optional[str] = typer.Option(None, "--release", help="Установить релиз с этим тегом (например, v0.1.0) по прямым URL артефактов, без запроса к GitHub API"),
+    locked: bool = typer.Option(False, "--locked", help="Установить ровно те архивы, что записаны в .specify/lock.json текущего каталога (из кэша или по их URL, без GitHub API); только вместе с --here"),
+    timeout: Optional[float] = typer.Option(None, "--timeout", min=0.1, help="Общий бюджет времени в секундах на сеть, распаковку, chmod и git; при превышении изменения откатываются (код выхода 124)"),
 ):
     """
     Инициализировать новый проект Specify на основе последнего шаблона.
@@ -821,6 +739,10 @@ def init(
         specify-ru init --here --ai codebuddy
         specify-ru init --here
         specify-ru init --here --force        # Пропустить подтверждение, если каталог не пуст
+        specify-ru init my-project --ai claude --offline   # Из импортированного пакета, без сети
+        specify-ru init my-project --ai claude --timeout 60  # Не дольше минуты, иначе откат
+        specify-ru init my-project --ai claude --release v0.1.0  # Закреплённый релиз, без API
+        specify-ru init --here --force --locked   # Повторить установку по .specify/lock.json (CI)
     """
 
     show_banner()
@@ -837,6 +759,17 @@ def init(
         console.print("[red]Ошибка:[/red] Укажите имя проекта, используйте '.' для текущего каталога или передайте флаг --here")
         raise typer.Exit(1)
 
+    if locked and not here:
+        # lock.json lives in the project it was written for; a new directory has none to read
+        console.print("[red]Ошибка:[/red] --locked читает .specify/lock.json существующего проекта: выполните в его каталоге specify-ru init --here --force --locked")
+        raise typer.Exit(1)
+    if locked and offline:
+        console.print("[red]Ошибка:[/red] --locked и --offline несовместимы: lock.json сам указывает архивы, которые берутся из кэша")
+        raise typer.Exit(1)
+    if release and offline:
+        console.print("[red]Ошибка:[/red] --release и --offline несовместимы: автономный пакет содержит один релиз")
+        raise typer.Exit(1)
+
     if here:
         project_name = Path.cwd().name
         project_path = Path.cwd()
@@ -880,11 +813,25 @@ def init(
 
     console.print(Panel("\n".join(setup_lines), border_style="cyan", padding=(1, 2)))
 
-    should_init_git = False
-    if not no_git:
-        should_init_git = check_tool("git")
-        if not should_init_git:
-            console.print("[yellow]Git не найден — инициализация репозитория будет пропущена[/yellow]")
+    if not no_git and not check_tool("git"):
+        console.print("[yellow]Git не найден — инициализация репозитория будет пропущена[/yellow]")
+
+    from . import api
+
+    lock = None
+    if locked:
+        try:
+            lock = api.read_lock(project_path)
+        except api.ReleaseError as e:
+            console.print(f"[red]Ошибка:[/red] {e}")
+            raise typer.Exit(1)
+        if lock is None:
+            console.print(f"[red]Ошибка:[/red] в {project_path} нет {api.LOCK_RELATIVE_PATH.as_posix()}; он создаётся при обычном init (или укажите --release)")
+            raise typer.Exit(1)
+        # The lock pins the agent and script as well as the release
+        ai_assistant = ai_assistant or lock.get("agent")
+        script_type = script_type or lock.get("script")
+        console.print(f"[cyan]lock.json:[/cyan] релиз {lock['release']}, {len(lock['assets'])} архив(а)")
 
     if ai_assistant:
         if ai_assistant not in AGENT_CONFIG:
@@ -934,10 +881,9 @@ def init(
     console.print(f"[cyan]Выбранный ИИ-агент:[/cyan] {selected_ai}")
     console.print(f"[cyan]Тип скриптов:[/cyan] {selected_script}")
 
+    started = time.time()
     tracker = StepTracker("Инициализация проекта Specify")
 
-    sys._specify_tracker_active = True
-
     tracker.add("precheck", "Проверить инструменты")
     tracker.complete("precheck", "готово")
     tracker.add("ai-select", "Выбрать ИИ-агента")
@@ -957,40 +903,46 @@ def init(
     ]:
         tracker.add(key, label)
 
-    # Track git error message outside Live context so it persists
-    git_error_message = None
-
     with Live(tracker.render(), console=console, refresh_per_second=8, transient=True) as live:
         tracker.attach_refresh(lambda: live.update(tracker.render()))
         try:
-            verify = not skip_tls
-            local_ssl_context = ssl_context if verify else False
-            local_client = httpx.Client(verify=local_ssl_context)
-
-            download_and_extract_template(project_path, selected_ai, selected_script, here, verbose=False, tracker=tracker, client=local_client, debug=debug, github_token=github_token)
-
-            ensure_executable_scripts(project_path, tracker=tracker)
-
-            if not no_git:
-                tracker.start("git")
-                if is_git_repo(project_path):
-                    tracker.complete("git", "обнаружен существующий репозиторий")
-                elif should_init_git:
-                    success, error_msg = init_git_repo(project_path, quiet=True)
-                    if success:
-                        tracker.complete("git", "инициализирован")
-                    else:
-                        tracker.error("git", "ошибка инициализации")
-                        git_error_message = error_msg
-                else:
-                    tracker.skip("git", "git недоступен")
-            else:
-                tracker.skip("git", "флаг --no-git")
-
-            tracker.complete("final", "проект готов")
+            result = api.init_project(
+                project_path,
+                selected_ai,
+                selected_script,
+                merge=here,
+                git=not no_git,
+                verify_tls=not skip_tls,
+                progress=_tracker_progress(tracker),
+                github_token=github_token,
+                debug=debug,
+                offline=True if offline else None,
+                timeout=timeout,
+                release_tag=release,
+                lock=lock,
+            )
+        except api.DeadlineExceeded as e:
+            # init_project has already rolled back everything this run created
+            tracker.error("final", f"таймаут на шаге {e.phase}")
+            console.print(Panel(
+                f"Бюджет --timeout {timeout:g} с исчерпан на шаге [bold]{_STEP_LABELS.get(e.phase, e.phase)}[/bold] ({e.phase}).\n"
+                "Все изменения этого запуска откачены.",
+                title="Превышено время", border_style="red",
+            ))
+            _record_run("init", tracker, started, 124, agent=selected_ai, script=selected_script, error=type(e).__name__, phase=e.phase)
+            raise typer.Exit(124)
+        except KeyboardInterrupt:
+            tracker.error("final", "прервано")
+            _record_run("init", tracker, started, 130, agent=selected_ai, script=selected_script, error="KeyboardInterrupt")
+            live.stop()
+            console.print("[yellow]Прервано пользователем; изменения этого запуска откачены.[/yellow]")
+            raise typer.Exit(130)
         except Exception as e:
+            # init_project removes the directory it created, so nothing to clean up here
             tracker.error("final", str(e))
             console.print(Panel(f"Ошибка инициализации: {e}", title="Сбой", border_style="red"))
+            if isinstance(e, api.TemplateNotFoundError):
+                console.print(Panel("\n".join(e.assets) or "(нет артефактов)", title="Доступные артефакты", border_style="yellow"))
             if debug:
                 _env_pairs = [
                     ("Python", sys.version.split()[0]),
@@ -1000,11 +952,25 @@ def init(
                 _label_width = max(len(k) for k, _ in _env_pairs)
                 env_lines = [f"{k.ljust(_label_width)} → [bright_black]{v}[/bright_black]" for k, v in _env_pairs]
                 console.print(Panel("\n".join(env_lines), title="Отладочная среда", border_style="magenta"))
-            if not here and project_path.exists():
-                shutil.rmtree(project_path)
+            _record_run("init", tracker, started, 1, agent=selected_ai, script=selected_script, error=type(e).__name__)
             raise typer.Exit(1)
-        finally:
-            pass
+
+    from .history import cache_state
+
+    _record_run(
+        "init", tracker, started, 0,
+        release=result.release,
+        agent=selected_ai,
+        script=selected_script,
+        downloaded=result.downloaded,
+        files=result.files,
+        cache=cache_state(result.downloaded, result.cache_hits),
+        layered=result.layered,
+        git=result.git,
+    )
+
+    # Track git error message outside Live context so it persists
+    git_error_message = result.git_error
 
     console.print(tracker.render())
     console.print("\n[bold green]Проект готов.[/bold green]")
@@ -1089,6 +1055,7 @@ def check():
     show_banner()
     console.print("[bold]Проверяем установленные инструменты...[/bold]\n")
 
+    started = time.time()
     tracker = StepTracker("Проверка доступных инструментов")
 
     tracker.add("git", "Git (система контроля версий)")
@@ -1108,6 +1075,9 @@ def check():
     tracker.add("code-insiders", "Visual Studio Code Insiders")
     code_insiders_ok = check_tool("code-insiders", tracker=tracker)
 
+    found = [s["key"] for s in tracker.steps if s["status"] == "done"]
+    _record_run("check", tracker, started, 0, tools=found)
+
     console.print(tracker.render())
 
     console.print("\n[bold green]Specify-ru CLI готов к работе![/bold green]")
@@ -1118,6 +1088,1160 @@ def check():
     if not any(agent_results.values()):
         console.print("[dim]Совет: установите ИИ-агента для полноценной работы[/dim]")
 
+@app.command("update-context")
+def update_context(
+    agent: str = typer.Argument(None, help="Агент, контекст которого нужно обновить (по умолчанию — все найденные файлы агентов)"),
+    json_output: bool = typer.Option(False, "--json", help="Вывести результат в формате JSON"),
+):
+    """
+    Обновить контекстные файлы агентов по plan.md текущей фичи.
+
+    Нативная замена scripts/bash/update-agent-context.sh: план разбирается один раз,
+    все файлы агентов обновляются за один проход, неизменённые файлы не перезаписываются.
+
+    Примеры:
+        specify-ru update-context
+        specify-ru update-context claude --json
+    """
+    from .agent_context import AgentContextError, update_agent_contexts
+    from .feature import get_feature_paths
+
+    paths = get_feature_paths()
+    try:
+        plan, results = update_agent_contexts(paths, agent)
+    except AgentContextError as e:
+        if json_output:
+            print(json.dumps({"success": False, "error": str(e)}, ensure_ascii=False))
+        else:
+            console.print(f"[red]Ошибка:[/red] {e}")
+        raise typer.Exit(1)
+
+    success = all(r.status != "error" for r in results)
+
+    if json_output:
+        payload = {
+            "success": success,
+            "feature": paths.current_branch,
+            "plan": str(paths.impl_plan),
+            "technologies": plan.as_dict(),
+            "files": [
+                {
+                    "path": str(r.path.relative_to(paths.repo_root)),
+                    "agents": r.agents,
+                    "status": r.status,
+                    **({"error": r.error} if r.error else {}),
+                }
+                for r in results
+            ],
+        }
+        print(json.dumps(payload, ensure_ascii=False))
+    else:
+        status_labels = {
+            "created": "[green]создан[/green]",
+            "updated": "[green]обновлён[/green]",
+            "unchanged": "[bright_black]без изменений[/bright_black]",
+            "error": "[red]ошибка[/red]",
+        }
+        console.print(f"[cyan]Фича:[/cyan] {paths.current_branch}")
+        if plan.tech_stack:
+            console.print(f"[cyan]Технологии:[/cyan] {plan.tech_stack}")
+        if plan.storage:
+            console.print(f"[cyan]Хранилище:[/cyan] {plan.storage}")
+        for r in results:
+            names = ", ".join(AGENT_CONFIG.get(a, {}).get("name", a) for a in r.agents)
+            line = f"  {status_labels[r.status]} {r.path.relative_to(paths.repo_root)} [dim]({names})[/dim]"
+            if r.error:
+                line += f" — {r.error}"
+            console.print(line)
+
+    if not success:
+        raise typer.Exit(1)
+
+@app.command()
+def prereqs(
+    json_output: bool = typer.Option(False, "--json", help="Вывод в формате JSON"),
+    require_tasks: bool = typer.Option(False, "--require-tasks", help="Требовать наличие tasks.md (этап реализации)"),
+    include_tasks: bool = typer.Option(False, "--include-tasks", help="Включить tasks.md в список AVAILABLE_DOCS"),
+    paths_only: bool = typer.Option(False, "--paths-only", help="Выводить только пути (без проверки предпосылок)"),
+):
+    """
+    Проверить предпосылки текущей фичи (аналог check-prerequisites.sh без запуска git).
+
+    Примеры:
+        specify-ru prereqs --json
+        specify-ru prereqs --json --require-tasks --include-tasks
+        specify-ru prereqs --paths-only
+    """
+    from .feature import get_feature_paths
+    from .prereqs import PrerequisiteError, check_feature_branch, check_prerequisites, paths_payload
+
+    paths = get_feature_paths()
+    try:
+        warning = check_feature_branch(paths)
+        if warning:
+            print(warning, file=sys.stderr)
+
+        if paths_only:
+            payload = paths_payload(paths)
+            if json_output:
+                print(json.dumps(payload, ensure_ascii=False, separators=(",", ":")))
+            else:
+                for key, value in payload.items():
+                    print(f"{key}: {value}")
+            return
+
+        docs, report = check_prerequisites(paths, require_tasks=require_tasks, include_tasks=include_tasks)
+    except PrerequisiteError as e:
+        for line in e.lines:
+            print(line, file=sys.stderr)
+        raise typer.Exit(1)
+
+    if json_output:
+        print(json.dumps({"FEATURE_DIR": str(paths.feature_dir), "AVAILABLE_DOCS": docs}, ensure_ascii=False, separators=(",", ":")))
+    else:
+        print(f"FEATURE_DIR:{paths.feature_dir}")
+        print("AVAILABLE_DOCS:")
+        for name, present in report.items():
+            print(f"  {'✓' if present else '✗'} {name}")
+
+features_app = typer.Typer(
+    name="features",
+    help="Индекс фич в specs/ (кэшируется в .specify/cache/index.json)",
+    add_completion=False,
+)
+app.add_typer(features_app, name="features")
+
+@features_app.command("list")
+def features_list(
+    json_output: bool = typer.Option(False, "--json", help="Вывести список в формате JSON"),
+):
+    """Показать все фичи с доступными артефактами."""
+    from .feature import get_repo_root
+    from .feature_index import load_index
+
+    repo_root, _ = get_repo_root()
+    index = load_index(repo_root, deep=True)
+    entries = index.sorted_entries()
+
+    if json_output:
+        print(json.dumps({
+            "features": [
+                {
+                    "number": e.number,
+                    "slug": e.slug,
+                    "branch": e.branch,
+                    "path": str(index.specs_dir / e.branch),
+                    "artifacts": e.artifacts,
+                }
+                for e in entries
+            ]
+        }, ensure_ascii=False))
+        return
+
+    if not entries:
+        console.print("[yellow]Фичи в specs/ не найдены[/yellow]")
+        return
+
+    table = Table(show_header=True, header_style="cyan", box=None, padding=(0, 2))
+    table.add_column("№", justify="right")
+    table.add_column("Ветка")
+    table.add_column("Артефакты", style="bright_black")
+    for e in entries:
+        table.add_row(f"{e.number:03d}", e.branch, ", ".join(e.artifacts) or "—")
+    console.print(table)
+
+@features_app.command("current")
+def features_current(
+    json_output: bool = typer.Option(False, "--json", help="Вывести результат в формате JSON"),
+):
+    """Показать текущую фичу (SPECIFY_FEATURE, ветка git или последний каталог в specs/)."""
+    from .feature import get_feature_paths
+
+    paths = get_feature_paths()
+    if json_output:
+        print(json.dumps({
+            "BRANCH": paths.current_branch,
+            "FEATURE_DIR": str(paths.feature_dir),
+            "HAS_GIT": paths.has_git,
+        }, ensure_ascii=False))
+    else:
+        print(paths.current_branch)
+
+@features_app.command("new")
+def features_new(
+    description: list[str] = typer.Argument(..., help="Описание фичи"),
+    json_output: bool = typer.Option(False, "--json", help="Вывести результат в формате JSON"),
+):
+    """
+    Создать новую фичу: ветку, каталог specs/NNN-название и spec.md из шаблона.
+
+    Нативная замена scripts/bash/create-new-feature.sh: следующий номер берётся из индекса.
+    """
+    from .feature import get_repo_root
+    from .feature_index import create_feature
+
+    repo_root, has_git = get_repo_root()
+    try:
+        result = create_feature(repo_root, has_git, " ".join(description))
+    except (OSError, RuntimeError) as e:
+        console.print(f"[red]Ошибка:[/red] {e}")
+        raise typer.Exit(1)
+
+    if not has_git:
+        print(f"[specify-ru] Предупреждение: git-репозиторий не обнаружен; создание ветки {result['BRANCH_NAME']} пропущено", file=sys.stderr)
+
+    if json_output:
+        # Same compact shape as the printf output of create-new-feature.sh
+        print(json.dumps(result, ensure_ascii=False, separators=(",", ":")))
+    else:
+        for key, value in result.items():
+            print(f"{key}: {value}")
+
+@app.command()
+def analyze(
+    json_output: bool = typer.Option(False, "--json", help="Вывести отчёт в формате JSON"),
+    limit: int = typer.Option(50, "--limit", help="Максимум находок в текстовом отчёте"),
+):
+    """
+    Детерминированный анализ spec.md, plan.md и tasks.md текущей фичи.
+
+    Находит требования FR-###/SC-### и истории без задач, задачи-сироты,
+    неразрешённые [NEEDS CLARIFICATION] и плейсхолдеры, дубли идентификаторов
+    и циклы зависимостей. /specify-ru.analyze использует отчёт как отправную точку.
+
+    Примеры:
+        specify-ru analyze
+        specify-ru analyze --json
+    """
+    from .analyze import analyze_feature
+    from .feature import get_feature_paths
+    from .prereqs import PrerequisiteError, check_prerequisites
+
+    paths = get_feature_paths()
+    try:
+        check_prerequisites(paths, require_tasks=True)
+    except PrerequisiteError as e:
+        for line in e.lines:
+            print(line, file=sys.stderr)
+        raise typer.Exit(1)
+    if not paths.feature_spec.is_file():
+        print(f"ERROR: spec.md не найден в {paths.feature_dir}", file=sys.stderr)
+        print("Сначала выполните /specify-ru.specify, чтобы создать спецификацию.", file=sys.stderr)
+        raise typer.Exit(1)
+
+    report = analyze_feature(paths.feature_dir, paths.repo_root)
+
+    if json_output:
+        print(json.dumps({"FEATURE_DIR": str(paths.feature_dir), **report.as_dict()}, ensure_ascii=False))
+        return
+
+    metrics = report.metrics
+    console.print(
+        f"[cyan]Требований:[/cyan] {metrics['requirements']}  [cyan]Историй:[/cyan] {metrics['stories']}  "
+        f"[cyan]Задач:[/cyan] {metrics['tasks']}  [cyan]Покрытие:[/cyan] {metrics['coverage_percent']}%"
+    )
+    if not report.findings:
+        console.print("[green]Проблем не найдено[/green]")
+        return
+
+    colors = {"CRITICAL": "red", "HIGH": "yellow", "MEDIUM": "cyan", "LOW": "bright_black"}
+    table = Table(show_header=True, header_style="cyan", box=None, padding=(0, 1))
+    table.add_column("ID")
+    table.add_column("Категория")
+    table.add_column("Severity")
+    table.add_column("Локация")
+    table.add_column("Сводка")
+    for finding in report.findings[:limit]:
+        table.add_row(
+            finding.id,
+            finding.category,
+            f"[{colors[finding.severity]}]{finding.severity}[/{colors[finding.severity]}]",
+            finding.location,
+            escape(finding.summary),
+        )
+    console.print(table)
+    if len(report.findings) > limit:
+        console.print(f"[dim]… и ещё {len(report.findings) - limit} (полный список: --json)[/dim]")
+
+context_app = typer.Typer(
+    name="context",
+    help="Сжатый контекст текущей фичи для промптов агента",
+    add_completion=False,
+)
+app.add_typer(context_app, name="context")
+
+@context_app.command("pack")
+def context_pack(
+    budget: Optional[int] = typer.Option(None, "--budget", min=200, help="Бюджет дайджеста в токенах (по умолчанию 4000; оценка: ~4 байта на токен)"),
+    json_output: bool = typer.Option(False, "--json", help="Вывести результат в формате JSON (дайджест в поле text)"),
+    full: bool = typer.Option(False, "--full", help="Считать изменёнными все разделы (игнорировать кэш)"),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Не отмечать разделы как переданные"),
+):
+    """
+    Собрать дайджест артефактов фичи: таблицы требований и задач, оглавление
+    и только изменившиеся с прошлой упаковки разделы.
+
+    Хэши переданных разделов хранятся в .specify/cache/context-pack.json.
+
+    Примеры:
+        specify-ru context pack --budget 3000
+        specify-ru context pack --full --json
+    """
+    from .context_pack import DEFAULT_BUDGET, pack_context
+    from .feature import get_feature_paths
+    from .prereqs import PrerequisiteError, check_feature_branch, check_prerequisites
+
+    paths = get_feature_paths()
+    try:
+        check_feature_branch(paths)
+        check_prerequisites(paths)
+    except PrerequisiteError as e:
+        for line in e.lines:
+            print(line, file=sys.stderr)
+        raise typer.Exit(1)
+
+    pack = pack_context(paths, DEFAULT_BUDGET if budget is None else budget, full=full, save=not dry_run)
+    if json_output:
+        print(json.dumps({"FEATURE_DIR": str(paths.feature_dir), **pack.as_dict()}, ensure_ascii=False))
+    else:
+        print(pack.text, end="")
+
+@context_app.command("reset")
+def context_reset():
+    """Забыть переданные разделы текущей фичи (следующая упаковка будет полной)."""
+    from .context_pack import reset_context_cache
+    from .feature import get_feature_paths
+
+    paths = get_feature_paths()
+    if reset_context_cache(paths):
+        console.print(f"[green]Кэш контекста сброшен для {paths.current_branch}[/green]")
+    else:
+        console.print(f"[dim]Кэш контекста для {paths.current_branch} пуст[/dim]")
+
+tasks_app = typer.Typer(
+    name="tasks",
+    help="Анализ tasks.md текущей фичи",
+    add_completion=False,
+)
+app.add_typer(tasks_app, name="tasks")
+
+@tasks_app.command("graph")
+def tasks_graph(
+    tasks_file: Optional[Path] = typer.Argument(None, help="Путь к tasks.md (по умолчанию — tasks.md текущей фичи)"),
+    json_output: bool = typer.Option(False, "--json", help="Вывести граф в формате JSON"),
+    dot_output: bool = typer.Option(False, "--dot", help="Вывести граф в формате Graphviz DOT"),
+    explicit_only: bool = typer.Option(False, "--explicit-only", help="Учитывать только явные зависимости («зависит от T012»)"),
+):
+    """
+    Построить граф зависимостей задач: циклы, конфликты по файлам, критический путь и волны.
+
+    Неявные зависимости выводятся из формата tasks-template.md: задачи без [P]
+    выполняются последовательно, общие фазы блокируют следующие, а фазы
+    разных историй могут идти параллельно. Задачи одной волны можно раздавать
+    параллельным исполнителям. При обнаружении циклов код завершения — 1.
+
+    Примеры:
+        specify-ru tasks graph
+        specify-ru tasks graph --json
+        specify-ru tasks graph --dot | dot -Tsvg > tasks.svg
+    """
+    from .feature import get_feature_paths
+    from .tasks_graph import load_graph, to_dot
+
+    if json_output and dot_output:
+        console.print("[red]Ошибка:[/red] --json и --dot нельзя использовать одновременно")
+        raise typer.Exit(1)
+
+    tasks_path = tasks_file or get_feature_paths().tasks
+    if not tasks_path.is_file():
+        console.print(f"[red]Ошибка:[/red] tasks.md не найден: {tasks_path}")
+        console.print("Сначала выполните /specify-ru.tasks, чтобы создать список задач.")
+        raise typer.Exit(1)
+
+    graph = load_graph(tasks_path, implicit=not explicit_only)
+
+    if json_output:
+        print(json.dumps({"tasks_file": str(tasks_path), **graph.as_dict()}, ensure_ascii=False))
+    elif dot_output:
+        print(to_dot(graph), end="")
+    else:
+        pending = sum(1 for t in graph.tasks if not t.done)
+        console.print(f"[cyan]Задачи:[/cyan] {len(graph.tasks)} (осталось {pending}) — {tasks_path}")
+        for tid in graph.duplicates:
+            console.print(f"[yellow]Повторяющийся идентификатор:[/yellow] {tid}")
+        for item in graph.missing:
+            console.print(f"[yellow]{item['task']} ссылается на несуществующую задачу {item['ref']}[/yellow]")
+        for cycle in graph.cycles:
+            console.print(f"[red]Цикл зависимостей:[/red] {' → '.join(cycle + cycle[:1])}")
+        for conflict in graph.conflicts:
+            a, b = conflict["tasks"]
+            console.print(f"[yellow]Конфликт по файлам:[/yellow] {a} и {b} ({escape(', '.join(conflict['paths']))}) — выполняются в разных волнах")
+
+        if graph.waves:
+            table = Table(show_header=True, header_style="cyan", box=None, padding=(0, 2))
+            table.add_column("Волна", justify="right")
+            table.add_column("Задачи")
+            for n, wave in enumerate(graph.waves, start=1):
+                table.add_row(str(n), ", ".join(wave))
+            console.print(table)
+            console.print(f"[cyan]Критический путь[/cyan] ({len(graph.critical_path)}): {' → '.join(graph.critical_path)}")
+        elif graph.ok:
+            console.print("[green]Все задачи выполнены[/green]")
+
+    if not graph.ok:
+        raise typer.Exit(1)
+
+@app.command()
+def serve(
+    host: str = typer.Option("127.0.0.1", "--host", help="Адрес для HTTP (по умолчанию только localhost)"),
+    port: int = typer.Option(7411, "--port", help="Порт HTTP"),
+    socket_path: Optional[Path] = typer.Option(None, "--socket", help="Слушать Unix-сокет вместо TCP"),
+    workers: int = typer.Option(4, "--workers", min=1, help="Размер пула потоков"),
+    queue_size: int = typer.Option(16, "--queue", min=0, help="Длина очереди запросов сверх пула; при переполнении — 503"),
+    release_ttl: float = typer.Option(300.0, "--release-ttl", min=0, help="Как долго (в секундах) использовать описание релиза без повторного запроса"),
+    root: Optional[Path] = typer.Option(None, "--root", help="Разрешить создание проектов только внутри этого каталога (для TCP по умолчанию — текущий каталог)"),
+    warm: Optional[list[str]] = typer.Option(None, "--warm", help="Загрузить шаблон заранее: агент:скрипт (можно повторять)"),
+    skip_tls: bool = typer.Option(False, "--skip-tls", help="Отключить проверку SSL/TLS (не рекомендуется)"),
+    github_token: str = typer.Option(None, "--github-token", help="Токен GitHub для API-запросов (или используйте переменные GH_TOKEN/GITHUB_TOKEN)"),
+    verbose: bool = typer.Option(False, "--verbose", help="Журналировать каждый запрос в stderr"),
+):
+    """
+    Запустить демон инициализации проектов с прогретыми кэшами.
+
+    Описание релиза, распакованные шаблоны и HTTP-соединения остаются в памяти,
+    поэтому создание проекта стоит только записи файлов. Эндпоинты:
+    POST /scaffold, /upgrade, /check; GET /health, /metrics.
+
+    Аутентификации нет: рекомендуемый транспорт — Unix-сокет (--socket).
+    POST принимаются только с Content-Type: application/json и без заголовка
+    Origin; по TCP проекты создаются только внутри --root (по умолчанию —
+    текущий каталог).
+
+    Примеры:
+        specify-ru serve --socket /run/specify-ru.sock --workers 8
+        specify-ru serve --root /srv/p --warm claude:sh --warm copilot:sh
+        curl -s --unix-socket /run/specify-ru.sock localhost/scaffold -H 'Content-Type: application/json' -d '{"path": "/srv/p/demo", "agent": "claude"}'
+    """
+    from .serve import ScaffoldService, make_server
+
+    if root is None and socket_path is None:
+        # Any local process can reach a TCP port: confine writes to the launch directory
+        root = Path.cwd()
+
+    service = ScaffoldService(
+        _new_http_client(verify=not skip_tls),
+        workers=workers,
+        queue_size=queue_size,
+        release_ttl=release_ttl,
+        github_token=github_token,
+        root=root,
+    )
+    for item in warm or []:
+        agent, _, script = item.partition(":")
+        try:
+            template = service.warm(agent, script or "sh")
+        except Exception as e:
+            console.print(f"[yellow]Не удалось загрузить шаблон {item}:[/yellow] {e}")
+            continue
+        console.print(f"[cyan]Шаблон {agent}:{template.script}[/cyan] {template.release}, {len(template.files)} файлов")
+
+    try:
+        server = make_server(service, host=host, port=port, socket_path=socket_path, verbose=verbose)
+    except OSError as e:
+        console.print(f"[red]Ошибка:[/red] не удалось открыть {socket_path or f'{host}:{port}'}: {e}")
+        service.close()
+        raise typer.Exit(1)
+
+    import signal
+    import threading
+
+    # SIGTERM (systemd, docker stop) stops the loop the same way as Ctrl+C; shutdown() must
+    # run outside the thread that is blocked in serve_forever()
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown, daemon=True).start())
+
+    address = f"unix:{socket_path}" if socket_path else f"http://{host}:{port}"
+    console.print(f"[green]specify-ru serve[/green] слушает {address} (потоков: {workers}, очередь: {queue_size}). Ctrl+C — остановить.")
+    if service.root:
+        console.print(f"[cyan]Проекты создаются только внутри[/cyan] {service.root}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        if socket_path and socket_path.exists():
+            socket_path.unlink()
+    console.print("[cyan]Демон остановлен[/cyan]")
+
+bundle_app = typer.Typer(
+    name="bundle",
+    help="Автономные пакеты шаблонов для сетей без доступа к GitHub",
+    add_completion=False,
+)
+app.add_typer(bundle_app, name="bundle")
+
+@bundle_app.command("export")
+def bundle_export(
+    output: Optional[Path] = typer.Argument(None, help="Файл пакета или каталог для spec-kit-ru-bundle-<релиз>.zip (по умолчанию текущий каталог)"),
+    agents: Optional[list[str]] = typer.Option(None, "--ai", help="Включить только этих агентов (можно повторять)"),
+    scripts: Optional[list[str]] = typer.Option(None, "--script", help="Включить только эти типы скриптов (можно повторять)"),
+    skip_tls: bool = typer.Option(False, "--skip-tls", help="Отключить проверку SSL/TLS (не рекомендуется)"),
+    github_token: str = typer.Option(None, "--github-token", help="Токен GitHub для API-запросов (или используйте переменные GH_TOKEN/GITHUB_TOKEN)"),
+    json_output: bool = typer.Option(False, "--json", help="Вывести итог в формате JSON"),
+):
+    """
+    Собрать пакет последнего релиза: описание релиза и шаблоны всех агентов×скриптов.
+
+    Одинаковые архивы и слои хранятся в пакете один раз. Рядом записывается
+    файл .sha256 для проверки при переносе.
+
+    Примеры:
+        specify-ru bundle export
+        specify-ru bundle export /media/usb/specify.zip --ai claude --ai copilot --script sh
+    """
+    from .bundle import export_bundle
+
+    for agent in agents or []:
+        if agent not in AGENT_CONFIG:
+            console.print(f"[red]Ошибка:[/red] Некорректный ИИ-агент '{agent}'. Допустимые значения: {', '.join(AGENT_CONFIG.keys())}")
+            raise typer.Exit(1)
+    for script in scripts or []:
+        if script not in SCRIPT_TYPE_CHOICES:
+            console.print(f"[red]Ошибка:[/red] Недопустимый тип скриптов '{script}'. Выберите один из: {', '.join(SCRIPT_TYPE_CHOICES.keys())}")
+            raise typer.Exit(1)
+
+    client = _new_http_client(verify=not skip_tls)
+    try:
+        info = export_bundle(
+            output or Path.cwd(),
+            client=client,
+            agents=agents,
+            scripts=scripts,
+            github_token=github_token,
+            progress=None if json_output else lambda step, status, detail="": status != "start" and console.print(f"[bright_black]{step}[/bright_black] {detail}"),
+        )
+    except Exception as e:
+        console.print(f"[red]Ошибка при сборке пакета:[/red] {e}")
+        raise typer.Exit(1)
+    finally:
+        client.close()
+
+    if json_output:
+        print(json.dumps(info.as_dict(), ensure_ascii=False))
+        return
+    console.print(f"[green]Пакет записан:[/green] {info.path}")
+    console.print(f"Релиз {info.release}: шаблонов {len(info.templates)}, объектов {info.objects} ({info.size:,} байт)")
+    console.print(f"sha256 {info.sha256}")
+
+@bundle_app.command("import")
+def bundle_import(
+    bundle_file: Path = typer.Argument(..., help="Файл пакета, созданный bundle export"),
+    json_output: bool = typer.Option(False, "--json", help="Вывести итог в формате JSON"),
+):
+    """
+    Проверить пакет и загрузить его в локальный кэш шаблонов.
+
+    После импорта `specify-ru init --offline` (или с SPECIFY_OFFLINE=1)
+    создаёт проекты из кэша без сетевых запросов.
+
+    Примеры:
+        specify-ru bundle import /media/usb/spec-kit-ru-bundle-v0.1.0.zip
+    """
+    from .bundle import import_bundle
+
+    if not bundle_file.is_file():
+        console.print(f"[red]Ошибка:[/red] файл не найден: {bundle_file}")
+        raise typer.Exit(1)
+    try:
+        info = import_bundle(bundle_file)
+    except Exception as e:
+        console.print(f"[red]Ошибка при импорте пакета:[/red] {e}")
+        raise typer.Exit(1)
+
+    if json_output:
+        print(json.dumps(info.as_dict(), ensure_ascii=False))
+        return
+    console.print(f"[green]Пакет импортирован:[/green] релиз {info.release}, шаблонов {len(info.templates)}, объектов {info.objects} (уже были в кэше: {info.reused})")
+    console.print("Создавайте проекты без сети: [cyan]specify-ru init <name> --ai <agent> --offline[/cyan]")
+
+cache_app = typer.Typer(
+    name="cache",
+    help="Локальный кэш архивов шаблона",
+    add_completion=False,
+)
+app.add_typer(cache_app, name="cache")
+
+@cache_app.command("prune")
+def cache_prune(
+    max_age: int = typer.Option(90, "--max-age", min=0, help="Удалить архивы, не использованные дольше N дней"),
+    max_size: int = typer.Option(200, "--max-size", min=0, help="Затем удалять самые старые, пока кэш больше N МБ"),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Только показать, что будет удалено"),
+    json_output: bool = typer.Option(False, "--json", help="Вывести итог в формате JSON"),
+):
+    """
+    Очистить кэш слоёв и архивов шаблона.
+
+    Скачивание нового архива само ограничивает кэш (не чаще раза в сутки) с
+    параметрами по умолчанию. Объекты импортированного пакета (bundle import)
+    не удаляются.
+
+    Примеры:
+        specify-ru cache prune
+        specify-ru cache prune --max-age 0 --dry-run
+    """
+    from .api import prune_layer_cache
+
+    result = prune_layer_cache(max_age=max_age * 24 * 3600, max_bytes=max_size * 1024 * 1024, dry_run=dry_run)
+    if json_output:
+        print(json.dumps({**result.as_dict(), "dry_run": dry_run}, ensure_ascii=False))
+        return
+    verb = "Будет удалено" if dry_run else "Удалено"
+    console.print(f"{verb}: {len(result.removed)} ({result.freed:,} байт) из {result.cache_dir}")
+    console.print(f"Осталось: {result.kept} ({result.kept_bytes:,} байт), из них объектов пакета: {result.pinned}")
+
+@app.command()
+def scan(
+    root: Path = typer.Argument(Path("."), help="Каталог, в котором искать проекты"),
+    json_output: bool = typer.Option(False, "--json", help="Вывести результат в формате JSON"),
+    csv_output: bool = typer.Option(False, "--csv", help="Вывести результат в формате CSV"),
+    jobs: int = typer.Option(8, "--jobs", "-j", min=1, help="Число потоков обхода"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Не использовать и не обновлять кэш обхода"),
+    exclude: Optional[list[str]] = typer.Option(None, "--exclude", help="Дополнительно пропускать каталоги с этим именем (можно повторять)"),
+):
+    """
+    Найти проекты Specify в дереве каталогов: релиз шаблона, агенты, тип скриптов.
+
+    Каталоги node_modules, .git, виртуальные окружения и кэши инструментов
+    пропускаются. Повторный обход читает только каталоги, изменившиеся с
+    прошлого раза.
+
+    Примеры:
+        specify-ru scan ~/src
+        specify-ru scan /srv/repos --csv > fleet.csv
+        specify-ru scan . --json --exclude build
+    """
+    import hashlib
+
+    from .scan import scan_tree, to_csv
+
+    if json_output and csv_output:
+        console.print("[red]Ошибка:[/red] --json и --csv нельзя использовать вместе")
+        raise typer.Exit(1)
+    root = root.expanduser().resolve()
+    if not root.is_dir():
+        console.print(f"[red]Ошибка:[/red] каталог не найден: {root}")
+        raise typer.Exit(1)
+
+    cache_path = None
+    if not no_cache:
+        key = hashlib.sha256(str(root).encode("utf-8")).hexdigest()[:16]
+        cache_path = Path(user_cache_dir("specify-ru")) / "scan" / f"{key}.json"
+    result = scan_tree(root, jobs=jobs, cache_path=cache_path, exclude=tuple(exclude or ()))
+
+    if json_output:
+        print(json.dumps(result.as_dict(), ensure_ascii=False))
+        return
+    if csv_output:
+        sys.stdout.write(to_csv(result))
+        return
+
+    if not result.projects:
+        console.print(f"[yellow]Проекты Specify не найдены в {root}[/yellow]")
+    else:
+        table = Table(show_header=True, header_style="cyan", box=None, padding=(0, 2))
+        table.add_column("Проект")
+        table.add_column("Релиз")
+        table.add_column("Агенты")
+        table.add_column("Скрипты")
+        for project in result.projects:
+            rel = Path(project.path).relative_to(root).as_posix() if project.path != str(root) else "."
+            table.add_row(rel, project.release or "[bright_black]—[/bright_black]", ", ".join(project.agents) or "—", ", ".join(project.scripts) or "—")
+        console.print(table)
+    console.print(
+        f"[bright_black]Проектов: {len(result.projects)}; каталогов: {result.visited} "
+        f"(прочитано {result.listed}, из кэша {result.visited - result.listed}); {result.elapsed:.2f} с[/bright_black]"
+    )
+
+@app.command()
+def stats(
+    command: Optional[str] = typer.Option(None, "--command", "-c", help="Только эта команда: init или check"),
+    days: int = typer.Option(30, "--days", min=0, help="Учитывать запуски за последние N дней (0 — все)"),
+    json_output: bool = typer.Option(False, "--json", help="Вывести сводку в формате JSON"),
+    openmetrics: Optional[str] = typer.Option(None, "--openmetrics", help="Записать сводку в формате OpenMetrics в файл (для textfile collector node_exporter) или '-' для stdout"),
+):
+    """
+    Показать длительность запусков init и check по локальной истории: p50/p95 по шагам и тренд по неделям.
+
+    История пишется в каталог данных пользователя при каждом запуске
+    (SPECIFY_NO_HISTORY=1 отключает запись).
+
+    Примеры:
+        specify-ru stats
+        specify-ru stats --command init --days 7
+        specify-ru stats --openmetrics /var/lib/node_exporter/textfile/specify_ru.prom
+    """
+    from .history import history_dir, read_runs, summarize, to_openmetrics, write_textfile
+
+    summary = summarize(read_runs(), command=command, days=days or None)
+
+    if openmetrics:
+        text = to_openmetrics(summary)
+        if openmetrics == "-":
+            sys.stdout.write(text)
+            return
+        try:
+            write_textfile(Path(openmetrics), text)
+        except OSError as e:
+            console.print(f"[red]Ошибка:[/red] не удалось записать {openmetrics}: {e}")
+            raise typer.Exit(1)
+        if not json_output:
+            console.print(f"[green]Метрики записаны:[/green] {openmetrics}")
+    if json_output:
+        print(json.dumps({name: s.as_dict() for name, s in summary.items()}, ensure_ascii=False))
+        return
+    if openmetrics:
+        return
+
+    if not summary:
+        console.print(f"[yellow]История запусков пуста[/yellow] [bright_black]({history_dir()})[/bright_black]")
+        return
+
+    for name, s in sorted(summary.items()):
+        cache = ", ".join(f"{state}: {count}" for state, count in sorted(s.cache.items()))
+        console.print(
+            f"[cyan]{name}[/cyan]: запусков {s.runs}, с ошибкой {s.failures}"
+            + (f", скачано {s.downloaded:,} байт" if s.downloaded else "")
+            + (f", кэш шаблона — {cache}" if cache else "")
+        )
+        table = Table(show_header=True, header_style="cyan", box=None, padding=(0, 2))
+        table.add_column("Шаг")
+        table.add_column("Запусков", justify="right")
+        table.add_column("p50, с", justify="right")
+        table.add_column("p95, с", justify="right")
+        table.add_column("Макс., с", justify="right")
+        for phase, d in [*s.phases.items(), ("всего", s.duration)]:
+            row = d.as_dict()
+            style = "bold" if phase == "всего" else None
+            table.add_row(phase, str(row["count"]), f"{row['p50']:.3f}", f"{row['p95']:.3f}", f"{row['max']:.3f}", style=style)
+        console.print(table)
+
+        if len(s.weeks) > 1:
+            trend = Table(show_header=True, header_style="cyan", box=None, padding=(0, 2))
+            trend.add_column("Неделя")
+            trend.add_column("Запусков", justify="right")
+            trend.add_column("p50, с", justify="right")
+            trend.add_column("p95, с", justify="right")
+            for week, d in sorted(s.weeks.items())[-8:]:
+                row = d.as_dict()
+                trend.add_row(week, str(row["count"]), f"{row['p50']:.3f}", f"{row['p95']:.3f}")
+            console.print(trend)
+        console.print()
+
+@app.command()
+def lint(
+    paths: Optional[list[Path]] = typer.Argument(None, help="Файлы или каталоги для проверки (по умолчанию specs/)"),
+    json_output: bool = typer.Option(False, "--json", help="Вывести результат в формате JSON"),
+    jobs: Optional[int] = typer.Option(None, "--jobs", "-j", min=1, help="Число процессов (по умолчанию по числу CPU)"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Проверить все файлы заново, не используя .specify/cache/lint.json"),
+    strict: bool = typer.Option(False, "--strict", help="Завершаться с ошибкой и при предупреждениях"),
+    limit: int = typer.Option(200, "--limit", min=0, help="Максимум замечаний в текстовом выводе (0 — без ограничения)"),
+):
+    """
+    Проверить структуру spec.md, plan.md, tasks.md и чек-листов всех фич по шаблонам.
+
+    Находит отсутствующие разделы шаблона, незаполненные плейсхолдеры,
+    неразрешённые [NEEDS CLARIFICATION], дубли FR/SC, T### и CHK###.
+    Неизменившиеся файлы берутся из кэша. Код завершения 1 при ошибках —
+    удобно для CI.
+
+    Примеры:
+        specify-ru lint
+        specify-ru lint specs/001-auth --strict
+        specify-ru lint --json > lint.json
+    """
+    from .feature import get_repo_root
+    from .lint import lint_repo
+
+    repo_root, _ = get_repo_root()
+    report = lint_repo(repo_root, paths or (), jobs=jobs, use_cache=not no_cache)
+    failed = report.errors or (strict and report.warnings)
+
+    if json_output:
+        print(json.dumps(report.as_dict(), ensure_ascii=False))
+        raise typer.Exit(1 if failed else 0)
+
+    colors = {"error": "red", "warning": "yellow"}
+    shown = report.issues[:limit] if limit else report.issues
+    for issue in shown:
+        color = colors[issue.severity]
+        console.print(f"{escape(issue.file)}:{issue.line} [{color}]{issue.severity}[/{color}] [bright_black]{issue.code}[/bright_black] {escape(issue.message)}")
+    if len(shown) < len(report.issues):
+        console.print(f"[bright_black]… ещё {len(report.issues) - len(shown)} замечаний (--limit 0 или --json — все)[/bright_black]")
+    summary = (
+        f"Файлов: {len(report.files)} (из кэша {report.cached}); "
+        f"ошибок: {report.errors}, предупреждений: {report.warnings}; {report.elapsed:.2f} с"
+    )
+    console.print(f"[{'red' if failed else 'green'}]{summary}[/]")
+    if failed:
+        raise typer.Exit(1)
+
+@app.command()
+def trace(
+    ident: Optional[str] = typer.Argument(None, help="Требование (FR-007, SC-001), история (US2), задача (T012) или путь к файлу"),
+    feature: Optional[str] = typer.Option(None, "--feature", "-f", help="Только эта фича: номер (042) или имя каталога"),
+    changed: bool = typer.Option(False, "--changed", help="Показать требования, изменившиеся с прошлого релиза"),
+    since: Optional[str] = typer.Option(None, "--since", help="Тег, ветка или коммит для --changed (по умолчанию последний тег)"),
+    json_output: bool = typer.Option(False, "--json", help="Вывести результат в формате JSON"),
+):
+    """
+    Трассировка требований: какие задачи, тесты и файлы реализуют FR/SC, и наоборот.
+
+    Индекс в .specify/cache/trace.db строится по всем specs/NNN-*/ и
+    обновляется инкрементально: перечитываются только изменившиеся файлы.
+
+    Примеры:
+        specify-ru trace FR-007 --feature 042
+        specify-ru trace T012
+        specify-ru trace src/services/auth.py
+        specify-ru trace --changed --since v0.3.0 --json
+    """
+    from .feature import get_repo_root
+    from .trace import TraceError, changed_requirements, latest_tag, lookup, open_index, update_index
+
+    if not ident and not changed:
+        console.print("[red]Ошибка:[/red] укажите идентификатор или флаг --changed")
+        raise typer.Exit(1)
+
+    repo_root, _ = get_repo_root()
+    conn = open_index(repo_root)
+    try:
+        update_index(conn, repo_root)
+        if changed:
+            try:
+                ref = since or latest_tag(repo_root)
+                changes = changed_requirements(conn, repo_root, ref, feature=feature)
+            except TraceError as e:
+                console.print(f"[red]Ошибка:[/red] {e}")
+                raise typer.Exit(1)
+            if json_output:
+                print(json.dumps({"since": ref, "changes": changes}, ensure_ascii=False))
+                return
+            if not changes:
+                console.print(f"[green]Требования не изменились с {ref}[/green]")
+                return
+            labels = {"added": "[green]добавлено[/green]", "changed": "[yellow]изменено[/yellow]", "removed": "[red]удалено[/red]"}
+            table = Table(show_header=True, header_style="cyan", box=None, padding=(0, 1))
+            table.add_column("Фича")
+            table.add_column("ID")
+            table.add_column("Статус")
+            table.add_column("Формулировка")
+            for c in changes:
+                table.add_row(c["feature"], c["id"], labels[c["status"]], escape(c["text"]))
+            console.print(f"[cyan]Изменения требований с {ref}:[/cyan] {len(changes)}")
+            console.print(table)
+            return
+
+        results = lookup(conn, ident, feature=feature)
+    finally:
+        conn.close()
+
+    if json_output:
+        print(json.dumps({"query": ident, "results": results}, ensure_ascii=False))
+        return
+    if not results:
+        console.print(f"[yellow]{escape(ident)} не найден[/yellow]" + (f" в фиче {feature}" if feature else ""))
+        raise typer.Exit(1)
+
+    for r in results:
+        if r["type"] == "requirement":
+            console.print(f"[cyan]{r['feature']}[/cyan] [bold]{r['id']}[/bold]: {escape(r['text'])}  [bright_black]{r['location']}[/bright_black]")
+        elif r["type"] == "story":
+            priority = f" ({r['priority']})" if r["priority"] else ""
+            console.print(f"[cyan]{r['feature']}[/cyan] [bold]{r['id']}[/bold]{priority}: {escape(r['title'])}  [bright_black]{r['location']}[/bright_black]")
+        elif r["type"] == "task":
+            console.print(f"[cyan]{r['feature']}[/cyan] [bold]{r['id']}[/bold]: {escape(r['description'])}  [bright_black]{r['location']}[/bright_black]")
+        else:
+            console.print(f"[cyan]{r['feature']}[/cyan] [bold]{escape(r['id'])}[/bold]")
+
+        if r["type"] == "task":
+            refs = ", ".join(f"{req['id']}" + ("" if req["match"] == "id" else " ~") for req in r["requirements"])
+            console.print(f"  Требования: {refs or '—'}")
+            if r["files"]:
+                console.print(f"  Файлы: {escape(', '.join(r['files']))}")
+            continue
+        if r.get("requirements"):
+            console.print(f"  Требования: {', '.join(r['requirements'])}")
+        if not r["tasks"]:
+            console.print("  [yellow]Задач нет[/yellow]")
+        for t in r["tasks"]:
+            mark = "x" if t["done"] else " "
+            tags = (" [magenta]тест[/magenta]" if t["test"] else "") + (" [bright_black]~ по словам[/bright_black]" if t.get("match") == "keywords" else "")
+            console.print(f"  {escape(f'[{mark}]')} {t['id']}{tags} {escape(t['description'])}")
+        if r.get("files"):
+            console.print(f"  Файлы: {escape(', '.join(r['files']))}")
+@app.command()
+def watch(
+    poll: bool = typer.Option(False, "--poll", help="Опрашивать файлы вместо inotify (сетевые ФС, контейнеры)"),
+    interval: float = typer.Option(1.0, "--interval", min=0.1, help="Интервал опроса в секундах для --poll"),
+    debounce: float = typer.Option(0.3, "--debounce", min=0.0, help="Пауза без событий перед перегенерацией, с"),
+    agent: Optional[str] = typer.Option(None, "--agent", help="Обновлять контекст только этого агента (по умолчанию — все найденные)"),
+    json_output: bool = typer.Option(False, "--json", help="Печатать каждое действие строкой JSON"),
+):
+    """
+    Следить за specs/ и .specify/memory/ и перегенерировать только затронутое.
+
+    Изменение plan.md текущей фичи обновляет контекстные файлы агентов,
+    изменение документов фичи — индекс трассировки, lint этих файлов и
+    сводку analyze фичи. Серии правок схлопываются; в простое процесс
+    не расходует CPU (inotify, на других ФС — опрос mtime).
+
+    Примеры:
+        specify-ru watch
+        specify-ru watch --poll --interval 2
+        specify-ru watch --json | jq .
+    """
+    import signal
+
+    from .feature import get_repo_root
+    from .watch import watch as watch_project
+
+    repo_root, _ = get_repo_root()
+    if not (repo_root / "specs").is_dir() and not (repo_root / ".specify").is_dir():
+        console.print(f"[red]Ошибка:[/red] в {repo_root} нет specs/ и .specify/ — это не проект Specify")
+        raise typer.Exit(1)
+
+    def on_start(backend: str, fallback: Optional[str]) -> None:
+        if json_output:
+            print(json.dumps({"action": "start", "root": str(repo_root), "backend": backend, "fallback": fallback}, ensure_ascii=False), flush=True)
+            return
+        if fallback:
+            console.print(f"[yellow]inotify недоступен ({fallback}), используется опрос[/yellow]")
+        console.print(f"[green]specify-ru watch[/green] следит за {repo_root} ({backend}). Ctrl+C — остановить.")
+
+    labels = {"index": "индекс фич", "trace": "трассировка", "lint": "lint", "summary": "сводка", "context": "контекст агентов", "memory": "память"}
+
+    def emit(event: dict) -> None:
+        if json_output:
+            print(json.dumps(event, ensure_ascii=False), flush=True)
+            return
+        action = event["action"]
+        prefix = f"[bright_black]{time.strftime('%H:%M:%S')}[/bright_black] [cyan]{labels.get(action, action)}[/cyan]"
+        if event.get("feature"):
+            prefix += f" {escape(event['feature'])}"
+        if event.get("error"):
+            console.print(f"{prefix} [red]ошибка:[/red] {escape(event['error'])}")
+        elif action == "index":
+            console.print(f"{prefix}: фич {event['features']}")
+        elif action == "trace":
+            console.print(f"{prefix}: перечитано фич {event['parsed']} из {event['features']}")
+        elif action == "lint":
+            color = "red" if event["errors"] else "yellow" if event["warnings"] else "green"
+            console.print(f"{prefix}: [{color}]ошибок {event['errors']}, предупреждений {event['warnings']}[/{color}]")
+            for issue in event["issues"][:10]:
+                console.print(f"  {escape(issue['file'])}:{issue['line']} [bright_black]{issue['code']}[/bright_black] {escape(issue['message'])}")
+        elif action == "summary":
+            m = event["metrics"]
+            console.print(f"{prefix}: требований {m['requirements']}, задач {m['tasks']}, покрытие {m['coverage_percent']}%")
+        elif action == "context":
+            console.print(f"{prefix}: " + ", ".join(f"{escape(f['path'])} — {f['status']}" for f in event["files"]))
+        elif action == "memory":
+            console.print(f"{prefix}: {escape(', '.join(event['files']))} (войдёт в следующий context pack)")
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+
+    # SIGTERM stops the watcher the same way as Ctrl+C
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        watch_project(repo_root, emit, poll=poll, interval=interval, debounce=debounce, agent=agent, on_start=on_start)
+    except KeyboardInterrupt:
+        pass
+    if not json_output:
+        console.print("[cyan]Наблюдение остановлено[/cyan]")
+agents_app = typer.Typer(
+    name="agents",
+    help="Файлы команд агентов в существующем проекте",
+    add_completion=False,
+)
+app.add_typer(agents_app, name="agents")
+
+
+def _print_agent_changes(changes, json_output: bool) -> None:
+    if json_output:
+        print(json.dumps({"changes": [c.as_dict() for c in changes]}, ensure_ascii=False))
+        return
+    for c in changes:
+        name = AGENT_CONFIG.get(c.agent, {}).get("name", c.agent)
+        if c.removed:
+            console.print(f"[yellow]{name}[/yellow]: удалено файлов команд {len(c.removed)} из {c.directory}/")
+        else:
+            console.print(
+                f"[green]{name}[/green]: {c.directory}/ — записано {len(c.written)}, без изменений {len(c.unchanged)}"
+            )
+
+
+@agents_app.command("add")
+def agents_add(
+    agent: str = typer.Argument(..., help=f"Агент: {', '.join(AGENT_CONFIG)}"),
+    json_output: bool = typer.Option(False, "--json", help="Вывести результат в формате JSON"),
+):
+    """
+    Сгенерировать файлы команд агента из .specify/templates/commands без скачивания релиза.
+
+    Файлы уже установленных агентов не трогаются.
+
+    Примеры:
+        specify-ru agents add gemini
+    """
+    from .agents import AgentsError, add_agent
+    from .feature import get_repo_root
+
+    repo_root, _ = get_repo_root()
+    try:
+        change = add_agent(repo_root, agent)
+    except AgentsError as e:
+        console.print(f"[red]Ошибка:[/red] {e}")
+        raise typer.Exit(1)
+    _print_agent_changes([change], json_output)
+
+
+@agents_app.command("switch")
+def agents_switch(
+    agent: str = typer.Argument(..., help=f"Агент: {', '.join(AGENT_CONFIG)}"),
+    json_output: bool = typer.Option(False, "--json", help="Вывести результат в формате JSON"),
+):
+    """
+    Перейти на другого агента: сгенерировать его команды и удалить команды остальных.
+
+    Удаляются только сгенерированные файлы speckit.*; прочие файлы в каталогах
+    агентов остаются. Агент отмечается основным в .specify/install.json.
+
+    Примеры:
+        specify-ru agents switch claude
+    """
+    from .agents import AgentsError, switch_agent
+    from .feature import get_repo_root
+
+    repo_root, _ = get_repo_root()
+    try:
+        changes = switch_agent(repo_root, agent)
+    except AgentsError as e:
+        console.print(f"[red]Ошибка:[/red] {e}")
+        raise typer.Exit(1)
+    _print_agent_changes(changes, json_output)
+    if not json_output:
+        console.print(f"[dim]Контекстный файл агента создаст команда specify-ru update-context {agent}[/dim]")
+@app.command()
+def verify(
+    path: Path = typer.Argument(Path("."), help="Каталог проекта"),
+    repair: bool = typer.Option(False, "--repair", help="Восстановить отсутствующие и изменённые файлы из кэша шаблонов"),
+    json_output: bool = typer.Option(False, "--json", help="Вывести результат в формате JSON"),
+    jobs: Optional[int] = typer.Option(None, "--jobs", "-j", min=1, help="Число потоков хэширования"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Перечитать все файлы, не используя .specify/cache/verify.json"),
+):
+    """
+    Проверить, что скрипты, шаблоны и команды агентов совпадают с установленным релизом.
+
+    Сообщает об отсутствующих, изменённых и лишних файлах и о скриптах без
+    права на выполнение. --repair восстанавливает только повреждённые файлы;
+    лишние файлы не удаляются. Код завершения 1, если проблемы остались.
+
+    Примеры:
+        specify-ru verify
+        specify-ru verify --repair
+        specify-ru verify ~/src/app --json
+    """
+    from .verify import VerifyError, repair_project, verify_project
+
+    try:
+        report = verify_project(path, jobs=jobs, use_cache=not no_cache)
+    except VerifyError as e:
+        if json_output:
+            print(json.dumps({"ok": False, "error": str(e)}, ensure_ascii=False))
+        else:
+            console.print(f"[red]Ошибка:[/red] {e}")
+        raise typer.Exit(1)
+
+    if repair and report.issues:
+        repair_project(report)
+    fixed = set(report.repaired)
+    remaining = [i for i in report.issues if i.path not in fixed]
+
+    if json_output:
+        print(json.dumps(report.as_dict(), ensure_ascii=False))
+        raise typer.Exit(1 if remaining else 0)
+
+    labels = {
+        "missing": "[red]отсутствует[/red]",
+        "modified": "[yellow]изменён[/yellow]",
+        "mode": "[yellow]не исполняемый[/yellow]",
+        "extra": "[bright_black]лишний[/bright_black]",
+    }
+    for issue in report.issues:
+        mark = " [green]восстановлен[/green]" if issue.path in fixed else ""
+        console.print(f"  {labels[issue.status]} {escape(issue.path)}{mark}")
+    if report.unrepaired:
+        console.print(f"[yellow]Не удалось восстановить {len(report.unrepaired)}: нет подходящего архива в кэше; переустановите шаблон (init --here --force)[/yellow]")
+    summary = f"Файлов: {report.checked} (прочитано {report.hashed}); проблем: {len(remaining)}; {report.elapsed:.2f} с"
+    console.print(f"[{'red' if remaining else 'green'}]{summary}[/]")
+    if remaining:
+        raise typer.Exit(1)
+
+@app.command()
+def search(
+    query: str = typer.Argument(..., help="Поисковый запрос: слова в любой форме, идентификаторы FR-007, T012"),
+    limit: int = typer.Option(10, "--limit", "-n", min=1, help="Сколько разделов показать"),
+    feature: Optional[str] = typer.Option(None, "--feature", "-f", help="Только эта фича: номер (042) или имя каталога"),
+    kind: Optional[list[str]] = typer.Option(None, "--kind", "-k", help="Только эти документы: spec, plan, research, tasks (можно повторять)"),
+    json_output: bool = typer.Option(False, "--json", help="Вывести результат в формате JSON"),
+):
+    """
+    Полнотекстовый поиск по spec/plan/research/tasks всех фич с ранжированием BM25.
+
+    Индекс в .specify/cache/search.db учитывает словоформы (русский и
+    английский стемминг) и обновляется инкрементально: перечитываются только
+    изменившиеся файлы.
+
+    Примеры:
+        specify-ru search "экспорт отчётов в CSV"
+        specify-ru search "авторизация через OAuth" --kind spec --json
+        specify-ru search FR-007 --feature 042
+    """
+    from .feature import get_repo_root
+    from .search import DOCS, SearchError, run_search
+
+    kinds = tuple(kind) if kind else None
+    unknown = [k for k in kinds or () if k not in DOCS]
+    if unknown:
+        console.print(f"[red]Ошибка:[/red] неизвестный вид документа {', '.join(unknown)}; ожидается: {', '.join(DOCS)}")
+        raise typer.Exit(1)
+
+    repo_root, _ = get_repo_root()
+    try:
+        hits, stats, elapsed = run_search(repo_root, query, limit=limit, feature=feature, kinds=kinds)
+    except SearchError as e:
+        console.print(f"[red]Ошибка:[/red] {e}")
+        raise typer.Exit(1)
+
+    if json_output:
+        print(json.dumps({
+            "query": query,
+            "results": [h.as_dict() for h in hits],
+            "index": stats.as_dict(),
+            "elapsed_ms": round(elapsed * 1000, 1),
+        }, ensure_ascii=False))
+        return
+    if not hits:
+        console.print(f"[yellow]Ничего не найдено по запросу «{escape(query)}»[/yellow]")
+        raise typer.Exit(1)
+    for h in hits:
+        title = f" — {escape(h.title)}" if h.title else ""
+        console.print(f"[cyan]{h.path}:{h.line}[/cyan]{title}  [bright_black]{h.score:.2f}[/bright_black]")
+        if h.snippet:
+            console.print(f"    {escape(h.snippet)}")
+    console.print(f"[bright_black]Разделов: {len(hits)}; файлов в индексе: {stats.files} (переиндексировано {stats.indexed}); {elapsed * 1000:.0f} мс[/bright_black]")
+
 def main():
     app()
 
@@ -0,0 +1,290 @@
+"""
+Обновление контекстных файлов агентов по plan.md — Python-аналог
+scripts/bash/update-agent-context.sh.
+
+План разбирается один раз, после чего все файлы агентов обновляются за один
+проход. Файлы, у которых сгенерированные разделы не изменились, не
+перезаписываются; запись выполняется атомарно (временный файл + os.replace).
+"""
+
+import re
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import Optional
+
+from .feature import FeaturePaths
+from .fsutil import atomic_write_text
+
+# Context file per agent, relative to the repository root. Several agents share AGENTS.md.
+AGENT_CONTEXT_FILES = {
+    "claude": "CLAUDE.md",
+    "gemini": "GEMINI.md",
+    "copilot": ".github/copilot-instructions.md",
+    "cursor-agent": ".cursor/rules/specify-rules.mdc",
+    "qwen": "QWEN.md",
+    "opencode": "AGENTS.md",
+    "codex": "AGENTS.md",
+    "windsurf": ".windsurf/rules/specify-rules.md",
+    "kilocode": ".kilocode/rules/specify-rules.md",
+    "auggie": ".augment/rules/specify-rules.md",
+    "roo": ".roo/rules/specify-rules.md",
+    "codebuddy": "CODEBUDDY.md",
+    "q": "AGENTS.md",
+}
+
+DEFAULT_AGENT = "claude"
+
+TEMPLATE_RELATIVE_PATH = Path(".specify") / "templates" / "agent-file-template.md"
+
+# Plan fields: English labels (upstream template) and Russian labels (this template)
+PLAN_FIELD_LABELS = {
+    "language": ("Language/Version", "Язык/версия"),
+    "framework": ("Primary Dependencies", "Основные зависимости"),
+    "storage": ("Storage", "Хранилище"),
+    "project_type": ("Project Type", "Тип проекта"),
+}
+
+TECH_SECTION_HEADERS = ("## Active Technologies", "## Активные технологии")
+CHANGES_SECTION_HEADERS = ("## Recent Changes", "## Недавние изменения")
+
+_PLAN_FIELD_RE = re.compile(r"^\*\*(?P<label>[^*]+)\*\*:\s*(?P<value>.*?)\s*$")
+_LAST_UPDATED_RE = re.compile(r"((?:\*\*Last updated\*\*|Последнее обновление):.*?)\d{4}-\d{2}-\d{2}")
+_MAX_KEPT_CHANGES = 2
+
+
+class AgentContextError(RuntimeError):
+    """Ошибка окружения при обновлении контекстов агентов."""
+
+
+@dataclass(frozen=True)
+class PlanData:
+    """Технический контекст, извлечённый из plan.md."""
+
+    language: str = ""
+    framework: str = ""
+    storage: str = ""
+    project_type: str = ""
+
+    @property
+    def tech_stack(self) -> str:
+        return " + ".join(part for part in (self.language, self.framework) if part)
+
+    @property
+    def has_storage(self) -> bool:
+        return bool(self.storage)
+
+    def as_dict(self) -> dict:
+        return {
+            "language": self.language,
+            "framework": self.framework,
+            "storage": self.storage,
+            "project_type": self.project_type,
+        }
+
+
+@dataclass
+class ContextUpdate:
+    """Результат обработки одного контекстного файла."""
+
+    path: Path
+    agents: list[str] = field(default_factory=list)
+    status: str = "pending"  # created | updated | unchanged | error
+    error: Optional[str] = None
+
+
+def _clean_plan_value(value: str) -> str:
+    value = value.strip()
+    if "NEEDS CLARIFICATION" in value or value == "N/A":
+        return ""
+    return value
+
+
+def parse_plan_text(text: str) -> PlanData:
+    """Разобрать поля технического контекста за один проход по тексту плана."""
+    label_to_key = {label: key for key, labels in PLAN_FIELD_LABELS.items() for label in labels}
+    values: dict[str, str] = {}
+    for line in text.splitlines():
+        if not line.startswith("**"):
+            continue
+        m = _PLAN_FIELD_RE.match(line)
+        if not m:
+            continue
+        key = label_to_key.get(m.group("label").strip())
+        # The first occurrence wins, as with `grep | head -1` in the bash version
+        if key and key not in values:
+            values[key] = _clean_plan_value(m.group("value"))
+    return PlanData(**values)
+
+
+def parse_plan(plan_path: Path) -> PlanData:
+    return parse_plan_text(plan_path.read_text(encoding="utf-8"))
+
+
+def project_structure(project_type: str) -> str:
+    if "web" in project_type:
+        return "backend/\nfrontend/\ntests/"
+    return "src/\ntests/"
+
+
+def commands_for_language(language: str) -> str:
+    if "Python" in language:
+        return "cd src && pytest && ruff check ."
+    if "Rust" in language:
+        return "cargo test && cargo clippy"
+    if "JavaScript" in language or "TypeScript" in language:
+        return "npm test && npm run lint"
+    return f"# Добавьте команды для {language}"
+
+
+def render_new_context(template: str, plan: PlanData, *, project_name: str, branch: str, today: str) -> str:
+    """Заполнить шаблон agent-file-template.md данными плана."""
+    stack = plan.tech_stack
+    tech_line = f"- {stack} ({branch})" if stack else f"- ({branch})"
+    change_line = f"- {branch}: Добавлено {stack}" if stack else f"- {branch}: Добавлено"
+    substitutions = {
+        "[PROJECT NAME]": project_name,
+        "[DATE]": today,
+        "[EXTRACTED FROM ALL PLAN.MD FILES]": tech_line,
+        "[ACTUAL STRUCTURE FROM PLANS]": project_structure(plan.project_type),
+        "[ONLY COMMANDS FOR ACTIVE TECHNOLOGIES]": commands_for_language(plan.language),
+        "[LANGUAGE-SPECIFIC, ONLY FOR LANGUAGES IN USE]": f"{plan.language}: придерживайтесь стандартных соглашений",
+        "[LAST 3 FEATURES AND WHAT THEY ADDED]": change_line,
+    }
+    for placeholder, value in substitutions.items():
+        template = template.replace(placeholder, value)
+    return template
+
+
+def update_context_text(text: str, plan: PlanData, *, branch: str, today: Optional[str]) -> str:
+    """Обновить разделы технологий и последних изменений существующего файла.
+
+    Если today равно None, отметка времени не трогается — так проверяется,
+    изменились ли сгенерированные разделы по существу.
+    """
+    stack = plan.tech_stack
+    new_tech_entries = []
+    if stack and stack not in text:
+        new_tech_entries.append(f"- {stack} ({branch})")
+    if plan.has_storage and plan.storage not in text:
+        new_tech_entries.append(f"- {plan.storage} ({branch})")
+
+    if stack:
+        change_entry = f"- {branch}: Добавлено {stack}"
+    elif plan.has_storage:
+        change_entry = f"- {branch}: Добавлено {plan.storage}"
+    else:
+        change_entry = ""
+
+    out: list[str] = []
+    in_tech = in_changes = False
+    tech_added = False
+    kept_changes = 0
+
+    for line in text.splitlines():
+        is_header = line.startswith("## ")
+        if in_tech and (is_header or not line.strip()):
+            # New technologies go right before the end of the section
+            if not tech_added and new_tech_entries:
+                out.extend(new_tech_entries)
+                tech_added = True
+            if not is_header:
+                out.append(line)
+                continue
+            in_tech = False
+        if in_changes and is_header:
+            in_changes = False
+
+        if line in TECH_SECTION_HEADERS:
+            out.append(line)
+            in_tech = True
+            continue
+        if line in CHANGES_SECTION_HEADERS:
+            out.append(line)
+            if change_entry:
+                out.append(change_entry)
+            in_changes = True
+            continue
+        if in_changes and line.startswith("- "):
+            # Keep the two most recent entries; re-running for the same feature stays idempotent
+            if line != change_entry and kept_changes < _MAX_KEPT_CHANGES:
+                out.append(line)
+                kept_changes += 1
+            continue
+
+        if today and _LAST_UPDATED_RE.search(line):
+            out.append(_LAST_UPDATED_RE.sub(lambda m: m.group(1) + today, line))
+        else:
+            out.append(line)
+
+    if in_tech and not tech_added and new_tech_entries:
+        out.extend(new_tech_entries)
+
+    return "\n".join(out) + "\n" if out else ""
+
+
+def context_targets(repo_root: Path, agent: Optional[str] = None) -> dict[Path, list[str]]:
+    """Файлы для обновления: один агент или все существующие (по умолчанию — Claude)."""
+    if agent:
+        if agent not in AGENT_CONTEXT_FILES:
+            raise AgentContextError(
+                f"Неизвестный тип агента '{agent}'. Ожидается: {'|'.join(AGENT_CONTEXT_FILES)}"
+            )
+        return {repo_root / AGENT_CONTEXT_FILES[agent]: [agent]}
+
+    targets: dict[Path, list[str]] = {}
+    for key, rel in AGENT_CONTEXT_FILES.items():
+        path = repo_root / rel
+        if path.is_file():
+            targets.setdefault(path, []).append(key)
+    if not targets:
+        targets[repo_root / AGENT_CONTEXT_FILES[DEFAULT_AGENT]] = [DEFAULT_AGENT]
+    return targets
+
+
+def update_agent_contexts(paths: FeaturePaths, agent: Optional[str] = None, *, today: Optional[str] = None) -> tuple[PlanData, list[ContextUpdate]]:
+    """Разобрать plan.md текущей фичи и обновить контекстные файлы агентов.
+
+    Returns:
+        Кортеж (данные плана, результаты по каждому уникальному файлу)
+    """
+    if not paths.current_branch:
+        raise AgentContextError("Не удалось определить текущую фичу")
+    if not paths.impl_plan.is_file():
+        raise AgentContextError(f"plan.md не найден: {paths.impl_plan}")
+
+    plan = parse_plan(paths.impl_plan)
+    today = today or date.today().isoformat()
+    template_path = paths.repo_root / TEMPLATE_RELATIVE_PATH
+    template_text: Optional[str] = None
+
+    results: list[ContextUpdate] = []
+    for path, agents in context_targets(paths.repo_root, agent).items():
+        result = ContextUpdate(path=path, agents=agents)
+        results.append(result)
+        try:
+            if path.is_file():
+                original = path.read_text(encoding="utf-8")
+                if update_context_text(original, plan, branch=paths.current_branch, today=None) == original:
+                    result.status = "unchanged"
+                    continue
+                atomic_write_text(path, update_context_text(original, plan, branch=paths.current_branch, today=today))
+                result.status = "updated"
+            else:
+                if template_text is None:
+                    if not template_path.is_file():
+                        raise AgentContextError(f"Шаблон не найден: {template_path}")
+                    template_text = template_path.read_text(encoding="utf-8")
+                content = render_new_context(
+                    template_text,
+                    plan,
+                    project_name=paths.repo_root.name,
+                    branch=paths.current_branch,
+                    today=today,
+                )
+                atomic_write_text(path, content)
+                result.status = "created"
+        except (OSError, AgentContextError) as e:
+            result.status = "error"
+            result.error = str(e)
+    return plan, results
@@ -0,0 +1,320 @@
+"""
+Локальная генерация файлов команд агентов (`specify-ru agents add|switch`).
+
+Релиз кладёт канонические шаблоны команд в .specify/templates/commands/.
+Отсюда файлы команд любого агента рендерятся на месте так же, как это делает
+generate_commands в .github/workflows/scripts/create-release-packages.sh:
+подставляются {SCRIPT}, {AGENT_SCRIPT}, {ARGS} и __AGENT__, пути memory/,
+scripts/ и templates/ переписываются на .specify/, а результат сохраняется
+в формате и каталоге агента (Markdown, .prompt.md или TOML). Сеть и архив
+релиза для этого не нужны.
+
+Файлы рабочего пространства, которые релиз добавляет агенту помимо команд
+(.vscode/settings.json для copilot), берутся из тех же .specify/templates/.
+Существующие настройки не затираются: ключи шаблона вливаются в них.
+"""
+
+import json
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from .api import INSTALL_RECORD, manifest_entry, read_manifest, write_manifest
+from .fsutil import atomic_write_json, atomic_write_text, read_json
+
+TEMPLATES_RELATIVE_PATH = Path(".specify") / "templates"
+COMMANDS_RELATIVE_PATH = TEMPLATES_RELATIVE_PATH / "commands"
+COMMAND_PREFIX = "speckit"
+
+
+@dataclass(frozen=True)
+class CommandFormat:
+    directory: str  # relative to the project root
+    ext: str  # md | prompt.md | toml
+    args: str  # what {ARGS} becomes
+
+
+_MD = "$ARGUMENTS"
+_TOML = "{{args}}"
+
+# Mirrors the `case $agent` block of create-release-packages.sh
+COMMAND_FORMATS = {
+    "claude": CommandFormat(".claude/commands", "md", _MD),
+    "gemini": CommandFormat(".gemini/commands", "toml", _TOML),
+    "copilot": CommandFormat(".github/prompts", "prompt.md", _MD),
+    "cursor-agent": CommandFormat(".cursor/commands", "md", _MD),
+    "qwen": CommandFormat(".qwen/commands", "toml", _TOML),
+    "opencode": CommandFormat(".opencode/command", "md", _MD),
+    "windsurf": CommandFormat(".windsurf/workflows", "md", _MD),
+    "codex": CommandFormat(".codex/prompts", "md", _MD),
+    "kilocode": CommandFormat(".kilocode/workflows", "md", _MD),
+    "auggie": CommandFormat(".augment/commands", "md", _MD),
+    "roo": CommandFormat(".roo/commands", "md", _MD),
+    "codebuddy": CommandFormat(".codebuddy/commands", "md", _MD),
+    "q": CommandFormat(".amazonq/prompts", "md", _MD),
+}
+
+# Workspace files the release adds besides commands: path -> template in .specify/templates/
+AGENT_EXTRA_FILES = {
+    "copilot": {".vscode/settings.json": "vscode-settings.json"},
+}
+
+# Applied one after another, like the sed expressions of rewrite_paths
+_REWRITES = tuple((re.compile(rf"/?{name}/"), f".specify/{name}/") for name in ("memory", "scripts", "templates"))
+_SECTION_RE = re.compile(r"^[a-zA-Z].*:")
+
+
+class AgentsError(Exception):
+    """Файлы команд агента не могут быть сгенерированы."""
+
+
+@dataclass
+class AgentChange:
+    agent: str
+    directory: str
+    written: list[str] = field(default_factory=list)
+    unchanged: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+
+    def as_dict(self) -> dict:
+        return {
+            "agent": self.agent,
+            "directory": self.directory,
+            "written": self.written,
+            "unchanged": self.unchanged,
+            "removed": self.removed,
+        }
+
+
+def _frontmatter_value(lines: list[str], pattern: re.Pattern) -> Optional[str]:
+    for line in lines:
+        if pattern.match(line):
+            return pattern.sub("", line, count=1)
+    return None
+
+
+def _agent_script(lines: list[str], script: str) -> Optional[str]:
+    pattern = re.compile(rf"^\s*{re.escape(script)}:\s*")
+    inside = False
+    for line in lines:
+        if line == "agent_scripts:":
+            inside = True
+            continue
+        if inside and pattern.match(line):
+            return pattern.sub("", line, count=1)
+        if inside and re.match(r"^[a-zA-Z]", line):
+            inside = False
+    return None
+
+
+def _strip_script_sections(lines: list[str]) -> list[str]:
+    out: list[str] = []
+    dashes = 0
+    in_frontmatter = skipping = False
+    for line in lines:
+        if line == "---":
+            out.append(line)
+            dashes += 1
+            in_frontmatter = dashes == 1
+            continue
+        if in_frontmatter and line in ("scripts:", "agent_scripts:"):
+            skipping = True
+            continue
+        if in_frontmatter and skipping and _SECTION_RE.match(line):
+            skipping = False
+        if in_frontmatter and skipping and line[:1].isspace():
+            continue
+        out.append(line)
+    return out
+
+
+def render_command(template_text: str, agent: str, fmt: CommandFormat, script: str) -> str:
+    """Отрендерить один шаблон команды для агента и типа скриптов (sh|ps)."""
+    lines = template_text.replace("\r", "").split("\n")
+    description = _frontmatter_value(lines, re.compile(r"^description:\s*")) or ""
+    script_command = _frontmatter_value(lines, re.compile(rf"^\s*{re.escape(script)}:\s*"))
+    if script_command is None:
+        script_command = f"(Missing script command for {script})"
+    agent_script = _agent_script(lines, script)
+
+    body = "\n".join(_strip_script_sections(lines)).replace("{SCRIPT}", script_command)
+    if agent_script is not None:
+        body = body.replace("{AGENT_SCRIPT}", agent_script)
+    body = body.replace("{ARGS}", fmt.args).replace("__AGENT__", agent)
+    for pattern, replacement in _REWRITES:
+        body = pattern.sub(replacement, body)
+    body = body.rstrip("\n")
+
+    if fmt.ext == "toml":
+        body = body.replace("\\", "\\\\")
+        return f'description = "{description}"\n\nprompt = """\n{body}\n"""\n'
+    return body + "\n"
+
+
+def command_templates(project: Path) -> list[Path]:
+    commands_dir = project / COMMANDS_RELATIVE_PATH
+    templates = sorted(commands_dir.glob("*.md")) if commands_dir.is_dir() else []
+    if not templates:
+        raise AgentsError(
+            f"Шаблоны команд не найдены в {COMMANDS_RELATIVE_PATH.as_posix()}; "
+            "обновите проект командой specify-ru init --here --force"
+        )
+    return templates
+
+
+def command_files(project: Path, agent: str) -> dict[str, str]:
+    """Относительный путь файла команды -> содержимое для агента."""
+    if agent not in COMMAND_FORMATS:
+        raise AgentsError(f"Неизвестный агент '{agent}'. Ожидается: {', '.join(COMMAND_FORMATS)}")
+    fmt = COMMAND_FORMATS[agent]
+    script = project_script(project)
+    return {
+        f"{fmt.directory}/{COMMAND_PREFIX}.{path.stem}.{fmt.ext}": render_command(path.read_text(encoding="utf-8"), agent, fmt, script)
+        for path in command_templates(project)
+    }
+
+
+def _merge_settings(current: dict, template: dict) -> dict:
+    merged = dict(current)
+    for key, value in template.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge_settings(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def extra_files(project: Path, agent: str) -> dict[str, str]:
+    """Файлы рабочего пространства агента помимо команд (относительный путь -> содержимое).
+
+    Новый файл совпадает с шаблоном байт в байт, как в архиве релиза; в
+    существующий JSON вливаются ключи шаблона. Файл с комментариями (JSONC)
+    не изменяется.
+    """
+    files: dict[str, str] = {}
+    for rel, name in AGENT_EXTRA_FILES.get(agent, {}).items():
+        try:
+            template_text = (project / TEMPLATES_RELATIVE_PATH / name).read_text(encoding="utf-8")
+            template = json.loads(template_text)
+        except (OSError, ValueError):
+            # Projects installed from releases that did not ship the template
+            continue
+        try:
+            current = json.loads((project / rel).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            files[rel] = template_text
+            continue
+        except (OSError, ValueError):
+            continue
+        if isinstance(current, dict) and isinstance(template, dict):
+            merged = _merge_settings(current, template)
+            files[rel] = template_text if merged == template else json.dumps(merged, ensure_ascii=False, indent=4) + "\n"
+    return files
+
+
+def project_script(project: Path) -> str:
+    """Тип скриптов проекта: из .specify/install.json, иначе по каталогу .specify/scripts/."""
+    record = read_json(project / INSTALL_RECORD)
+    if isinstance(record, dict) and record.get("script") in ("sh", "ps"):
+        return record["script"]
+    scripts = project / ".specify" / "scripts"
+    if not (scripts / "bash").is_dir() and (scripts / "powershell").is_dir():
+        return "ps"
+    return "sh"
+
+
+def installed_agents(project: Path) -> list[str]:
+    """Агенты, у которых в проекте есть хотя бы один файл команд (порядок COMMAND_FORMATS)."""
+    return [
+        agent for agent, fmt in COMMAND_FORMATS.items()
+        if any((project / fmt.directory).glob(f"{COMMAND_PREFIX}.*.{fmt.ext}"))
+    ]
+
+
+def add_agent(project: Path, agent: str) -> AgentChange:
+    """Сгенерировать файлы команд агента; файлы с тем же содержимым не перезаписываются."""
+    files = {**command_files(project, agent), **extra_files(project, agent)}
+    change = AgentChange(agent=agent, directory=COMMAND_FORMATS[agent].directory)
+    for rel, content in files.items():
+        path = project / rel
+        try:
+            if path.read_text(encoding="utf-8") == content:
+                change.unchanged.append(rel)
+                continue
+        except (OSError, UnicodeDecodeError):
+            pass
+        atomic_write_text(path, content)
+        change.written.append(rel)
+    _update_manifest(project, files, [])
+    return change
+
+
+def remove_agent(project: Path, agent: str) -> AgentChange:
+    """Удалить сгенерированные файлы команд агента; чужие файлы в каталоге не трогаются.
+
+    Файлы рабочего пространства (.vscode/settings.json) удаляются, только если
+    они не отличаются от шаблона.
+    """
+    fmt = COMMAND_FORMATS[agent]
+    change = AgentChange(agent=agent, directory=fmt.directory)
+    directory = project / fmt.directory
+    for path in sorted(directory.glob(f"{COMMAND_PREFIX}.*.{fmt.ext}")):
+        path.unlink()
+        change.removed.append(f"{fmt.directory}/{path.name}")
+    directories = [directory]
+    for rel, name in AGENT_EXTRA_FILES.get(agent, {}).items():
+        path = project / rel
+        try:
+            if path.read_bytes() != (project / TEMPLATES_RELATIVE_PATH / name).read_bytes():
+                continue
+        except OSError:
+            continue
+        path.unlink()
+        change.removed.append(rel)
+        directories.append(path.parent)
+    _update_manifest(project, {}, change.removed)
+    # Drop directories left empty, up to (not including) the project root
+    for target in directories:
+        while target != project and project in target.parents:
+            try:
+                target.rmdir()
+            except OSError:
+                break
+            target = target.parent
+    return change
+
+
+def _update_manifest(project: Path, files: dict[str, str], removed: list[str]) -> None:
+    """Держать .specify/manifest.json в согласии с файлами команд, чтобы verify их не отмечал."""
+    manifest = read_manifest(project)
+    if manifest is None:
+        return
+    entries = manifest["files"]
+    before = dict(entries)
+    for rel, content in files.items():
+        entries[rel] = manifest_entry(rel, content.encode("utf-8"))
+    for rel in removed:
+        entries.pop(rel, None)
+    if entries != before:
+        manifest["files"] = dict(sorted(entries.items()))
+        write_manifest(project, manifest)
+
+
+def switch_agent(project: Path, agent: str) -> list[AgentChange]:
+    """Сгенерировать команды агента и удалить команды остальных установленных агентов."""
+    added = add_agent(project, agent)
+    changes = [added]
+    for other in installed_agents(project):
+        if other != agent:
+            changes.append(remove_agent(project, other))
+    record_agent(project, agent)
+    return changes
+
+
+def record_agent(project: Path, agent: str) -> None:
+    """Отметить агента основным в .specify/install.json (если запись об установке есть)."""
+    record = read_json(project / INSTALL_RECORD)
+    if isinstance(record, dict) and record.get("agent") != agent:
+        record["agent"] = agent
+        atomic_write_json(project / INSTALL_RECORD, record)
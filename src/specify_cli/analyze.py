@@ -0,0 +1,249 @@
+"""
+Детерминированный анализ согласованности spec.md, plan.md и tasks.md.
+
+Локальная предобработка для /specify-ru.analyze: артефакты разбираются
+структурно (specify_cli.artifacts, specify_cli.tasks_graph), после чего
+формальные проверки — покрытие требований и историй задачами, задачи-сироты,
+неразрешённые маркеры, дубли идентификаторов, циклы зависимостей — выполняются
+без модели. Агенту остаётся рассуждать только о найденных пунктах.
+
+Покрытие требования определяется по явной ссылке на его ID в задаче, а при
+её отсутствии — по пересечению значимых слов формулировки и описания задачи.
+"""
+
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+from .artifacts import Marker, PlanFields, SpecData, find_markers, parse_plan_fields, parse_spec_text
+from .tasks_graph import Task, build_graph, parse_tasks_text
+
+if TYPE_CHECKING:
+    from .lint import TemplateRules
+
+SEVERITY_ORDER = ("CRITICAL", "HIGH", "MEDIUM", "LOW")
+
+_REQUIREMENT_REF_RE = re.compile(r"\b(?:FR|NFR|SC)-\d+\b")
+_WORD_RE = re.compile(r"[a-zа-яё][a-zа-яё0-9]{3,}", re.IGNORECASE)
+_STEM_LENGTH = 6
+_STOPWORDS = frozenset({
+    "система", "должна", "должны", "должен", "должно", "пользователи", "пользователь", "пользователей",
+    "возможность", "иметь", "который", "которая", "которые", "чтобы", "также", "между", "через", "после",
+    "перед", "более", "менее", "всех", "если", "когда", "только", "каждый", "каждая", "например",
+    "system", "must", "should", "users", "user", "able", "with", "from", "that", "this", "when", "each",
+    "allow", "provide", "support", "ability",
+})
+
+
+@dataclass
+class Finding:
+    """Найденная проблема в формате таблицы отчёта analyze.md."""
+
+    category: str  # Coverage | Orphan | Ambiguity | Placeholder | Duplication | Inconsistency
+    severity: str
+    location: str
+    summary: str
+    refs: list[str] = field(default_factory=list)
+    id: str = ""
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "category": self.category,
+            "severity": self.severity,
+            "location": self.location,
+            "summary": self.summary,
+            "refs": self.refs,
+        }
+
+
+@dataclass
+class Coverage:
+    requirement: str
+    tasks: list[str] = field(default_factory=list)
+    match: Optional[str] = None  # id | keywords | None
+
+    def as_dict(self) -> dict:
+        return {"requirement": self.requirement, "tasks": self.tasks, "match": self.match}
+
+
+@dataclass
+class AnalysisReport:
+    spec: SpecData
+    plan: PlanFields
+    tasks: list[Task]
+    coverage: list[Coverage] = field(default_factory=list)
+    findings: list[Finding] = field(default_factory=list)
+
+    @property
+    def metrics(self) -> dict:
+        requirements = len(self.coverage)
+        covered = sum(1 for c in self.coverage if c.tasks)
+        return {
+            "requirements": requirements,
+            "stories": len(self.spec.stories),
+            "tasks": len(self.tasks),
+            "coverage_percent": round(100 * covered / requirements, 1) if requirements else 100.0,
+            "ambiguities": sum(1 for f in self.findings if f.category == "Ambiguity"),
+            "duplicates": sum(1 for f in self.findings if f.category == "Duplication"),
+            "critical": sum(1 for f in self.findings if f.severity == "CRITICAL"),
+        }
+
+    def as_dict(self) -> dict:
+        return {
+            "requirements": [r.as_dict() for r in self.spec.requirements],
+            "stories": [s.as_dict() for s in self.spec.stories],
+            "plan": self.plan.fields,
+            "coverage": [c.as_dict() for c in self.coverage],
+            "findings": [f.as_dict() for f in self.findings],
+            "metrics": self.metrics,
+        }
+
+
+def _stems(text: str) -> set[str]:
+    # Truncation is a crude but deterministic stemmer that copes with Russian inflection
+    return {
+        word[:_STEM_LENGTH]
+        for word in (w.lower() for w in _WORD_RE.findall(text))
+        if word not in _STOPWORDS
+    }
+
+
+def compute_coverage(spec: SpecData, tasks: list[Task]) -> list[Coverage]:
+    """Задачи, покрывающие каждое требование: по явной ссылке на ID или по общим словам."""
+    referenced: dict[str, list[str]] = {}
+    task_stems = {}
+    for task in tasks:
+        for ref in _REQUIREMENT_REF_RE.findall(task.description):
+            referenced.setdefault(ref, []).append(task.id)
+        task_stems[task.id] = _stems(task.description)
+
+    coverage: list[Coverage] = []
+    seen: set[str] = set()
+    for req in spec.requirements:
+        if req.id in seen:
+            continue
+        seen.add(req.id)
+        if req.id in referenced:
+            coverage.append(Coverage(req.id, referenced[req.id], "id"))
+            continue
+        stems = _stems(req.text)
+        # Short requirements need one shared word, longer ones at least two
+        needed = 1 if len(stems) <= 2 else 2
+        matched = [tid for tid, ts in task_stems.items() if stems and len(stems & ts) >= needed]
+        coverage.append(Coverage(req.id, matched, "keywords" if matched else None))
+    return coverage
+
+
+def _marker_findings(markers: list[Marker], filename: str) -> list[Finding]:
+    findings = []
+    for marker in markers:
+        if marker.kind == "clarification":
+            findings.append(Finding("Ambiguity", "HIGH", f"{filename}:L{marker.line}", f"Неразрешённый маркер NEEDS CLARIFICATION: {marker.text}"))
+        else:
+            findings.append(Finding("Placeholder", "MEDIUM", f"{filename}:L{marker.line}", f"Незаполненный плейсхолдер шаблона {marker.text}"))
+    return findings
+
+
+def _add_template_placeholders(markers: list[Marker], text: str, rules: Optional["TemplateRules"]) -> None:
+    if rules is None:
+        return
+    # Imported here: lint is only needed once template rules were loaded
+    from .lint import find_template_placeholders
+
+    seen = {(m.line, m.text) for m in markers}
+    markers.extend(m for m in find_template_placeholders(text, rules.placeholders) if (m.line, m.text) not in seen)
+    markers.sort(key=lambda m: m.line)
+
+
+def analyze_texts(
+    spec_text: str,
+    plan_text: str,
+    tasks_text: str,
+    rules: Optional[dict[str, "TemplateRules"]] = None,
+) -> AnalysisReport:
+    """Проанализировать тексты артефактов (без обращения к файловой системе).
+
+    rules — правила шаблонов (lint.load_rules): по ним находятся русские
+    плейсхолдеры вроде [краткий заголовок], которые не отличить от текста по виду.
+    """
+    rules = rules or {}
+    spec = parse_spec_text(spec_text)
+    plan = parse_plan_fields(plan_text)
+    _add_template_placeholders(spec.markers, spec_text, rules.get("spec"))
+    _add_template_placeholders(plan.markers, plan_text, rules.get("plan"))
+    tasks = parse_tasks_text(tasks_text)
+    report = AnalysisReport(spec=spec, plan=plan, tasks=tasks)
+    findings = report.findings
+
+    requirement_ids = {r.id for r in spec.requirements}
+    story_ids = {s.id for s in spec.stories}
+
+    seen: dict[str, int] = {}
+    for req in spec.requirements:
+        if req.id in seen:
+            findings.append(Finding("Duplication", "HIGH", f"spec.md:L{req.line}", f"Идентификатор {req.id} уже использован в строке {seen[req.id]}", [req.id]))
+        else:
+            seen[req.id] = req.line
+
+    report.coverage = compute_coverage(spec, tasks)
+    lines: dict[str, int] = {}
+    for req in spec.requirements:
+        lines.setdefault(req.id, req.line)
+    for cov in report.coverage:
+        if not cov.tasks:
+            severity = "HIGH" if cov.requirement.startswith(("FR-", "NFR-")) else "MEDIUM"
+            findings.append(Finding("Coverage", severity, f"spec.md:L{lines[cov.requirement]}", f"Требование {cov.requirement} не покрыто ни одной задачей", [cov.requirement]))
+
+    tagged: dict[str, list[str]] = {}
+    for task in tasks:
+        if task.story:
+            tagged.setdefault(task.story, []).append(task.id)
+    for story in spec.stories:
+        if story.id not in tagged:
+            findings.append(Finding("Coverage", "HIGH", f"spec.md:L{story.line}", f"Для истории {story.id} ({story.title}) нет задач с меткой [{story.id}]", [story.id]))
+
+    for task in tasks:
+        if task.story and spec.stories and task.story not in story_ids:
+            findings.append(Finding("Orphan", "HIGH", f"tasks.md:L{task.line}", f"Задача {task.id} помечена [{task.story}], но такой истории нет в spec.md", [task.id, task.story]))
+        unknown = sorted({ref for ref in _REQUIREMENT_REF_RE.findall(task.description) if ref not in requirement_ids})
+        if unknown:
+            findings.append(Finding("Orphan", "MEDIUM", f"tasks.md:L{task.line}", f"Задача {task.id} ссылается на несуществующие требования: {', '.join(unknown)}", [task.id, *unknown]))
+
+    findings.extend(_marker_findings(spec.markers, "spec.md"))
+    findings.extend(_marker_findings(plan.markers, "plan.md"))
+    marker_lines = {m.line for m in plan.markers if m.kind == "clarification"}
+    for label, value in plan.fields.items():
+        line = plan.lines[label]
+        if line not in marker_lines and (not value or (value.startswith("[") and value.endswith("]"))):
+            findings.append(Finding("Placeholder", "MEDIUM", f"plan.md:L{line}", f"Поле «{label}» технического контекста не заполнено"))
+    findings.extend(_marker_findings([m for m in find_markers(tasks_text) if m.kind == "clarification"], "tasks.md"))
+
+    graph = build_graph(tasks)
+    task_lines = {t.id: t.line for t in tasks}
+    for tid in graph.duplicates:
+        findings.append(Finding("Duplication", "HIGH", "tasks.md", f"Идентификатор задачи {tid} встречается несколько раз", [tid]))
+    for item in graph.missing:
+        findings.append(Finding("Inconsistency", "MEDIUM", f"tasks.md:L{task_lines[item['task']]}", f"Задача {item['task']} зависит от несуществующей задачи {item['ref']}", [item["task"], item["ref"]]))
+    for cycle in graph.cycles:
+        findings.append(Finding("Inconsistency", "HIGH", f"tasks.md:L{task_lines[cycle[0]]}", f"Циклическая зависимость задач: {' → '.join(cycle + cycle[:1])}", cycle))
+
+    findings.sort(key=lambda f: SEVERITY_ORDER.index(f.severity))
+    for n, finding in enumerate(findings, start=1):
+        finding.id = f"A{n}"
+    return report
+
+
+def analyze_feature(feature_dir: Path, root: Optional[Path] = None) -> AnalysisReport:
+    """Проанализировать spec.md, plan.md и tasks.md каталога фичи.
+
+    root — корень проекта с шаблонами; по умолчанию каталог над specs/.
+    """
+    def read(name: str) -> str:
+        return (feature_dir / name).read_text(encoding="utf-8")
+
+    from .lint import load_rules
+
+    rules = load_rules(root or feature_dir.parent.parent)
+    return analyze_texts(read("spec.md"), read("plan.md"), read("tasks.md"), rules)
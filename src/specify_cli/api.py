@@ -0,0 +1,1384 @@
+"""
+Встраиваемый API инициализации проекта: без интерактива и вывода в консоль.
+
+Для сервисов, которые создают проекты из долгоживущего процесса (портал,
+бот, CI-агент) и не хотят запускать `specify-ru init` отдельным процессом
+на каждый запрос:
+
+    from specify_cli.api import init_project
+
+    result = init_project("/srv/projects/demo", "claude", "sh", client=shared_client)
+
+Функции не используют глобальное состояние CLI (console, Live, os.chdir) и
+безопасны при одновременном вызове из нескольких потоков: каждый вызов
+скачивает архивы в свой временный каталог, git запускается с cwd=, кэш слоёв
+шаблона пополняется атомарно, а инициализации одного и того же каталога
+выполняются по очереди. Ошибки передаются исключениями SpecifyError, ход
+выполнения — необязательным коллбэком progress(step, status, detail), где
+status совпадает с именем метода StepTracker: start | complete | error | skip.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Iterator, Optional, Tuple, Union
+
+from . import (
+    AGENT_CONFIG,
+    LAYER_MANIFEST_PREFIX,
+    LAYER_SCHEMA_VERSION,
+    SCRIPT_TYPE_CHOICES,
+    _github_auth_headers,
+    _layer_cache_dir,
+    _new_http_client,
+    is_git_repo,
+)
+from .fsutil import atomic_write_json, read_json
+
+if TYPE_CHECKING:
+    import httpx
+
+REPO_OWNER = "zemlyanin7"
+REPO_NAME = "spec-kit-ru"
+RELEASE_API_URL = f"https://api.github.com/repos/{REPO_OWNER}/{REPO_NAME}/releases/latest"
+# Release assets have stable URLs, so a known tag needs no API request
+RELEASE_DOWNLOAD_URL = f"https://github.com/{REPO_OWNER}/{REPO_NAME}/releases/download"
+
+# progress(step, status, detail) and on_chunk(bytes_written, total_bytes)
+ProgressCallback = Callable[[str, str, str], None]
+ChunkCallback = Callable[[int, int], None]
+
+
+class SpecifyError(Exception):
+    """Базовое исключение API инициализации."""
+
+
+class InvalidOptionError(SpecifyError, ValueError):
+    """Неизвестный ИИ-агент или тип скриптов."""
+
+
+class ProjectExistsError(SpecifyError, FileExistsError):
+    """Каталог проекта уже существует, а объединение с ним не разрешено."""
+
+
+class ReleaseError(SpecifyError):
+    """Не удалось получить описание последнего релиза из GitHub API."""
+
+
+class TemplateNotFoundError(ReleaseError):
+    """В релизе нет шаблона для выбранной пары агент/скрипт."""
+
+    def __init__(self, pattern: str, assets: list[str]):
+        super().__init__(f"Подходящий файл релиза не найден (ожидался шаблон: {pattern})")
+        self.pattern = pattern
+        self.assets = assets
+
+
+class DownloadError(SpecifyError):
+    """Ошибка скачивания архива шаблона или слоя."""
+
+
+class ChecksumError(DownloadError):
+    """Контрольная сумма скачанного слоя не совпала с манифестом."""
+
+
+class ExtractError(SpecifyError):
+    """Ошибка распаковки шаблона в каталог проекта."""
+
+
+class InitCancelled(SpecifyError):
+    """Инициализация отменена (Deadline.cancel); phase — шаг, на котором это обнаружено."""
+
+    def __init__(self, message: str, phase: str):
+        super().__init__(message)
+        self.phase = phase
+
+
+class DeadlineExceeded(InitCancelled, TimeoutError):
+    """Исчерпан бюджет времени init_project (timeout=)."""
+
+
+class Deadline:
+    """Бюджет времени и флаг отмены одного вызова init_project.
+
+    Шаги проверяют его сами (check) между чанками, файлами и командами, а
+    сетевые таймауты и таймаут git ограничиваются оставшимся временем
+    (remaining). cancel() можно вызвать из другого потока.
+    """
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.timeout = timeout
+        self.expires = time.monotonic() + timeout if timeout is not None else None
+        self._cancelled = threading.Event()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    def remaining(self, cap: Optional[float] = None) -> Optional[float]:
+        """Оставшееся время, но не больше cap; None — без ограничения."""
+        if self.expires is None:
+            return cap
+        left = max(0.0, self.expires - time.monotonic())
+        return left if cap is None else min(cap, left)
+
+    def check(self, phase: str) -> None:
+        if self._cancelled.is_set():
+            raise InitCancelled(f"Инициализация отменена на шаге {phase}", phase)
+        if self.expires is not None and time.monotonic() >= self.expires:
+            raise DeadlineExceeded(f"Бюджет времени {self.timeout:g} с исчерпан на шаге {phase}", phase)
+
+
+# Shared by calls that pass no deadline: never expires and is never cancelled
+_NO_DEADLINE = Deadline()
+
+
+class _Journal:
+    """Журнал изменений в существующем каталоге (init --here) для отката при ошибке.
+
+    Перед записью файла вызывается record(): существующий файл переносится в
+    резервный каталог внутри проекта (os.replace, без копирования), новый путь
+    запоминается. undo() удаляет созданное этим запуском и возвращает
+    перенесённые файлы на место; ничего другого в каталоге не трогается.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.created: list[Path] = []
+        self.saved: dict[Path, Path] = {}
+        self._seen: set[Path] = set()
+        self._backup: Optional[Path] = None
+
+    def record(self, path: Path) -> None:
+        if path in self._seen:
+            return
+        self._seen.add(path)
+        if path.is_symlink() or path.is_file():
+            if self._backup is None:
+                self._backup = self.root / f".specify-rollback-{uuid.uuid4().hex}"
+                self._backup.mkdir()
+            saved = self._backup / str(len(self.saved))
+            os.replace(path, saved)
+            self.saved[path] = saved
+            return
+        if path.exists():
+            return
+        # Remember the outermost directory this run creates: removing it removes the rest
+        missing = path
+        while not missing.parent.exists() and missing.parent != self.root:
+            missing = missing.parent
+        if missing not in self._seen or missing == path:
+            self._seen.add(missing)
+            self.created.append(missing)
+
+    def undo(self) -> None:
+        for path in reversed(self.created):
+            if path.is_dir() and not path.is_symlink():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+        for path, saved in self.saved.items():
+            try:
+                if path.is_dir() and not path.is_symlink():
+                    shutil.rmtree(path, ignore_errors=True)
+                os.replace(saved, path)
+            except OSError:
+                pass
+        self.discard()
+
+    def discard(self) -> None:
+        if self._backup is not None:
+            shutil.rmtree(self._backup, ignore_errors=True)
+            self._backup = None
+
+
+@dataclass
+class InitResult:
+    """Итог init_project."""
+
+    project_path: Path
+    agent: str
+    script: str
+    release: str = ""
+    template: str = ""
+    layered: bool = False
+    cache_hits: int = 0
+    downloaded: int = 0  # bytes fetched over the network
+    files: int = 0  # files written to the project
+    executable_scripts: int = 0
+    chmod_failures: list[str] = field(default_factory=list)
+    git: str = "disabled"  # initialized | existing | failed | unavailable | disabled
+    git_error: Optional[str] = None
+    manifest: Optional[dict] = field(default=None, repr=False)  # written to .specify/manifest.json
+    lock: Optional[dict] = field(default=None, repr=False)  # written to .specify/lock.json
+
+    def as_dict(self) -> dict:
+        return {
+            "project_path": str(self.project_path),
+            "agent": self.agent,
+            "script": self.script,
+            "release": self.release,
+            "template": self.template,
+            "layered": self.layered,
+            "cache_hits": self.cache_hits,
+            "downloaded": self.downloaded,
+            "files": self.files,
+            "executable_scripts": self.executable_scripts,
+            "chmod_failures": self.chmod_failures,
+            "git": self.git,
+            "git_error": self.git_error,
+        }
+
+
+def _no_progress(step: str, status: str, detail: str = "") -> None:
+    pass
+
+
+def _stream_to_file(client: "httpx.Client", url: str, dest: Path, *, headers: dict, timeout: float = 60, on_chunk: Optional[ChunkCallback] = None, deadline: Deadline = _NO_DEADLINE) -> int:
+    """Скачать URL потоком в файл. Возвращает количество записанных байт."""
+    written = 0
+    deadline.check("download")
+    with client.stream("GET", url, timeout=deadline.remaining(timeout), follow_redirects=True, headers=headers) as response:
+        if response.status_code != 200:
+            response.read()
+            body_sample = response.text[:400]
+            raise DownloadError(f"Скачивание завершилось с кодом {response.status_code}\nHeaders: {response.headers}\nBody (truncated): {body_sample}")
+        total_size = int(response.headers.get("content-length", 0))
+        with open(dest, "wb") as f:
+            for chunk in response.iter_bytes(chunk_size=8192):
+                deadline.check("download")
+                f.write(chunk)
+                written += len(chunk)
+                if on_chunk and total_size:
+                    on_chunk(written, total_size)
+    return written
+
+
+def _sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _fetch_layer(client: Optional["httpx.Client"], entry: dict, url: Optional[str], *, headers: dict, cache_dir: Path, on_chunk: Optional[ChunkCallback], deadline: Deadline = _NO_DEADLINE, verify_hit: bool = False) -> Tuple[Path, bool]:
+    """Вернуть путь к архиву в кэше, скачав его при промахе.
+
+    Архив хранится под sha256 содержимого. Если entry не содержит sha256
+    (полный архив релиза без digest), архив скачивается и сохраняется под
+    хэшем полученного содержимого. verify_hit — пересчитать хэш найденного
+    в кэше файла и скачать заново при несовпадении.
+
+    Returns:
+        Кортеж (путь к zip-архиву, было ли попадание в кэш)
+    """
+    digest = (entry.get("sha256") or "").lower()
+    if digest:
+        target = cache_dir / f"{digest}.zip"
+        if target.is_file() and (not verify_hit or _sha256_file(target) == digest):
+            _touch(target)
+            return target, True
+    if client is None or not url:
+        raise DownloadError(f"{entry['name']}: архива нет в кэше, а скачать его неоткуда")
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{(digest or 'archive')[:12]}-", suffix=".part", dir=cache_dir)
+    os.close(fd)
+    tmp_path = Path(tmp_name)
+    try:
+        _stream_to_file(client, url, tmp_path, headers=headers, on_chunk=on_chunk, deadline=deadline)
+        actual = _sha256_file(tmp_path)
+        if digest and actual != digest:
+            raise ChecksumError(f"Контрольная сумма {entry['name']} не совпадает: ожидалось {digest}, получено {actual}")
+        target = cache_dir / f"{actual}.zip"
+        # Atomic publish: concurrent runs either see the whole file or none
+        try:
+            os.replace(tmp_path, target)
+        except OSError:
+            # Windows refuses to replace a file another job has open; that copy has the same content
+            if not target.is_file():
+                raise
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    _auto_prune(cache_dir)
+    return target, False
+
+
+def _lock_entry(name: str, url: Optional[str], path: Path) -> dict:
+    return {"name": name, "url": url, "size": path.stat().st_size, "sha256": path.stem}
+
+
+def _download_layers(client: "httpx.Client", assets: list, agent: str, script: str, release_tag: str, *, headers: dict, cache_dir: Path, on_chunk: Optional[ChunkCallback], deadline: Deadline = _NO_DEADLINE) -> Tuple[Optional[Tuple[Path, dict]], Optional[str]]:
+    """Получить шаблон в виде базового слоя и оверлея агента, если релиз их публикует.
+
+    Базовый слой (.specify/) общий для всех агентов одного типа скриптов и
+    кэшируется по sha256, поэтому для каждого следующего агента скачивается
+    только небольшой оверлей.
+
+    Returns:
+        Кортеж (результат или None, причина отказа от слоёв или None). None без
+        причины — в релизе нет манифеста слоёв или записи для пары агент/скрипт.
+    """
+    by_name = {a.get("name"): a for a in assets}
+    manifest_asset = next(
+        (a for name, a in by_name.items() if name and name.startswith(LAYER_MANIFEST_PREFIX) and name.endswith(".json")),
+        None,
+    )
+    if manifest_asset is None:
+        return None, None
+
+    try:
+        deadline.check("download")
+        response = client.get(manifest_asset["browser_download_url"], timeout=deadline.remaining(30), follow_redirects=True, headers=headers)
+        if response.status_code != 200:
+            raise RuntimeError(f"Манифест слоёв вернул код {response.status_code}")
+        manifest = response.json()
+    except InitCancelled:
+        raise
+    except Exception as e:
+        # Layers are an optimisation: fall back to the full archive, unless time is up
+        deadline.check("download")
+        return None, str(e)
+
+    if manifest.get("schema") != LAYER_SCHEMA_VERSION:
+        return None, None
+    base_entry = manifest.get("base", {}).get(script)
+    overlay_entry = manifest.get("overlays", {}).get(agent, {}).get(script)
+    if not base_entry or not overlay_entry:
+        return None, None
+    if base_entry["name"] not in by_name or overlay_entry["name"] not in by_name:
+        return None, None
+
+    layer_paths: list[Path] = []
+    downloaded = 0
+    hits = 0
+    for entry in (base_entry, overlay_entry):
+        try:
+            path, hit = _fetch_layer(client, entry, by_name[entry["name"]]["browser_download_url"], headers=headers, cache_dir=cache_dir, on_chunk=on_chunk, deadline=deadline)
+        except SpecifyError:
+            raise
+        except Exception as e:
+            deadline.check("download")
+            raise DownloadError(f"{entry['name']}: {e}") from e
+        layer_paths.append(path)
+        if hit:
+            hits += 1
+        else:
+            downloaded += entry["size"]
+
+    metadata = {
+        "filename": overlay_entry["name"],
+        "size": base_entry["size"] + overlay_entry["size"],
+        "release": release_tag,
+        "asset_url": by_name[overlay_entry["name"]]["browser_download_url"],
+        "layers": layer_paths,
+        "layered": True,
+        "cached": True,
+        "cache_hits": hits,
+        "downloaded": downloaded,
+        "assets": [
+            _lock_entry(entry["name"], by_name[entry["name"]]["browser_download_url"], path)
+            for entry, path in zip((base_entry, overlay_entry), layer_paths)
+        ],
+    }
+    return (layer_paths[-1], metadata), None
+
+
+# Provenance of an installed project: release, agent and script it was created from
+INSTALL_RECORD = Path(".specify") / "install.json"
+
+# Hashes of the installed template files, checked by `specify-ru verify`
+MANIFEST_RELATIVE_PATH = Path(".specify") / "manifest.json"
+MANIFEST_VERSION = 1
+MANIFEST_PREFIXES = (".specify/scripts/", ".specify/templates/")
+# Agent command files are named speckit.<command>.<ext> in every agent folder
+COMMAND_FILE_PREFIX = "speckit."
+
+# Exact release assets a project was installed from, for `init --locked`
+LOCK_RELATIVE_PATH = Path(".specify") / "lock.json"
+LOCK_VERSION = 1
+
+# Index of a bundle imported with `specify-ru bundle import`, kept next to the cached objects
+OFFLINE_INDEX = "offline.json"
+OFFLINE_ENV = "SPECIFY_OFFLINE"
+
+
+def offline_default() -> bool:
+    """Автономный режим по умолчанию: переменная окружения SPECIFY_OFFLINE=1."""
+    return os.getenv(OFFLINE_ENV, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def read_offline_index(cache_dir: Optional[Path] = None) -> dict:
+    """Индекс импортированного пакета шаблонов; ReleaseError, если пакет не импортирован."""
+    index_path = (Path(cache_dir) if cache_dir else _layer_cache_dir()) / OFFLINE_INDEX
+    try:
+        index = json.loads(index_path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        raise ReleaseError(f"Пакет шаблонов не импортирован ({index_path}); выполните specify-ru bundle import") from None
+    except (OSError, ValueError) as e:
+        raise ReleaseError(f"Не удалось прочитать {index_path}: {e}") from e
+    if not isinstance(index, dict) or "templates" not in index:
+        raise ReleaseError(f"Некорректный индекс пакета шаблонов: {index_path}")
+    return index
+
+
+def offline_template(agent: str, script: str, *, cache_dir: Optional[Path] = None) -> Tuple[Path, dict]:
+    """Шаблон из импортированного пакета в формате результата download_template, без сети."""
+    cache = Path(cache_dir) if cache_dir else _layer_cache_dir()
+    index = read_offline_index(cache)
+    entry = index["templates"].get(agent, {}).get(script)
+    if not entry:
+        available = [f"{a}:{s}" for a, scripts in sorted(index["templates"].items()) for s in sorted(scripts)]
+        raise TemplateNotFoundError(f"{agent}:{script} в пакете {index['release']['tag_name']}", available)
+    paths = [cache / f"{digest}.zip" for digest in entry["objects"]]
+    missing = [p.name for p in paths if not p.is_file()]
+    if missing:
+        raise DownloadError(f"В локальном кэше нет объектов пакета: {', '.join(missing)}; повторите specify-ru bundle import")
+    metadata = {
+        "filename": entry["filename"],
+        "size": entry["size"],
+        "release": index["release"]["tag_name"],
+        "asset_url": f"bundle:{entry['filename']}",
+        "layers": paths,
+        "cached": True,
+        "cache_hits": len(paths),
+        "downloaded": 0,
+        "offline": True,
+        # A bundle records no download URLs: a lock written from it is served from the cache only
+        "assets": [_lock_entry(p.name, None, p) for p in paths],
+    }
+    return paths[-1], metadata
+
+
+# Layer cache limits: objects unused this long are evicted first, then the oldest ones
+# until the cache fits the size budget. Downloads prune at most once per interval.
+LAYER_CACHE_MAX_AGE = 90 * 24 * 3600
+LAYER_CACHE_MAX_BYTES = 200 * 1024 * 1024
+_AUTO_PRUNE_MARKER = ".last-prune"
+_AUTO_PRUNE_INTERVAL = 24 * 3600
+# Leftovers of interrupted downloads older than this are removed
+_STALE_PART_AGE = 3600
+
+
+@dataclass
+class PruneResult:
+    """Итог prune_layer_cache."""
+
+    cache_dir: Path
+    removed: list[str] = field(default_factory=list)
+    freed: int = 0  # bytes
+    kept: int = 0
+    kept_bytes: int = 0
+    pinned: int = 0  # objects of the imported bundle, never evicted
+
+    def as_dict(self) -> dict:
+        return {
+            "cache_dir": str(self.cache_dir),
+            "removed": self.removed,
+            "freed": self.freed,
+            "kept": self.kept,
+            "kept_bytes": self.kept_bytes,
+            "pinned": self.pinned,
+        }
+
+
+def _touch(path: Path) -> None:
+    # mtime doubles as the last-use time for eviction; atime is unreliable under noatime
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def prune_layer_cache(
+    cache_dir: Optional[Path] = None,
+    *,
+    max_age: Optional[float] = LAYER_CACHE_MAX_AGE,
+    max_bytes: Optional[int] = LAYER_CACHE_MAX_BYTES,
+    dry_run: bool = False,
+) -> PruneResult:
+    """Удалить из кэша слоёв давно не использованные архивы.
+
+    Сначала удаляются архивы, не использованные дольше max_age секунд, затем
+    самые старые — пока кэш больше max_bytes (None отключает ограничение).
+    Объекты импортированного пакета (offline.json) не удаляются.
+    """
+    cache = Path(cache_dir) if cache_dir else _layer_cache_dir()
+    result = PruneResult(cache_dir=cache)
+    try:
+        index = read_offline_index(cache)
+        pinned = {d for scripts in index["templates"].values() for entry in scripts.values() for d in entry["objects"]}
+    except (ReleaseError, AttributeError, KeyError, TypeError):
+        pinned = set()
+    try:
+        entries = list(os.scandir(cache))
+    except FileNotFoundError:
+        return result
+
+    now = time.time()
+    doomed: list[tuple[int, Path]] = []
+    objects: list[tuple[float, int, Path]] = []
+    for entry in entries:
+        try:
+            st = entry.stat()
+        except OSError:
+            continue
+        path = Path(entry.path)
+        if entry.name.endswith(".part"):
+            if now - st.st_mtime > _STALE_PART_AGE:
+                doomed.append((st.st_size, path))
+        elif entry.name.endswith(".zip"):
+            if path.stem in pinned:
+                result.pinned += 1
+                result.kept += 1
+                result.kept_bytes += st.st_size
+            else:
+                objects.append((st.st_mtime, st.st_size, path))
+
+    # Oldest first: evict expired objects, then keep evicting until the cache fits
+    objects.sort()
+    total = result.kept_bytes + sum(size for _, size, _ in objects)
+    for mtime, size, path in objects:
+        if (max_age is not None and now - mtime > max_age) or (max_bytes is not None and total > max_bytes):
+            doomed.append((size, path))
+            total -= size
+        else:
+            result.kept += 1
+            result.kept_bytes += size
+
+    for size, path in doomed:
+        if not dry_run:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue
+        result.removed.append(path.name)
+        result.freed += size
+    return result
+
+
+def _auto_prune(cache: Path) -> None:
+    """Ограничить кэш после записи нового архива, не чаще раза в _AUTO_PRUNE_INTERVAL."""
+    marker = cache / _AUTO_PRUNE_MARKER
+    try:
+        if time.time() - marker.stat().st_mtime < _AUTO_PRUNE_INTERVAL:
+            return
+    except FileNotFoundError:
+        pass
+    except OSError:
+        return
+    try:
+        marker.touch()
+        prune_layer_cache(cache)
+    except OSError:
+        pass
+
+
+def release_asset_url(tag: str, name: str) -> str:
+    """Прямой URL артефакта релиза на GitHub (без обращения к API)."""
+    return f"{RELEASE_DOWNLOAD_URL}/{tag}/{name}"
+
+
+def pinned_release(tag: str, agent: str, script: str) -> dict:
+    """Описание релиза tag в формате fetch_release, построенное без API по именам артефактов.
+
+    Имена артефактов задаёт create-release-packages.sh; размеры неизвестны
+    до скачивания. Если в релизе нет слоёв, download_template возьмёт полный архив.
+    """
+    names = (
+        f"{LAYER_MANIFEST_PREFIX}{tag}.json",
+        f"spec-kit-layer-base-{script}-{tag}.zip",
+        f"spec-kit-layer-{agent}-{script}-{tag}.zip",
+        f"spec-kit-template-{agent}-{script}-{tag}.zip",
+    )
+    return {
+        "tag_name": tag,
+        "pinned": True,
+        "assets": [{"name": name, "size": None, "browser_download_url": release_asset_url(tag, name)} for name in names],
+    }
+
+
+def build_lock(result: "InitResult", assets: list[dict]) -> dict:
+    """Содержимое .specify/lock.json: релиз, агент, скрипт и архивы с URL, размером и sha256."""
+    return {
+        "version": LOCK_VERSION,
+        "release": result.release,
+        "agent": result.agent,
+        "script": result.script,
+        "template": result.template,
+        "assets": assets,
+    }
+
+
+def read_lock(project_path: Path) -> Optional[dict]:
+    """Прочитать .specify/lock.json; None, если файла нет, ReleaseError, если он некорректен."""
+    path = Path(project_path) / LOCK_RELATIVE_PATH
+    if not path.is_file():
+        return None
+    lock = read_json(path)
+    valid = (
+        isinstance(lock, dict)
+        and lock.get("version") == LOCK_VERSION
+        and isinstance(lock.get("release"), str)
+        and isinstance(lock.get("assets"), list)
+        and lock["assets"]
+        and all(
+            isinstance(a, dict) and isinstance(a.get("name"), str)
+            and isinstance(a.get("sha256"), str) and len(a["sha256"]) == 64
+            for a in lock["assets"]
+        )
+    )
+    if not valid:
+        raise ReleaseError(f"Некорректный {LOCK_RELATIVE_PATH.as_posix()} в {project_path}")
+    return lock
+
+
+def write_lock(project_path: Path, lock: dict) -> None:
+    atomic_write_json(project_path / LOCK_RELATIVE_PATH, lock)
+
+
+def download_locked(
+    lock: dict,
+    *,
+    client: Optional["httpx.Client"] = None,
+    cache_dir: Optional[Path] = None,
+    github_token: Optional[str] = None,
+    on_chunk: Optional[ChunkCallback] = None,
+    deadline: Deadline = _NO_DEADLINE,
+) -> Tuple[Path, dict]:
+    """Получить ровно те архивы, что записаны в lock.json: из кэша или по их URL, без API.
+
+    Хэш каждого архива сверяется с lock.json, в том числе при попадании в
+    кэш. Кэш пополняется атомарно, поэтому параллельные установки из одного
+    lock.json безопасны. Результат — в формате download_template.
+    """
+    cache = Path(cache_dir) if cache_dir else _layer_cache_dir()
+    headers = _github_auth_headers(github_token)
+    paths: list[Path] = []
+    hits = downloaded = 0
+    for entry in lock["assets"]:
+        try:
+            path, hit = _fetch_layer(client, entry, entry.get("url"), headers=headers, cache_dir=cache, on_chunk=on_chunk, deadline=deadline, verify_hit=True)
+        except SpecifyError:
+            raise
+        except Exception as e:
+            deadline.check("download")
+            raise DownloadError(f"{entry['name']}: {e}") from e
+        paths.append(path)
+        if hit:
+            hits += 1
+        else:
+            downloaded += path.stat().st_size
+    metadata = {
+        "filename": lock.get("template") or lock["assets"][-1]["name"],
+        "size": sum(p.stat().st_size for p in paths),
+        "release": lock["release"],
+        "asset_url": lock["assets"][-1].get("url") or "",
+        "layers": paths,
+        "layered": len(paths) > 1,
+        "cached": True,
+        "cache_hits": hits,
+        "downloaded": downloaded,
+        "assets": lock["assets"],
+    }
+    return paths[-1], metadata
+
+
+def fetch_release(client: "httpx.Client", *, github_token: Optional[str] = None, debug: bool = False, deadline: Deadline = _NO_DEADLINE) -> dict:
+    """Описание последнего релиза шаблонов из GitHub API."""
+    deadline.check("fetch")
+    try:
+        response = client.get(RELEASE_API_URL, timeout=deadline.remaining(30), follow_redirects=True, headers=_github_auth_headers(github_token))
+    except Exception as e:
+        deadline.check("fetch")
+        raise ReleaseError(f"Запрос к {RELEASE_API_URL} не выполнен: {e}") from e
+    if response.status_code != 200:
+        msg = f"GitHub API returned {response.status_code} for {RELEASE_API_URL}"
+        if debug:
+            msg += f"\nResponse headers: {response.headers}\nBody (truncated 500): {response.text[:500]}"
+        raise ReleaseError(msg)
+    try:
+        return response.json()
+    except ValueError as je:
+        raise ReleaseError(f"Не удалось разобрать JSON релиза: {je}\nRaw (truncated 400): {response.text[:400]}") from je
+
+
+def download_template(
+    agent: str,
+    script: str,
+    download_dir: Path,
+    *,
+    client: Optional["httpx.Client"] = None,
+    release: Optional[dict] = None,
+    cache_dir: Optional[Path] = None,
+    github_token: Optional[str] = None,
+    debug: bool = False,
+    on_chunk: Optional[ChunkCallback] = None,
+    offline: bool = False,
+    deadline: Deadline = _NO_DEADLINE,
+) -> Tuple[Path, dict]:
+    """Скачать шаблон последнего релиза для пары агент/скрипт.
+
+    Если релиз публикует слои, возвращает оверлей из кэша cache_dir, а в
+    метаданных — список слоёв ("layers"); иначе полный архив, который тоже
+    сохраняется в кэше под своим sha256 (download_dir оставлен для
+    совместимости и не используется). В метаданных "assets" — имя, URL,
+    размер и sha256 каждого архива для lock.json. release — уже полученное
+    описание релиза (fetch_release или pinned_release).
+    offline=True берёт шаблон из импортированного пакета (offline_template)
+    без обращения к сети; client в этом случае не нужен. deadline ограничивает
+    сетевые таймауты и проверяется между чанками.
+
+    Returns:
+        Кортеж (путь к архиву, метаданные релиза)
+    """
+    if offline:
+        return offline_template(agent, script, cache_dir=cache_dir)
+    if client is None:
+        raise InvalidOptionError("Для скачивания шаблона нужен HTTP-клиент (client)")
+    if release is None:
+        release = fetch_release(client, github_token=github_token, debug=debug, deadline=deadline)
+    assets = release.get("assets", [])
+    headers = _github_auth_headers(github_token)
+    cache = Path(cache_dir) if cache_dir else _layer_cache_dir()
+
+    layered, layers_error = _download_layers(
+        client, assets, agent, script, release["tag_name"],
+        headers=headers, cache_dir=cache, on_chunk=on_chunk, deadline=deadline,
+    )
+    if layered is not None:
+        return layered
+
+    pattern = f"spec-kit-template-{agent}-{script}"
+    asset = next((a for a in assets if pattern in a["name"] and a["name"].endswith(".zip")), None)
+    if asset is None:
+        raise TemplateNotFoundError(pattern, [a.get("name", "?") for a in assets])
+
+    # GitHub reports "sha256:<hex>" for newer assets, which allows a cache hit without downloading
+    digest = asset.get("digest") or ""
+    entry = {"name": asset["name"], "sha256": digest.removeprefix("sha256:") if digest.startswith("sha256:") else None}
+    try:
+        zip_path, hit = _fetch_layer(client, entry, asset["browser_download_url"], headers=headers, cache_dir=cache, on_chunk=on_chunk, deadline=deadline)
+    except DownloadError as e:
+        if release.get("pinned") and not isinstance(e, ChecksumError):
+            raise ReleaseError(f"Не удалось скачать {asset['name']} из релиза {release['tag_name']}: проверьте тег\n{e}") from e
+        raise
+    except SpecifyError:
+        raise
+    except Exception as e:
+        deadline.check("download")
+        raise DownloadError(str(e)) from e
+
+    size = zip_path.stat().st_size
+    metadata = {
+        "filename": asset["name"],
+        "size": size,
+        "release": release["tag_name"],
+        "asset_url": asset["browser_download_url"],
+        "layers": [zip_path],
+        "layered": False,
+        "cached": True,
+        "cache_hits": int(hit),
+        "downloaded": 0 if hit else size,
+        "assets": [_lock_entry(asset["name"], asset["browser_download_url"], zip_path)],
+    }
+    if layers_error:
+        metadata["layers_error"] = layers_error
+    return zip_path, metadata
+
+
+def _extract_layers(layer_paths: list[Path], dest: Path, deadline: Deadline = _NO_DEADLINE) -> None:
+    """Распаковать архивы по порядку: более поздние слои перекрывают ранние."""
+    for layer in layer_paths:
+        with zipfile.ZipFile(layer, "r") as zip_ref:
+            for member in zip_ref.infolist():
+                deadline.check("extract")
+                zip_ref.extract(member, dest)
+
+
+def _merge_tree(source_dir: Path, project_path: Path, journal: Optional[_Journal] = None, deadline: Deadline = _NO_DEADLINE) -> None:
+    for item in source_dir.iterdir():
+        deadline.check("extract")
+        dest_path = project_path / item.name
+        if item.is_dir():
+            if dest_path.exists():
+                for sub_item in item.rglob("*"):
+                    if sub_item.is_file():
+                        deadline.check("extract")
+                        dest_file = dest_path / sub_item.relative_to(item)
+                        if journal:
+                            journal.record(dest_file)
+                        dest_file.parent.mkdir(parents=True, exist_ok=True)
+                        shutil.copy2(sub_item, dest_file)
+            else:
+                if journal:
+                    journal.record(dest_path)
+                shutil.copytree(item, dest_path)
+        else:
+            if journal:
+                journal.record(dest_path)
+            shutil.copy2(item, dest_path)
+
+
+def extract_template(archives: list[Path], project_path: Path, *, merge: bool = False, progress: Optional[ProgressCallback] = None, journal: Optional[_Journal] = None, deadline: Deadline = _NO_DEADLINE) -> int:
+    """Распаковать архивы шаблона в project_path. Возвращает число файлов шаблона.
+
+    При merge=False каталог должен существовать и быть пустым; при merge=True
+    файлы шаблона объединяются с существующим содержимым (перезаписывая
+    совпадающие, с записью в journal для отката). Единственный каталог
+    верхнего уровня в архиве разворачивается.
+    """
+    report = progress or _no_progress
+    try:
+        zip_contents = 0
+        files: set[str] = set()
+        for archive in archives:
+            with zipfile.ZipFile(archive, "r") as zip_ref:
+                names = zip_ref.namelist()
+                zip_contents += len(names)
+                # Later layers overwrite earlier ones, so count each path once
+                files.update(name for name in names if not name.endswith("/"))
+        report("zip-list", "complete", f"{zip_contents} элементов")
+
+        if merge:
+            with tempfile.TemporaryDirectory() as temp_dir:
+                temp_path = Path(temp_dir)
+                _extract_layers(archives, temp_path, deadline)
+                extracted_items = list(temp_path.iterdir())
+                report("extracted-summary", "complete", f"временный каталог: {len(extracted_items)} элементов")
+                source_dir = temp_path
+                if len(extracted_items) == 1 and extracted_items[0].is_dir():
+                    source_dir = extracted_items[0]
+                    report("flatten", "complete", "")
+                _merge_tree(source_dir, project_path, journal, deadline)
+        else:
+            _extract_layers(archives, project_path, deadline)
+            extracted_items = list(project_path.iterdir())
+            report("extracted-summary", "complete", f"{len(extracted_items)} элементов верхнего уровня")
+            if len(extracted_items) == 1 and extracted_items[0].is_dir():
+                # Rename first so a child named like the wrapper directory cannot collide,
+                # and stay inside project_path so concurrent inits never share a scratch path
+                nested = extracted_items[0].rename(project_path / f".specify-flatten-{uuid.uuid4().hex}")
+                for child in list(nested.iterdir()):
+                    shutil.move(str(child), str(project_path / child.name))
+                nested.rmdir()
+                report("flatten", "complete", "")
+    except InitCancelled:
+        raise
+    except Exception as e:
+        raise ExtractError(str(e)) from e
+    return len(files)
+
+
+def make_scripts_executable(project_path: Path, deadline: Deadline = _NO_DEADLINE) -> Tuple[int, list[str]]:
+    """Рекурсивно выставить права на выполнение .sh-скриптам в .specify/scripts.
+
+    Returns:
+        Кортеж (число обновлённых скриптов, список ошибок «путь: причина»)
+    """
+    scripts_root = project_path / ".specify" / "scripts"
+    if os.name == "nt" or not scripts_root.is_dir():
+        return 0, []
+    failures: list[str] = []
+    updated = 0
+    for script in scripts_root.rglob("*.sh"):
+        deadline.check("chmod")
+        try:
+            if script.is_symlink() or not script.is_file():
+                continue
+            try:
+                with script.open("rb") as f:
+                    if f.read(2) != b"#!":
+                        continue
+            except Exception:
+                continue
+            st = script.stat(); mode = st.st_mode
+            if mode & 0o111:
+                continue
+            new_mode = mode
+            if mode & 0o400: new_mode |= 0o100
+            if mode & 0o040: new_mode |= 0o010
+            if mode & 0o004: new_mode |= 0o001
+            if not (new_mode & 0o100):
+                new_mode |= 0o100
+            os.chmod(script, new_mode)
+            updated += 1
+        except Exception as e:
+            failures.append(f"{script.relative_to(scripts_root)}: {e}")
+    return updated, failures
+
+
+def init_git(project_path: Path, deadline: Deadline = _NO_DEADLINE) -> Tuple[bool, Optional[str]]:
+    """Создать git-репозиторий с начальным коммитом (без смены текущего каталога процесса).
+
+    Returns:
+        Кортеж вида (успешно: bool, сообщение об ошибке: Optional[str])
+    """
+    try:
+        for cmd in (["git", "init"], ["git", "add", "."], ["git", "commit", "-m", "Initial commit from Specify template"]):
+            deadline.check("git")
+            subprocess.run(cmd, check=True, capture_output=True, text=True, cwd=project_path, timeout=deadline.remaining())
+        return True, None
+    except subprocess.TimeoutExpired:
+        deadline.check("git")
+        raise
+    except subprocess.CalledProcessError as e:
+        error_msg = f"Command: {' '.join(e.cmd)}\nExit code: {e.returncode}"
+        if e.stderr:
+            error_msg += f"\nОшибка: {e.stderr.strip()}"
+        elif e.stdout:
+            error_msg += f"\nВывод: {e.stdout.strip()}"
+        return False, error_msg
+    except OSError as e:
+        return False, str(e)
+
+
+# One lock per target directory: concurrent inits of the same path run one after another.
+# Entries are reference-counted and dropped by the last user, so a long-lived serve
+# process does not accumulate a lock for every path it has ever initialized.
+_locks_guard = threading.Lock()
+_path_locks: dict[Path, list] = {}  # path -> [lock, users]
+
+
+@contextmanager
+def _project_lock(path: Path) -> Iterator[None]:
+    with _locks_guard:
+        entry = _path_locks.setdefault(path, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _locks_guard:
+            entry[1] -= 1
+            if not entry[1]:
+                del _path_locks[path]
+
+
+@contextmanager
+def _target_dir(project_path: Path, merge: bool) -> Iterator[Optional[_Journal]]:
+    """Захватить каталог проекта и откатить изменения при ошибке или прерывании.
+
+    Созданный вызовом каталог удаляется целиком. Для существующего каталога
+    (merge) возвращается журнал: откат удаляет только созданные файлы и
+    возвращает перезаписанные.
+    """
+    with _project_lock(project_path):
+        created = not project_path.exists()
+        if not merge and not created:
+            raise ProjectExistsError(f"Каталог '{project_path}' уже существует")
+        try:
+            project_path.mkdir(parents=True, exist_ok=merge)
+        except FileExistsError as e:
+            raise ProjectExistsError(f"Каталог '{project_path}' уже существует") from e
+        journal = None if created else _Journal(project_path)
+        try:
+            yield journal
+        except BaseException:
+            if created:
+                shutil.rmtree(project_path, ignore_errors=True)
+            else:
+                journal.undo()
+            raise
+        if journal is not None:
+            journal.discard()
+
+
+def _validate(agent: str, script: str) -> None:
+    if agent not in AGENT_CONFIG:
+        raise InvalidOptionError(f"Некорректный ИИ-агент '{agent}'. Допустимые значения: {', '.join(AGENT_CONFIG)}")
+    if script not in SCRIPT_TYPE_CHOICES:
+        raise InvalidOptionError(f"Недопустимый тип скриптов '{script}'. Выберите один из: {', '.join(SCRIPT_TYPE_CHOICES)}")
+
+
+def init_project(
+    path: Union[str, Path],
+    agent: str,
+    script: str = "sh",
+    *,
+    merge: bool = False,
+    git: bool = True,
+    client: Optional["httpx.Client"] = None,
+    cache_dir: Optional[Path] = None,
+    progress: Optional[ProgressCallback] = None,
+    github_token: Optional[str] = None,
+    verify_tls: bool = True,
+    debug: bool = False,
+    offline: Optional[bool] = None,
+    timeout: Optional[float] = None,
+    deadline: Optional[Deadline] = None,
+    release_tag: Optional[str] = None,
+    lock: Optional[dict] = None,
+) -> InitResult:
+    """Создать проект Specify в path из последнего шаблона — аналог `specify-ru init --ai AGENT --script SCRIPT`.
+
+    Args:
+        path: каталог проекта; если он существует, нужен merge=True (аналог --here --force)
+        agent: ключ ИИ-агента из AGENT_CONFIG
+        script: тип скриптов, sh или ps
+        merge: объединить файлы шаблона с содержимым существующего каталога
+        git: инициализировать git-репозиторий, если его ещё нет и git установлен
+        client: HTTP-клиент httpx (можно разделять между потоками); по умолчанию создаётся и закрывается на вызов
+        cache_dir: каталог кэша слоёв шаблона (по умолчанию пользовательский кэш specify-ru)
+        progress: коллбэк progress(step, status, detail); вызывается в потоке вызывающего
+        github_token: токен GitHub (по умолчанию GH_TOKEN/GITHUB_TOKEN)
+        verify_tls: проверять сертификаты, если client не передан
+        debug: добавлять ответ сервера в тексты ошибок
+        offline: взять шаблон из импортированного пакета без сети (по умолчанию — SPECIFY_OFFLINE)
+        timeout: общий бюджет времени в секундах на все шаги (сеть, распаковка, chmod, git)
+        deadline: готовый Deadline, например чтобы отменить вызов из другого потока (вместо timeout)
+        release_tag: установить релиз с этим тегом по прямым URL артефактов, без запроса к API
+        lock: содержимое lock.json (read_lock) — установить ровно записанные в нём архивы, без API
+
+    Raises:
+        InvalidOptionError, ProjectExistsError, ReleaseError, TemplateNotFoundError,
+        DownloadError, ExtractError, DeadlineExceeded, InitCancelled. При ошибке
+        или прерывании созданный вызовом каталог удаляется, а в существующем
+        каталоге удаляются созданные файлы и возвращаются перезаписанные.
+    """
+    _validate(agent, script)
+    if lock is not None and (lock.get("agent"), lock.get("script")) != (agent, script):
+        raise InvalidOptionError(f"lock.json записан для {lock.get('agent')}:{lock.get('script')}, а запрошен {agent}:{script}")
+    if lock is not None and release_tag and release_tag != lock["release"]:
+        raise InvalidOptionError(f"lock.json закрепляет релиз {lock['release']}, а запрошен {release_tag}")
+    project_path = Path(path).expanduser().resolve()
+    report = progress or _no_progress
+    if offline is None:
+        offline = offline_default()
+    own_client = client is None and not offline
+    if own_client:
+        client = _new_http_client(verify=verify_tls)
+    result = InitResult(project_path=project_path, agent=agent, script=script)
+    if deadline is None:
+        deadline = Deadline(timeout)
+
+    try:
+        with _target_dir(project_path, merge) as journal:
+            _scaffold(
+                result, client, merge=merge, cache_dir=cache_dir, report=report, github_token=github_token, debug=debug,
+                offline=offline, journal=journal, deadline=deadline, release_tag=release_tag, lock=lock,
+            )
+            _finish(result, git=git, report=report, journal=journal, deadline=deadline)
+    finally:
+        if own_client:
+            client.close()
+    return result
+
+
+def _scaffold(result: InitResult, client: Optional["httpx.Client"], *, merge: bool, cache_dir: Optional[Path], report: ProgressCallback, github_token: Optional[str], debug: bool, offline: bool, journal: Optional[_Journal], deadline: Deadline, release_tag: Optional[str] = None, lock: Optional[dict] = None) -> None:
+    # Release lookup and download are reported separately so their durations can be told apart
+    release = None
+    if lock is not None:
+        report("fetch", "skip", f"lock.json, релиз {lock['release']}")
+    elif offline:
+        report("fetch", "skip", "локальный пакет шаблонов")
+    elif release_tag:
+        release = pinned_release(release_tag, result.agent, result.script)
+        report("fetch", "skip", f"релиз {release_tag} закреплён")
+    else:
+        report("fetch", "start", "запрос к GitHub API")
+        try:
+            release = fetch_release(client, github_token=github_token, debug=debug, deadline=deadline)
+        except SpecifyError as e:
+            report("fetch", "error", str(e))
+            raise
+        report("fetch", "complete", f"релиз {release['tag_name']}")
+    report("download", "start", "")
+    with tempfile.TemporaryDirectory(prefix="specify-ru-") as download_dir:
+        try:
+            if lock is not None:
+                archive, meta = download_locked(lock, client=client, cache_dir=cache_dir, github_token=github_token, deadline=deadline)
+            else:
+                archive, meta = download_template(
+                    result.agent, result.script, Path(download_dir),
+                    client=client, release=release, cache_dir=cache_dir, github_token=github_token, debug=debug, offline=offline,
+                    deadline=deadline,
+                )
+        except SpecifyError as e:
+            report("download", "error", str(e))
+            raise
+        layers = meta.get("layers") or [archive]
+        detail = f"{meta['filename']}, релиз {meta['release']} ({meta['size']:,} байт)"
+        if meta.get("cached"):
+            detail += f", из кэша: {meta['cache_hits']} из {len(layers)}"
+        report("download", "complete", detail)
+        result.release = meta["release"]
+        result.template = meta["filename"]
+        result.layered = meta.get("layered", bool(meta.get("layers")))
+        result.cache_hits = meta.get("cache_hits", 0)
+        result.downloaded = meta.get("downloaded", 0)
+
+        report("extract", "start", "")
+        try:
+            result.files = extract_template(layers, result.project_path, merge=merge, progress=report, journal=journal, deadline=deadline)
+            files, _ = read_archives(layers)
+        except (ExtractError, InitCancelled) as e:
+            report("extract", "error", str(e))
+            raise
+        report("extract", "complete", "")
+        if meta.get("assets"):
+            result.lock = build_lock(result, meta["assets"])
+        # Cached layers are named by their sha256, so verify --repair can find them again
+        result.manifest = build_manifest(files, sources=[Path(p).stem for p in meta.get("layers") or []] if meta.get("cached") else [])
+    if meta.get("cached"):
+        report("cleanup", "skip", "слои остаются в кэше")
+    else:
+        report("cleanup", "complete", "")
+
+
+def write_install_record(result: InitResult) -> None:
+    """Записать .specify/install.json: из какого релиза и для какого агента установлен проект."""
+    atomic_write_json(result.project_path / INSTALL_RECORD, {
+        "release": result.release,
+        "agent": result.agent,
+        "script": result.script,
+        "template": result.template,
+        "installed_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    })
+
+
+def is_manifest_path(name: str) -> bool:
+    """Входит ли файл шаблона в манифест: скрипты, шаблоны и файлы команд агентов."""
+    return name.startswith(MANIFEST_PREFIXES) or name.rsplit("/", 1)[-1].startswith(COMMAND_FILE_PREFIX)
+
+
+def expects_exec(name: str, data: bytes) -> bool:
+    """Должен ли файл быть исполняемым — то же правило, что в make_scripts_executable."""
+    return os.name != "nt" and name.startswith(".specify/scripts/") and name.endswith(".sh") and data[:2] == b"#!"
+
+
+def manifest_entry(name: str, data: bytes) -> dict:
+    return {"sha256": hashlib.sha256(data).hexdigest(), "size": len(data), "exec": expects_exec(name, data)}
+
+
+def build_manifest(files: dict[str, bytes], *, sources: list[str] = ()) -> dict:
+    """Манифест установленного шаблона; sources — sha256 архивов в кэше слоёв, из которых его можно восстановить."""
+    return {
+        "version": MANIFEST_VERSION,
+        "sources": list(sources),
+        "files": {name: manifest_entry(name, data) for name, data in sorted(files.items()) if is_manifest_path(name)},
+    }
+
+
+def read_manifest(project_path: Path) -> Optional[dict]:
+    manifest = read_json(Path(project_path) / MANIFEST_RELATIVE_PATH)
+    if isinstance(manifest, dict) and manifest.get("version") == MANIFEST_VERSION and isinstance(manifest.get("files"), dict):
+        return manifest
+    return None
+
+
+def write_manifest(project_path: Path, manifest: dict) -> None:
+    atomic_write_json(Path(project_path) / MANIFEST_RELATIVE_PATH, manifest)
+
+
+def _finish(result: InitResult, *, git: bool, report: ProgressCallback, journal: Optional[_Journal] = None, deadline: Deadline = _NO_DEADLINE) -> None:
+    """Запись об установке, права на выполнение скриптов и git — общий хвост init_project и materialize."""
+    project_path = result.project_path
+    if (project_path / ".specify").is_dir():
+        if journal:
+            journal.record(project_path / INSTALL_RECORD)
+            journal.record(project_path / MANIFEST_RELATIVE_PATH)
+            journal.record(project_path / LOCK_RELATIVE_PATH)
+        write_install_record(result)
+        if result.manifest is not None:
+            write_manifest(project_path, result.manifest)
+        if result.lock is not None:
+            write_lock(project_path, result.lock)
+    if os.name == "nt":
+        report("chmod", "skip", "Windows")
+    else:
+        try:
+            result.executable_scripts, result.chmod_failures = make_scripts_executable(project_path, deadline)
+        except InitCancelled as e:
+            report("chmod", "error", str(e))
+            raise
+        detail = f"{result.executable_scripts} обновлено" + (f", {len(result.chmod_failures)} не удалось" if result.chmod_failures else "")
+        report("chmod", "error" if result.chmod_failures else "complete", detail)
+
+    report("git", "start", "")
+    if not git:
+        result.git = "disabled"
+        report("git", "skip", "инициализация отключена")
+    elif is_git_repo(project_path):
+        result.git = "existing"
+        report("git", "complete", "обнаружен существующий репозиторий")
+    elif shutil.which("git") is None:
+        result.git = "unavailable"
+        report("git", "skip", "git недоступен")
+    else:
+        if journal:
+            journal.record(project_path / ".git")
+        try:
+            ok, result.git_error = init_git(project_path, deadline)
+        except InitCancelled as e:
+            report("git", "error", str(e))
+            raise
+        result.git = "initialized" if ok else "failed"
+        report("git", "complete" if ok else "error", "инициализирован" if ok else "ошибка инициализации")
+
+    report("final", "complete", "проект готов")
+
+
+@dataclass
+class Template:
+    """Шаблон, распакованный в память: относительный POSIX-путь → содержимое файла.
+
+    Не изменяется после создания, поэтому один экземпляр можно материализовать
+    из нескольких потоков одновременно.
+    """
+
+    agent: str
+    script: str
+    release: str
+    filename: str
+    files: dict[str, bytes] = field(default_factory=dict)
+    dirs: frozenset[str] = frozenset()
+    layered: bool = False
+    cache_hits: int = 0
+    downloaded: int = 0
+    sources: tuple[str, ...] = ()  # sha256 of the cached layers the files came from
+
+    @property
+    def size(self) -> int:
+        return sum(len(data) for data in self.files.values())
+
+
+def read_archives(archives: list[Path]) -> Tuple[dict[str, bytes], frozenset[str]]:
+    """Прочитать архивы шаблона в память по тем же правилам, что и extract_template.
+
+    Более поздние архивы перекрывают ранние, единственный каталог верхнего уровня
+    разворачивается, записи с абсолютными путями и «..» отбрасываются.
+    """
+    files: dict[str, bytes] = {}
+    dirs: set[str] = set()
+    try:
+        for archive in archives:
+            with zipfile.ZipFile(archive, "r") as zip_ref:
+                for info in zip_ref.infolist():
+                    parts = [p for p in info.filename.replace("\\", "/").split("/") if p not in ("", ".")]
+                    if not parts or ".." in parts or info.filename.startswith("/"):
+                        continue
+                    name = "/".join(parts)
+                    if info.is_dir():
+                        dirs.add(name)
+                    else:
+                        files[name] = zip_ref.read(info)
+    except Exception as e:
+        raise ExtractError(str(e)) from e
+
+    tops = {name.split("/", 1)[0] for name in (*files, *dirs)}
+    if len(tops) == 1:
+        top = next(iter(tops))
+        if top not in files:
+            prefix = top + "/"
+            files = {name[len(prefix):]: data for name, data in files.items()}
+            dirs = {name[len(prefix):] for name in dirs if name != top}
+    return files, frozenset(dirs)
+
+
+def load_template(
+    agent: str,
+    script: str,
+    *,
+    client: Optional["httpx.Client"] = None,
+    release: Optional[dict] = None,
+    cache_dir: Optional[Path] = None,
+    github_token: Optional[str] = None,
+    debug: bool = False,
+    offline: bool = False,
+) -> Template:
+    """Скачать шаблон (или взять слои из кэша) и распаковать его в память.
+
+    release — уже полученное описание релиза (fetch_release), чтобы не
+    запрашивать GitHub API повторно; offline=True — взять шаблон из
+    импортированного пакета.
+    """
+    _validate(agent, script)
+    with tempfile.TemporaryDirectory(prefix="specify-ru-") as download_dir:
+        archive, meta = download_template(
+            agent, script, Path(download_dir),
+            client=client, release=release, cache_dir=cache_dir, github_token=github_token, debug=debug, offline=offline,
+        )
+        files, dirs = read_archives(meta.get("layers") or [archive])
+    return Template(
+        agent=agent,
+        script=script,
+        release=meta["release"],
+        filename=meta["filename"],
+        files=files,
+        dirs=dirs,
+        layered=meta.get("layered", bool(meta.get("layers"))),
+        cache_hits=meta.get("cache_hits", 0),
+        downloaded=meta.get("downloaded", 0),
+        sources=tuple(Path(p).stem for p in meta.get("layers") or []) if meta.get("cached") else (),
+    )
+
+
+def materialize(
+    template: Template,
+    path: Union[str, Path],
+    *,
+    merge: bool = False,
+    git: bool = True,
+    preserve: tuple[str, ...] = (),
+    progress: Optional[ProgressCallback] = None,
+) -> InitResult:
+    """Записать шаблон из памяти в каталог проекта — init_project без сети и распаковки.
+
+    preserve — glob-шаблоны относительных путей (fnmatch), существующие файлы
+    по которым при объединении не перезаписываются (например, ".specify/memory/*").
+    """
+    project_path = Path(path).expanduser().resolve()
+    report = progress or _no_progress
+    result = InitResult(
+        project_path=project_path,
+        agent=template.agent,
+        script=template.script,
+        release=template.release,
+        template=template.filename,
+        layered=template.layered,
+    )
+    with _target_dir(project_path, merge) as journal:
+        report("extract", "start", "")
+        written = kept = 0
+        try:
+            for name in sorted(template.dirs):
+                if journal:
+                    journal.record(project_path / name)
+                (project_path / name).mkdir(parents=True, exist_ok=True)
+            for name, data in template.files.items():
+                dest = project_path / name
+                if preserve and dest.exists() and any(fnmatch(name, pattern) for pattern in preserve):
+                    kept += 1
+                    continue
+                if journal:
+                    journal.record(dest)
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                dest.write_bytes(data)
+                written += 1
+        except OSError as e:
+            report("extract", "error", str(e))
+            raise ExtractError(str(e)) from e
+        result.files = written
+        result.manifest = build_manifest(template.files, sources=list(template.sources))
+        report("extract", "complete", f"{written} файлов" + (f", сохранено {kept}" if kept else ""))
+        _finish(result, git=git, report=report, journal=journal)
+    return result
@@ -0,0 +1,182 @@
+"""
+Структурный разбор артефактов фичи (spec.md, plan.md) по формату шаблонов.
+
+Разбор выполняется регулярными выражениями за один проход по тексту: из
+спецификации извлекаются требования FR-###/SC-###, пользовательские истории и
+маркеры [NEEDS CLARIFICATION], из плана — поля технического контекста.
+HTML-комментарии (инструкции шаблонов) пропускаются с сохранением нумерации строк.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Optional
+
+_COMMENT_RE = re.compile(r"<!--.*?-->", re.DOTALL)
+_REQUIREMENT_RE = re.compile(r"^\s*[-*]\s+\*\*(?P<id>(?:FR|NFR|SC)-\d+)\*\*\s*:?\s*(?P<text>.*?)\s*$")
+_STORY_RE = re.compile(
+    r"^#{2,4}\s+(?:User Story|Пользовательская история|История)\s+(?P<num>\d+)\s*[—–-]?\s*(?P<title>.*?)"
+    r"(?:\s*\((?:Приоритет|Priority):\s*(?P<priority>P\d+)\))?\s*(?:🎯.*)?$",
+    re.IGNORECASE,
+)
+_MARKER_RE = re.compile(r"\[NEEDS CLARIFICATION(?::\s*(?P<question>[^\]]*))?\]|NEEDS CLARIFICATION", re.IGNORECASE)
+# Unfilled template placeholders: [FEATURE NAME], [DATE], [ДАТА], [###-feature-name].
+# Lowercase Russian ones ([краткий заголовок]) are indistinguishable from prose and
+# are matched against the template keys instead (lint.find_template_placeholders).
+_PLACEHOLDER_RE = re.compile(r"\[(?!NEEDS CLARIFICATION)(?:[A-ZА-ЯЁ][A-ZА-ЯЁ0-9 _/-]{2,}|###-[a-z-]+)\]")
+_FIELD_RE = re.compile(r"^\*\*(?P<label>[^*]+)\*\*:\s*(?P<value>.*?)\s*$")
+_HEADER_RE = re.compile(r"^#{1,6}\s+(?P<title>.+?)\s*$")
+
+TECH_CONTEXT_HEADERS = ("Технический контекст", "Technical Context")
+
+
+def strip_comments(text: str) -> str:
+    """Удалить HTML-комментарии, оставив переводы строк (номера строк не меняются)."""
+    return _COMMENT_RE.sub(lambda m: "\n" * m.group(0).count("\n"), text)
+
+
+@dataclass
+class Requirement:
+    id: str
+    text: str
+    line: int
+
+    @property
+    def kind(self) -> str:
+        return self.id.split("-", 1)[0]
+
+    def as_dict(self) -> dict:
+        return {"id": self.id, "text": self.text, "line": self.line}
+
+
+@dataclass
+class Story:
+    id: str
+    title: str
+    line: int
+    priority: Optional[str] = None
+
+    def as_dict(self) -> dict:
+        return {"id": self.id, "title": self.title, "priority": self.priority, "line": self.line}
+
+
+@dataclass
+class Marker:
+    """Неразрешённый маркер [NEEDS CLARIFICATION] или незаполненный плейсхолдер шаблона."""
+
+    kind: str  # clarification | placeholder
+    line: int
+    text: str
+
+    def as_dict(self) -> dict:
+        return {"kind": self.kind, "line": self.line, "text": self.text}
+
+
+@dataclass
+class SpecData:
+    requirements: list[Requirement] = field(default_factory=list)
+    stories: list[Story] = field(default_factory=list)
+    markers: list[Marker] = field(default_factory=list)
+
+
+@dataclass
+class PlanFields:
+    """Поля технического контекста plan.md (метка -> значение и номер строки)."""
+
+    fields: dict[str, str] = field(default_factory=dict)
+    lines: dict[str, int] = field(default_factory=dict)
+    markers: list[Marker] = field(default_factory=list)
+
+
+def find_markers(text: str) -> list[Marker]:
+    """Маркеры уточнения и незаполненные плейсхолдеры с номерами строк."""
+    markers: list[Marker] = []
+    for lineno, line in enumerate(strip_comments(text).splitlines(), start=1):
+        for m in _MARKER_RE.finditer(line):
+            markers.append(Marker("clarification", lineno, (m.group("question") or "").strip() or line.strip()))
+        for m in _PLACEHOLDER_RE.finditer(line):
+            markers.append(Marker("placeholder", lineno, m.group(0)))
+    return markers
+
+
+def parse_spec_text(text: str) -> SpecData:
+    """Разобрать spec.md: требования, истории и маркеры."""
+    spec = SpecData(markers=find_markers(text))
+    for lineno, line in enumerate(strip_comments(text).splitlines(), start=1):
+        m = _REQUIREMENT_RE.match(line)
+        if m:
+            spec.requirements.append(Requirement(m.group("id"), m.group("text"), lineno))
+            continue
+        m = _STORY_RE.match(line)
+        if m:
+            spec.stories.append(Story(
+                id=f"US{int(m.group('num'))}",
+                title=m.group("title").strip(),
+                line=lineno,
+                priority=m.group("priority"),
+            ))
+    return spec
+
+
+def parse_plan_fields(text: str) -> PlanFields:
+    """Поля раздела «Технический контекст» (или всего файла, если раздела нет)."""
+    plan = PlanFields(markers=find_markers(text))
+    lines = strip_comments(text).splitlines()
+    has_section = any(
+        (h := _HEADER_RE.match(line)) and h.group("title") in TECH_CONTEXT_HEADERS for line in lines
+    )
+    in_section = not has_section
+    for lineno, line in enumerate(lines, start=1):
+        header = _HEADER_RE.match(line)
+        if header and has_section:
+            in_section = header.group("title") in TECH_CONTEXT_HEADERS
+            continue
+        if not in_section:
+            continue
+        m = _FIELD_RE.match(line)
+        if not m:
+            continue
+        label = m.group("label").strip()
+        if label not in plan.fields:
+            plan.fields[label] = m.group("value")
+            plan.lines[label] = lineno
+    return plan
+
+
+@dataclass
+class Section:
+    """Раздел markdown-документа: заголовок и текст до следующего заголовка."""
+
+    level: int
+    title: str
+    line: int
+    body: str
+
+
+_SECTION_HEADER_RE = re.compile(r"^(?P<hashes>#{1,6})\s+(?P<title>.+?)\s*#*\s*$")
+
+
+def split_sections(text: str) -> list[Section]:
+    """Разбить документ на разделы по заголовкам (заголовки внутри ``` не учитываются).
+
+    Текст до первого заголовка возвращается разделом уровня 0 с пустым заголовком.
+    """
+    sections: list[Section] = []
+    current = Section(0, "", 1, "")
+    body: list[str] = []
+    in_fence = False
+    for lineno, line in enumerate(text.splitlines(), start=1):
+        if line.lstrip().startswith(("```", "~~~")):
+            in_fence = not in_fence
+        header = None if in_fence else _SECTION_HEADER_RE.match(line)
+        if header:
+            current.body = "\n".join(body).strip("\n")
+            if current.title or current.body.strip():
+                sections.append(current)
+            current = Section(len(header.group("hashes")), header.group("title"), lineno, "")
+            body = []
+        else:
+            body.append(line)
+    current.body = "\n".join(body).strip("\n")
+    if current.title or current.body.strip():
+        sections.append(current)
+    return sections
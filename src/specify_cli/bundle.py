@@ -0,0 +1,258 @@
+"""
+Автономные пакеты шаблонов для сетей без доступа к GitHub.
+
+`specify-ru bundle export` на машине с доступом к GitHub собирает один
+zip-файл: описание релиза, индекс шаблонов для всех пар агент×скрипт и
+объекты (полные архивы или слои), адресуемые по sha256 и потому
+дедуплицированные: общий базовый слой .specify/ хранится один раз.
+`bundle import` в изолированной сети проверяет контрольные суммы и
+раскладывает объекты в локальный кэш слоёв; после этого `init --offline`
+(или SPECIFY_OFFLINE=1) создаёт проекты без единого сетевого запроса.
+
+Формат пакета:
+
+    bundle.json            схема, дата, релиз, индекс templates и размеры objects
+    objects/<sha256>.zip   архивы шаблонов и слоёв (без повторного сжатия)
+
+Рядом с пакетом пишется <пакет>.sha256 в формате sha256sum; при импорте он
+проверяется, если лежит рядом.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import zipfile
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+from . import AGENT_CONFIG, SCRIPT_TYPE_CHOICES, _layer_cache_dir
+from .api import (
+    OFFLINE_INDEX,
+    ProgressCallback,
+    SpecifyError,
+    TemplateNotFoundError,
+    _no_progress,
+    download_template,
+    fetch_release,
+)
+from .fsutil import atomic_write_json, new_file_mode
+
+if TYPE_CHECKING:
+    import httpx
+
+BUNDLE_SCHEMA = 1
+INDEX_NAME = "bundle.json"
+OBJECTS_DIR = "objects"
+
+
+class BundleError(SpecifyError):
+    """Пакет повреждён, не совпадает контрольная сумма или формат не поддерживается."""
+
+
+@dataclass
+class BundleInfo:
+    path: Path
+    release: str
+    templates: list[str] = field(default_factory=list)  # agent:script
+    objects: int = 0
+    size: int = 0  # bytes of stored objects
+    sha256: str = ""
+    reused: int = 0  # objects already present in the cache on import
+
+    def as_dict(self) -> dict:
+        return {
+            "path": str(self.path),
+            "release": self.release,
+            "templates": self.templates,
+            "objects": self.objects,
+            "size": self.size,
+            "sha256": self.sha256,
+            "reused": self.reused,
+        }
+
+
+def _file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _sidecar(path: Path) -> Path:
+    return path.with_name(path.name + ".sha256")
+
+
+def _template_keys(templates: dict) -> list[str]:
+    return [f"{agent}:{script}" for agent, scripts in sorted(templates.items()) for script in sorted(scripts)]
+
+
+def export_bundle(
+    output: Path,
+    *,
+    client: "httpx.Client",
+    agents: Optional[list[str]] = None,
+    scripts: Optional[list[str]] = None,
+    cache_dir: Optional[Path] = None,
+    github_token: Optional[str] = None,
+    progress: Optional[ProgressCallback] = None,
+) -> BundleInfo:
+    """Собрать пакет последнего релиза для всех (или выбранных) пар агент×скрипт.
+
+    output — файл пакета или каталог (тогда имя spec-kit-ru-bundle-<релиз>.zip).
+    Слои берутся из кэша cache_dir (и докачиваются в него), полные архивы
+    скачиваются во временный каталог. Пакет записывается атомарно.
+    """
+    report = progress or _no_progress
+    release = fetch_release(client, github_token=github_token)
+    templates: dict[str, dict[str, dict]] = {}
+    objects: dict[str, Path] = {}
+
+    output = Path(output).resolve()
+    if output.is_dir():
+        output = output / f"spec-kit-ru-bundle-{release['tag_name']}.zip"
+    with tempfile.TemporaryDirectory(prefix="specify-ru-bundle-") as tmp:
+        for agent in agents or list(AGENT_CONFIG):
+            for script in scripts or list(SCRIPT_TYPE_CHOICES):
+                key = f"{agent}:{script}"
+                report(key, "start", "")
+                try:
+                    archive, meta = download_template(
+                        agent, script, Path(tmp),
+                        client=client, release=release, cache_dir=cache_dir, github_token=github_token,
+                    )
+                except TemplateNotFoundError:
+                    report(key, "skip", "нет в релизе")
+                    continue
+                digests = []
+                for path in meta.get("layers") or [archive]:
+                    digest = _file_sha256(path)
+                    objects.setdefault(digest, path)
+                    digests.append(digest)
+                templates.setdefault(agent, {})[script] = {
+                    "filename": meta["filename"],
+                    "size": meta["size"],
+                    "objects": digests,
+                }
+                report(key, "complete", meta["filename"])
+
+        if not templates:
+            raise BundleError(f"В релизе {release.get('tag_name')} нет ни одного шаблона для выбранных агентов")
+
+        index = {
+            "schema": BUNDLE_SCHEMA,
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "release": {
+                "tag_name": release["tag_name"],
+                "name": release.get("name"),
+                "published_at": release.get("published_at"),
+            },
+            "templates": templates,
+            "objects": {digest: path.stat().st_size for digest, path in sorted(objects.items())},
+        }
+
+        output.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(prefix=f".{output.name}.", suffix=".tmp", dir=output.parent)
+        os.close(fd)
+        try:
+            with zipfile.ZipFile(tmp_name, "w") as bundle:
+                bundle.writestr(INDEX_NAME, json.dumps(index, ensure_ascii=False, indent=2), compress_type=zipfile.ZIP_DEFLATED)
+                # Template archives are already deflated: store them as is
+                for digest, path in sorted(objects.items()):
+                    bundle.write(path, f"{OBJECTS_DIR}/{digest}.zip", compress_type=zipfile.ZIP_STORED)
+            os.chmod(tmp_name, new_file_mode())
+            os.replace(tmp_name, output)
+        finally:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+
+    digest = _file_sha256(output)
+    _sidecar(output).write_text(f"{digest}  {output.name}\n", encoding="utf-8")
+    return BundleInfo(
+        path=output,
+        release=release["tag_name"],
+        templates=_template_keys(templates),
+        objects=len(objects),
+        size=sum(index["objects"].values()),
+        sha256=digest,
+    )
+
+
+def import_bundle(path: Path, *, cache_dir: Optional[Path] = None, progress: Optional[ProgressCallback] = None) -> BundleInfo:
+    """Проверить пакет и разложить его объекты в кэш слоёв; записать индекс для автономного init.
+
+    Каждый объект проверяется по sha256 до публикации в кэше; объекты, уже
+    лежащие в кэше, не перезаписываются.
+    """
+    report = progress or _no_progress
+    path = Path(path).resolve()
+    cache = Path(cache_dir) if cache_dir else _layer_cache_dir()
+
+    digest = _file_sha256(path)
+    sidecar = _sidecar(path)
+    if sidecar.is_file():
+        expected = sidecar.read_text(encoding="utf-8").split()[:1]
+        if expected and expected[0].lower() != digest:
+            raise BundleError(f"Контрольная сумма пакета не совпадает с {sidecar.name}: ожидалось {expected[0]}, получено {digest}")
+        report("checksum", "complete", sidecar.name)
+    else:
+        report("checksum", "skip", f"{sidecar.name} не найден")
+
+    try:
+        bundle = zipfile.ZipFile(path, "r")
+    except (OSError, zipfile.BadZipFile) as e:
+        raise BundleError(f"Не удалось открыть пакет {path}: {e}") from e
+
+    with bundle:
+        try:
+            index = json.loads(bundle.read(INDEX_NAME))
+        except (KeyError, ValueError) as e:
+            raise BundleError(f"В пакете нет корректного {INDEX_NAME}: {e}") from e
+        if index.get("schema") != BUNDLE_SCHEMA:
+            raise BundleError(f"Неподдерживаемая версия пакета: {index.get('schema')} (ожидалась {BUNDLE_SCHEMA})")
+        objects: dict = index.get("objects") or {}
+        for scripts in index.get("templates", {}).values():
+            for entry in scripts.values():
+                unknown = [d for d in entry["objects"] if d not in objects]
+                if unknown:
+                    raise BundleError(f"Шаблон {entry['filename']} ссылается на отсутствующие объекты: {', '.join(unknown)}")
+
+        cache.mkdir(parents=True, exist_ok=True)
+        reused = 0
+        for n, object_digest in enumerate(sorted(objects), start=1):
+            target = cache / f"{object_digest}.zip"
+            if target.is_file():
+                reused += 1
+                continue
+            fd, tmp_name = tempfile.mkstemp(prefix=f".{object_digest[:12]}-", suffix=".part", dir=cache)
+            try:
+                h = hashlib.sha256()
+                with os.fdopen(fd, "wb") as out, bundle.open(f"{OBJECTS_DIR}/{object_digest}.zip") as src:
+                    for chunk in iter(lambda: src.read(1 << 16), b""):
+                        h.update(chunk)
+                        out.write(chunk)
+                if h.hexdigest() != object_digest:
+                    raise BundleError(f"Объект {object_digest[:12]} повреждён: sha256 {h.hexdigest()}")
+                # Same atomic publish as downloaded layers: readers never see partial objects
+                os.replace(tmp_name, target)
+            except KeyError as e:
+                raise BundleError(f"В пакете нет объекта {object_digest}") from e
+            finally:
+                if os.path.exists(tmp_name):
+                    os.unlink(tmp_name)
+            report("objects", "start", f"{n} из {len(objects)}")
+        report("objects", "complete", f"{len(objects)} объектов, из кэша: {reused}")
+
+    atomic_write_json(cache / OFFLINE_INDEX, {**index, "source": str(path), "sha256": digest})
+    return BundleInfo(
+        path=path,
+        release=index["release"]["tag_name"],
+        templates=_template_keys(index.get("templates", {})),
+        objects=len(objects),
+        size=sum(objects.values()),
+        sha256=digest,
+        reused=reused,
+    )
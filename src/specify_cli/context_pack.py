@@ -0,0 +1,297 @@
+"""
+Сжатый контекст фичи для промптов агента с ограничением по токенам.
+
+Вместо полной загрузки конституции, spec.md, plan.md, research.md,
+data-model.md, contracts/ и tasks.md агент получает дайджест: таблицы
+требований и задач, поля технического контекста, оглавление артефактов и
+полный текст только тех разделов, которые изменились с прошлой упаковки.
+
+Хэши переданных разделов хранятся в .specify/cache/context-pack.json отдельно
+для каждой фичи, поэтому повторная упаковка без изменений почти ничего не
+добавляет к структурной части. Разделы, не поместившиеся в бюджет, остаются
+«изменёнными» и попадут в следующую упаковку.
+"""
+
+import hashlib
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .artifacts import parse_plan_fields, parse_spec_text, split_sections, strip_comments
+from .feature import FeaturePaths
+from .fsutil import CACHE_DIR, atomic_write_json, project_cache_dir, read_json
+from .tasks_graph import parse_tasks_text
+
+CACHE_VERSION = 1
+CACHE_RELATIVE_PATH = CACHE_DIR / "context-pack.json"
+DEFAULT_BUDGET = 4000
+
+# Constitution locations in an initialized project and in the template repository itself
+CONSTITUTION_PATHS = (Path(".specify") / "memory" / "constitution.md", Path("memory") / "constitution.md")
+
+# Documents whose changed sections are packed, in priority order. tasks.md is represented
+# by the task table only, so its sections are never packed in full.
+FEATURE_DOCS = ("spec.md", "plan.md", "data-model.md", "research.md", "quickstart.md")
+
+_TRUNCATED = "… (обрезано)"
+
+
+def estimate_tokens(text: str) -> int:
+    """Оценка числа токенов: ~4 байта UTF-8 на токен (годится и для латиницы, и для кириллицы)."""
+    return (len(text.encode("utf-8")) + 3) // 4
+
+
+@dataclass
+class PackSection:
+    key: str
+    file: str
+    title: str
+    level: int
+    body: str
+    hash: str
+    tokens: int
+    source: Path
+    changed: bool = True
+
+
+@dataclass
+class ContextPack:
+    text: str
+    budget: int
+    sections: list[PackSection] = field(default_factory=list)
+    included: list[str] = field(default_factory=list)
+    omitted: list[str] = field(default_factory=list)
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.text)
+
+    def as_dict(self) -> dict:
+        return {
+            "budget": self.budget,
+            "tokens": self.tokens,
+            "sections": len(self.sections),
+            "changed": [s.key for s in self.sections if s.changed],
+            "included": self.included,
+            "omitted": self.omitted,
+            "text": self.text,
+        }
+
+
+def _source_files(paths: FeaturePaths) -> list[tuple[str, Path]]:
+    """Документы фичи в порядке приоритета: (метка для вывода, путь)."""
+    sources: list[tuple[str, Path]] = []
+    for name in FEATURE_DOCS[:2]:
+        sources.append((name, paths.feature_dir / name))
+    for rel in CONSTITUTION_PATHS:
+        if (paths.repo_root / rel).is_file():
+            sources.append(("constitution.md", paths.repo_root / rel))
+            break
+    for name in FEATURE_DOCS[2:3]:
+        sources.append((name, paths.feature_dir / name))
+    if paths.contracts_dir.is_dir():
+        for contract in sorted(p for p in paths.contracts_dir.rglob("*") if p.is_file()):
+            sources.append((contract.relative_to(paths.feature_dir).as_posix(), contract))
+    for name in FEATURE_DOCS[3:]:
+        sources.append((name, paths.feature_dir / name))
+    return [(label, path) for label, path in sources if path.is_file()]
+
+
+def _read(path: Path) -> str:
+    try:
+        return path.read_text(encoding="utf-8")
+    except (OSError, UnicodeDecodeError):
+        return ""
+
+
+def collect_sections(paths: FeaturePaths, delivered: dict[str, str]) -> list[PackSection]:
+    """Разделы всех документов фичи с хэшами; changed — хэш отличается от переданного ранее."""
+    sections: list[PackSection] = []
+    for label, path in _source_files(paths):
+        text = _read(path)
+        if path.suffix.lower() in (".md", ".markdown"):
+            parts = [(s.title, s.level, s.body) for s in split_sections(strip_comments(text))]
+        else:
+            # Contracts (OpenAPI, GraphQL, ...) are packed as a single section
+            parts = [("", 0, text.strip("\n"))]
+        seen: dict[str, int] = {}
+        for title, level, body in parts:
+            base = f"{label}#{title}" if title else label
+            seen[base] = seen.get(base, 0) + 1
+            key = base if seen[base] == 1 else f"{base}~{seen[base]}"
+            digest = hashlib.sha256(f"{title}\n{body}".encode("utf-8")).hexdigest()[:16]
+            sections.append(PackSection(
+                key=key,
+                file=label,
+                title=title,
+                level=level,
+                body=body,
+                hash=digest,
+                tokens=estimate_tokens(body),
+                source=path,
+                changed=delivered.get(key) != digest,
+            ))
+    return sections
+
+
+def _cell(text: str, limit: int = 160) -> str:
+    text = " ".join(text.replace("|", "\\|").split())
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+def _structure_blocks(paths: FeaturePaths, sections: list[PackSection]) -> list[tuple[str, list[str]]]:
+    """Структурная часть дайджеста: (заголовок блока, строки) в порядке приоритета."""
+    blocks: list[tuple[str, list[str]]] = []
+
+    spec = parse_spec_text(_read(paths.feature_spec))
+    if spec.requirements:
+        rows = ["| ID | Требование |", "|----|------------|"]
+        rows += [f"| {r.id} | {_cell(r.text)} |" for r in spec.requirements]
+        blocks.append(("Требования", rows))
+    if spec.stories:
+        blocks.append(("Пользовательские истории", [
+            f"- {s.id}{f' ({s.priority})' if s.priority else ''}: {s.title}" for s in spec.stories
+        ]))
+    markers = [m for m in spec.markers if m.kind == "clarification"]
+    if markers:
+        blocks.append(("Открытые вопросы", [f"- spec.md:L{m.line}: {_cell(m.text)}" for m in markers]))
+
+    plan = parse_plan_fields(_read(paths.impl_plan))
+    if plan.fields:
+        blocks.append(("Технический контекст", [f"- **{k}**: {v}" for k, v in plan.fields.items()]))
+
+    tasks = parse_tasks_text(_read(paths.tasks))
+    if tasks:
+        pending = [t for t in tasks if not t.done]
+        done = [t.id for t in tasks if t.done]
+        rows = ["| ID | P | История | Задача |", "|----|---|---------|--------|"]
+        rows += [f"| {t.id} | {'P' if t.parallel else ''} | {t.story or ''} | {_cell(t.description)} |" for t in pending]
+        if done:
+            rows.append("")
+            rows.append(f"Выполнены: {', '.join(done)}")
+        blocks.append((f"Задачи (осталось {len(pending)} из {len(tasks)})", rows))
+
+    outline: list[str] = []
+    current_file = None
+    for s in sections:
+        if s.file != current_file:
+            current_file = s.file
+            outline.append(f"- {s.file}")
+        if s.title:
+            mark = " *" if s.changed else ""
+            outline.append(f"{'  ' * max(s.level, 1)}- {s.title}{mark}")
+    if outline:
+        blocks.append(("Структура артефактов (* — изменено)", outline))
+    return blocks
+
+
+def _fit_lines(lines: list[str], budget: int) -> list[str]:
+    """Обрезать список строк так, чтобы он помещался в бюджет."""
+    out: list[str] = []
+    used = estimate_tokens(_TRUNCATED)
+    for line in lines:
+        cost = estimate_tokens(line + "\n")
+        if used + cost > budget:
+            out.append(_TRUNCATED)
+            return out
+        out.append(line)
+        used += cost
+    return out
+
+
+def pack_context(
+    paths: FeaturePaths,
+    budget: int = DEFAULT_BUDGET,
+    *,
+    full: bool = False,
+    save: bool = True,
+) -> ContextPack:
+    """Собрать дайджест фичи в пределах budget токенов.
+
+    full=True игнорирует сохранённые хэши (все разделы считаются изменёнными);
+    save=False не обновляет кэш переданных разделов.
+    """
+    cache_path = paths.repo_root / CACHE_RELATIVE_PATH
+    cache = read_json(cache_path)
+    if not isinstance(cache, dict) or cache.get("version") != CACHE_VERSION:
+        cache = {"version": CACHE_VERSION, "features": {}}
+    feature_state = cache["features"].setdefault(paths.current_branch, {"delivered": {}})
+    delivered: dict[str, str] = {} if full else dict(feature_state.get("delivered") or {})
+
+    sections = collect_sections(paths, delivered)
+    changed = [s for s in sections if s.changed]
+    pack = ContextPack(text="", budget=budget, sections=sections)
+
+    header = [
+        f"# Контекст фичи {paths.current_branch}",
+        "",
+        f"Каталог: {paths.feature_dir}. Изменённых разделов с прошлой упаковки: {len(changed)} из {len(sections)}.",
+    ]
+    parts = ["\n".join(header)]
+    used = estimate_tokens(parts[0])
+    # With changed sections pending, the structural part may take at most half of the budget
+    structure_limit = budget // 2 if changed else budget
+
+    for title, lines in _structure_blocks(paths, sections):
+        block_header = f"\n## {title}\n"
+        available = min(structure_limit, budget) - used - estimate_tokens(block_header)
+        if available <= 0:
+            break
+        block = block_header + "\n".join(_fit_lines(lines, available))
+        parts.append(block)
+        used += estimate_tokens(block)
+
+    if changed:
+        parts.append("\n## Изменённые разделы")
+        used += estimate_tokens(parts[-1])
+        reserve = min(estimate_tokens(", ".join(s.key for s in changed)) + 20, budget // 10)
+        section_budget = budget - used - reserve
+        for s in changed:
+            block = f"\n### {s.key}\n{s.body if s.body.strip() else '(пусто)'}"
+            cost = estimate_tokens(block)
+            if cost <= budget - used - reserve:
+                parts.append(block)
+            elif cost > section_budget and budget - used - reserve > 50:
+                # Larger than the whole section budget: it would never fit, so send the head
+                # and point to the file instead of postponing it forever
+                note = f"{_TRUNCATED}, полный текст: {s.source}"
+                head = "\n".join(_fit_lines(s.body.splitlines(), budget - used - reserve - estimate_tokens(note) - 10)[:-1])
+                block = f"\n### {s.key}\n{head}\n{note}"
+                parts.append(block)
+                cost = estimate_tokens(block)
+            else:
+                pack.omitted.append(s.key)
+                continue
+            used += cost
+            pack.included.append(s.key)
+        if pack.omitted:
+            listed = "\nНе поместились (попадут в следующую упаковку): " + ", ".join(pack.omitted)
+            if estimate_tokens(listed) > budget - used:
+                listed = f"\nНе поместились (попадут в следующую упаковку): {len(pack.omitted)} разделов"
+            parts.append(listed)
+
+    pack.text = "\n".join(parts).rstrip("\n") + "\n"
+
+    if save:
+        state = {} if full else dict(feature_state.get("delivered") or {})
+        current = {s.key for s in sections}
+        state = {k: v for k, v in state.items() if k in current}
+        for s in sections:
+            if s.key in pack.included:
+                state[s.key] = s.hash
+        feature_state["delivered"] = state
+        if cache_path.parent.parent.is_dir():
+            project_cache_dir(paths.repo_root)
+            atomic_write_json(cache_path, cache)
+    return pack
+
+
+def reset_context_cache(paths: FeaturePaths) -> bool:
+    """Забыть переданные разделы текущей фичи; следующая упаковка будет полной."""
+    cache_path = paths.repo_root / CACHE_RELATIVE_PATH
+    cache = read_json(cache_path)
+    if not isinstance(cache, dict) or paths.current_branch not in (cache.get("features") or {}):
+        return False
+    del cache["features"][paths.current_branch]
+    atomic_write_json(cache_path, cache)
+    return True
+
@@ -0,0 +1,198 @@
+"""
+Определение путей текущей фичи — Python-аналог scripts/bash/common.sh.
+
+Используется нативными подкомандами CLI, которые выполняются на горячем пути
+slash-команд и не должны порождать цепочки shell-процессов: корень репозитория
+и текущая ветка читаются из .git напрямую, без вызова git.
+"""
+
+import os
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+FEATURE_DIR_RE = re.compile(r"^(\d{3})-")
+
+
+@dataclass(frozen=True)
+class FeaturePaths:
+    """Пути артефактов текущей фичи (те же переменные, что печатает get_feature_paths)."""
+
+    repo_root: Path
+    current_branch: str
+    has_git: bool
+    feature_dir: Path
+
+    @property
+    def feature_spec(self) -> Path:
+        return self.feature_dir / "spec.md"
+
+    @property
+    def impl_plan(self) -> Path:
+        return self.feature_dir / "plan.md"
+
+    @property
+    def tasks(self) -> Path:
+        return self.feature_dir / "tasks.md"
+
+    @property
+    def research(self) -> Path:
+        return self.feature_dir / "research.md"
+
+    @property
+    def data_model(self) -> Path:
+        return self.feature_dir / "data-model.md"
+
+    @property
+    def quickstart(self) -> Path:
+        return self.feature_dir / "quickstart.md"
+
+    @property
+    def contracts_dir(self) -> Path:
+        return self.feature_dir / "contracts"
+
+    def as_env(self) -> dict:
+        """Словарь в формате переменных common.sh (REPO_ROOT, FEATURE_DIR, ...)."""
+        return {
+            "REPO_ROOT": str(self.repo_root),
+            "CURRENT_BRANCH": self.current_branch,
+            "HAS_GIT": "true" if self.has_git else "false",
+            "FEATURE_DIR": str(self.feature_dir),
+            "FEATURE_SPEC": str(self.feature_spec),
+            "IMPL_PLAN": str(self.impl_plan),
+            "TASKS": str(self.tasks),
+            "RESEARCH": str(self.research),
+            "DATA_MODEL": str(self.data_model),
+            "QUICKSTART": str(self.quickstart),
+            "CONTRACTS_DIR": str(self.contracts_dir),
+        }
+
+
+def find_git_dir(start: Path) -> Optional[tuple[Path, Path]]:
+    """Найти рабочее дерево git без запуска git: (корень рабочего дерева, каталог git).
+
+    Поддерживает обычные репозитории (.git — каталог) и worktree/подмодули
+    (.git — файл со строкой "gitdir: <путь>").
+    """
+    start = start.resolve()
+    for directory in (start, *start.parents):
+        marker = directory / ".git"
+        if marker.is_dir():
+            return directory, marker
+        if marker.is_file():
+            try:
+                content = marker.read_text(encoding="utf-8").strip()
+            except OSError:
+                continue
+            if content.startswith("gitdir:"):
+                git_dir = Path(content[len("gitdir:"):].strip())
+                if not git_dir.is_absolute():
+                    git_dir = (directory / git_dir).resolve()
+                return directory, git_dir
+    return None
+
+
+def _common_git_dir(git_dir: Path) -> Path:
+    """Общий каталог git (для worktree ссылки хранятся в основном репозитории)."""
+    try:
+        common = (git_dir / "commondir").read_text(encoding="utf-8").strip()
+    except OSError:
+        return git_dir
+    common_path = Path(common)
+    return common_path if common_path.is_absolute() else (git_dir / common_path).resolve()
+
+
+def _ref_exists(git_dir: Path, ref: str) -> bool:
+    common = _common_git_dir(git_dir)
+    if (common / ref).is_file() or (git_dir / ref).is_file():
+        return True
+    try:
+        with open(common / "packed-refs", encoding="utf-8") as f:
+            return any(line.rstrip("\n").endswith(" " + ref) for line in f)
+    except OSError:
+        return False
+
+
+def read_head_branch(git_dir: Path) -> Optional[str]:
+    """Имя текущей ветки из HEAD; "HEAD" для detached HEAD (как git rev-parse --abbrev-ref).
+
+    Для ещё не созданной ветки (репозиторий без коммитов) возвращает None —
+    git rev-parse в этом случае тоже завершается ошибкой.
+    """
+    try:
+        head = (git_dir / "HEAD").read_text(encoding="utf-8").strip()
+    except OSError:
+        return None
+    if head.startswith("ref:"):
+        ref = head[len("ref:"):].strip()
+        if not _ref_exists(git_dir, ref):
+            return None
+        return ref[len("refs/heads/"):] if ref.startswith("refs/heads/") else ref
+    return "HEAD" if head else None
+
+
+def find_repo_root(start: Path) -> Optional[Path]:
+    """Найти ближайший каталог с маркером .git или .specify, поднимаясь вверх от start."""
+    start = start.resolve()
+    for directory in (start, *start.parents):
+        if (directory / ".git").exists() or (directory / ".specify").is_dir():
+            return directory
+    return None
+
+
+def get_repo_root(cwd: Path | None = None) -> tuple[Path, bool]:
+    """Вернуть корень репозитория и признак наличия git."""
+    cwd = cwd or Path.cwd()
+    found = find_git_dir(cwd)
+    if found:
+        return found[0], True
+    return (find_repo_root(cwd) or cwd.resolve()), False
+
+
+def latest_feature_dir(repo_root: Path) -> Optional[str]:
+    """Имя каталога фичи с наибольшим номером в specs/ или None (по индексу .specify/cache/index.json)."""
+    from .feature_index import load_index
+
+    latest = load_index(repo_root).latest()
+    return latest.branch if latest else None
+
+
+def get_current_branch(repo_root: Path, has_git: bool) -> str:
+    """Текущая фича: SPECIFY_FEATURE, затем ветка git, затем последний каталог в specs/."""
+    env_feature = os.environ.get("SPECIFY_FEATURE")
+    if env_feature:
+        return env_feature
+    if has_git:
+        found = find_git_dir(repo_root)
+        branch = read_head_branch(found[1]) if found else None
+        if branch:
+            return branch
+    return latest_feature_dir(repo_root) or "main"
+
+
+def get_feature_paths(cwd: Path | None = None) -> FeaturePaths:
+    """Определить пути текущей фичи так же, как get_feature_paths в common.sh.
+
+    В отличие от bash-версии, git не запускается: корень и ветка читаются из .git напрямую.
+    """
+    cwd = cwd or Path.cwd()
+    found = find_git_dir(cwd)
+    env_feature = os.environ.get("SPECIFY_FEATURE")
+    if found:
+        repo_root, git_dir = found
+        branch = env_feature or read_head_branch(git_dir) or latest_feature_dir(repo_root) or "main"
+    else:
+        repo_root = find_repo_root(cwd) or cwd.resolve()
+        branch = env_feature or latest_feature_dir(repo_root) or "main"
+    return FeaturePaths(
+        repo_root=repo_root,
+        current_branch=branch,
+        has_git=found is not None,
+        feature_dir=repo_root / "specs" / branch,
+    )
+
+
+def is_feature_branch(branch: str) -> bool:
+    """Соответствует ли имя ветки формату ###-название."""
+    return bool(FEATURE_DIR_RE.match(branch))
@@ -0,0 +1,265 @@
+"""
+Кэшируемый индекс фич в specs/ (.specify/cache/index.json).
+
+Скрипты common.sh и create-new-feature.sh при каждом вызове перебирают все
+каталоги specs/ и запускают basename/grep для каждого. Индекс хранит номер,
+слаг, ветку и доступные артефакты каждой фичи и инвалидируется по mtime
+каталогов: если mtime specs/ не изменился, набор фич заведомо тот же, и
+ответы на «следующий номер» и «последняя фича» даются без обхода каталога.
+Каталог отдельной фичи пересканируется только при изменении его mtime.
+"""
+
+import os
+import re
+import shutil
+import subprocess
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from .feature import FEATURE_DIR_RE
+from .fsutil import CACHE_DIR, atomic_write_json, project_cache_dir, read_json
+
+INDEX_VERSION = 1
+INDEX_RELATIVE_PATH = CACHE_DIR / "index.json"
+# Location before the index moved under the git-ignored cache directory
+LEGACY_INDEX_RELATIVE_PATH = Path(".specify") / "index.json"
+
+# Artifacts reported for each feature; directories count only when non-empty
+FEATURE_ARTIFACTS = (
+    "spec.md",
+    "plan.md",
+    "tasks.md",
+    "research.md",
+    "data-model.md",
+    "quickstart.md",
+    "contracts/",
+    "checklists/",
+)
+
+_NUMBERED_DIR_RE = re.compile(r"^(\d+)(?:-(.*))?$")
+
+# A directory modified within this window may still change inside the same mtime tick,
+# so its mtime is not trusted and it is rescanned next time (the "racy git" problem)
+_RACY_WINDOW_NS = 2_000_000_000
+
+
+@dataclass
+class FeatureEntry:
+    """Запись индекса об одном каталоге фичи."""
+
+    branch: str
+    number: int
+    slug: str
+    mtime_ns: Optional[int] = None
+    artifacts: dict[str, float] = field(default_factory=dict)
+
+    def as_dict(self) -> dict:
+        return {
+            "number": self.number,
+            "slug": self.slug,
+            "branch": self.branch,
+            "mtime_ns": self.mtime_ns,
+            "artifacts": self.artifacts,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "FeatureEntry":
+        return cls(
+            branch=data["branch"],
+            number=int(data["number"]),
+            slug=data.get("slug", ""),
+            mtime_ns=data.get("mtime_ns"),
+            artifacts=dict(data.get("artifacts") or {}),
+        )
+
+
+def _trusted_mtime(mtime_ns: int) -> Optional[int]:
+    return None if time.time_ns() - mtime_ns < _RACY_WINDOW_NS else mtime_ns
+
+
+def _scan_artifacts(feature_dir: Path) -> dict[str, float]:
+    artifacts: dict[str, float] = {}
+    try:
+        entries = {e.name: e for e in os.scandir(feature_dir)}
+    except OSError:
+        return artifacts
+    for name in FEATURE_ARTIFACTS:
+        entry = entries.get(name.rstrip("/"))
+        if entry is None:
+            continue
+        try:
+            if name.endswith("/"):
+                if not entry.is_dir() or not any(os.scandir(entry.path)):
+                    continue
+            elif not entry.is_file():
+                continue
+            artifacts[name] = entry.stat().st_mtime
+        except OSError:
+            continue
+    return artifacts
+
+
+class FeatureIndex:
+    """Индекс каталогов specs/NNN-* с инкрементальным обновлением по mtime."""
+
+    def __init__(self, repo_root: Path):
+        self.repo_root = repo_root
+        self.specs_dir = repo_root / "specs"
+        self.path = repo_root / INDEX_RELATIVE_PATH
+        self.specs_mtime_ns: Optional[int] = None
+        self.entries: dict[str, FeatureEntry] = {}
+        self._dirty = False
+
+    @classmethod
+    def load(cls, repo_root: Path) -> "FeatureIndex":
+        index = cls(repo_root)
+        data = read_json(index.path)
+        if isinstance(data, dict) and data.get("version") == INDEX_VERSION:
+            try:
+                index.specs_mtime_ns = data.get("specs_mtime_ns")
+                index.entries = {
+                    name: FeatureEntry.from_dict(entry) for name, entry in (data.get("features") or {}).items()
+                }
+            except (KeyError, TypeError, ValueError):
+                index.specs_mtime_ns = None
+                index.entries = {}
+        return index
+
+    def refresh(self, *, deep: bool = False) -> "FeatureIndex":
+        """Синхронизировать индекс с диском.
+
+        Набор фич пересчитывается только при изменении mtime specs/. С deep=True
+        дополнительно проверяется mtime каждого каталога фичи, и артефакты
+        пересканируются у тех, что изменились.
+        """
+        try:
+            st = os.stat(self.specs_dir)
+        except OSError:
+            if self.entries or self.specs_mtime_ns is not None:
+                self.entries = {}
+                self.specs_mtime_ns = None
+                self._dirty = True
+            return self
+
+        if self.specs_mtime_ns != st.st_mtime_ns:
+            self._rescan_specs()
+            self.specs_mtime_ns = _trusted_mtime(st.st_mtime_ns)
+            self._dirty = True
+
+        if deep:
+            for entry in self.entries.values():
+                self._refresh_entry(entry)
+        return self
+
+    def _rescan_specs(self) -> None:
+        seen: set[str] = set()
+        for dir_entry in os.scandir(self.specs_dir):
+            m = _NUMBERED_DIR_RE.match(dir_entry.name)
+            if not m or not dir_entry.is_dir():
+                continue
+            seen.add(dir_entry.name)
+            if dir_entry.name not in self.entries:
+                self.entries[dir_entry.name] = FeatureEntry(
+                    branch=dir_entry.name,
+                    number=int(m.group(1)),
+                    slug=m.group(2) or "",
+                )
+        for name in set(self.entries) - seen:
+            del self.entries[name]
+
+    def _refresh_entry(self, entry: FeatureEntry) -> None:
+        feature_dir = self.specs_dir / entry.branch
+        try:
+            mtime_ns = os.stat(feature_dir).st_mtime_ns
+        except OSError:
+            return
+        if entry.mtime_ns is not None and entry.mtime_ns == mtime_ns:
+            return
+        entry.artifacts = _scan_artifacts(feature_dir)
+        entry.mtime_ns = _trusted_mtime(mtime_ns)
+        self._dirty = True
+
+    def save(self) -> None:
+        """Сохранить индекс, если он изменился и проект содержит каталог .specify."""
+        if not self._dirty or not (self.repo_root / ".specify").is_dir():
+            return
+        project_cache_dir(self.repo_root)
+        (self.repo_root / LEGACY_INDEX_RELATIVE_PATH).unlink(missing_ok=True)
+        atomic_write_json(self.path, {
+            "version": INDEX_VERSION,
+            "specs_mtime_ns": self.specs_mtime_ns,
+            "features": {name: entry.as_dict() for name, entry in sorted(self.entries.items())},
+        })
+        self._dirty = False
+
+    def add(self, branch: str) -> FeatureEntry:
+        """Зарегистрировать только что созданный каталог фичи без полного пересканирования."""
+        m = _NUMBERED_DIR_RE.match(branch)
+        entry = FeatureEntry(branch=branch, number=int(m.group(1)) if m else 0, slug=(m.group(2) or "") if m else "")
+        self.entries[branch] = entry
+        self._refresh_entry(entry)
+        # The new directory bumped specs/ mtime; record it so the next call skips the rescan
+        try:
+            self.specs_mtime_ns = _trusted_mtime(os.stat(self.specs_dir).st_mtime_ns)
+        except OSError:
+            self.specs_mtime_ns = None
+        self._dirty = True
+        return entry
+
+    def highest_number(self) -> int:
+        return max((e.number for e in self.entries.values()), default=0)
+
+    def latest(self) -> Optional[FeatureEntry]:
+        """Фича с наибольшим номером среди каталогов вида ###-название."""
+        candidates = [e for e in self.entries.values() if FEATURE_DIR_RE.match(e.branch)]
+        return max(candidates, key=lambda e: e.number, default=None)
+
+    def sorted_entries(self) -> list[FeatureEntry]:
+        return sorted(self.entries.values(), key=lambda e: (e.number, e.branch))
+
+
+def load_index(repo_root: Path, *, deep: bool = False) -> FeatureIndex:
+    """Загрузить индекс, синхронизировать его с диском и сохранить при изменениях."""
+    index = FeatureIndex.load(repo_root).refresh(deep=deep)
+    index.save()
+    return index
+
+
+def branch_name_for(description: str, number: int) -> str:
+    """Имя ветки в том же формате, что формирует create-new-feature.sh."""
+    slug = re.sub(r"-+", "-", re.sub(r"[^a-z0-9]", "-", description.lower())).strip("-")
+    words = "-".join([w for w in slug.split("-") if w][:3])
+    return f"{number:03d}-{words}"
+
+
+def create_feature(repo_root: Path, has_git: bool, description: str) -> dict:
+    """Создать новую фичу так же, как create-new-feature.sh: ветку, каталог и spec.md.
+
+    Returns:
+        Словарь с ключами BRANCH_NAME, SPEC_FILE, FEATURE_NUM (формат JSON скрипта)
+    """
+    specs_dir = repo_root / "specs"
+    specs_dir.mkdir(parents=True, exist_ok=True)
+    index = FeatureIndex.load(repo_root).refresh()
+    number = index.highest_number() + 1
+    branch = branch_name_for(description, number)
+
+    if has_git:
+        result = subprocess.run(["git", "checkout", "-b", branch], cwd=repo_root, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"git checkout -b {branch} завершился с ошибкой: {result.stderr.strip()}")
+
+    feature_dir = specs_dir / branch
+    feature_dir.mkdir(parents=True, exist_ok=True)
+    spec_file = feature_dir / "spec.md"
+    template = repo_root / ".specify" / "templates" / "spec-template.md"
+    if template.is_file():
+        shutil.copyfile(template, spec_file)
+    else:
+        spec_file.touch()
+
+    index.add(branch)
+    index.save()
+    return {"BRANCH_NAME": branch, "SPEC_FILE": str(spec_file), "FEATURE_NUM": f"{number:03d}"}
@@ -0,0 +1,59 @@
+"""Файловые утилиты, общие для нативных подкоманд CLI."""
+
+import json
+import os
+import tempfile
+from pathlib import Path
+
+CACHE_DIR = Path(".specify") / "cache"
+
+# Read once: os.umask can only be queried by setting it, which is not thread-safe
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def new_file_mode(executable: bool = False) -> int:
+    """Права нового файла, как у open() с текущей umask (mkstemp всегда создаёт 0600)."""
+    return (0o777 if executable else 0o666) & ~_UMASK
+
+
+def atomic_write_text(path: Path, content: str) -> None:
+    """Записать файл атомарно: временный файл в том же каталоге + os.replace."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="\n") as f:
+            f.write(content)
+        try:
+            mode = path.stat().st_mode & 0o7777
+        except FileNotFoundError:
+            mode = new_file_mode()
+        os.chmod(tmp_name, mode)
+        os.replace(tmp_name, path)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+
+
+def atomic_write_json(path: Path, data) -> None:
+    """Сериализовать data в JSON и записать атомарно."""
+    atomic_write_text(path, json.dumps(data, ensure_ascii=False, indent=2) + "\n")
+
+
+def project_cache_dir(root: Path) -> Path:
+    """Каталог кэшей проекта .specify/cache/; создаётся вместе с .gitignore, исключающим его из git."""
+    path = root / CACHE_DIR
+    ignore = path / ".gitignore"
+    if not ignore.is_file():
+        atomic_write_text(ignore, "*\n")
+    return path
+
+
+def read_json(path: Path):
+    """Прочитать JSON-файл; вернуть None, если файла нет или он повреждён."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,271 @@
+"""
+Локальная история запусков `init` и `check` и отчёт `specify-ru stats`.
+
+Каждый запуск добавляет одну строку JSON в runs.jsonl в пользовательском
+каталоге данных specify-ru: длительности шагов StepTracker, объём
+скачанного, число файлов, релиз, агент, попадание в кэш и код завершения.
+Запись выполняется одним write() в режиме O_APPEND, поэтому параллельные
+запуски не перемешивают строки. Когда файл превышает MAX_BYTES, он
+переименовывается в runs.1.jsonl (старые сдвигаются до runs.<KEEP>.jsonl).
+
+SPECIFY_NO_HISTORY=1 отключает запись.
+"""
+
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from platformdirs import user_data_dir
+
+from .fsutil import atomic_write_text
+
+HISTORY_SCHEMA = 1
+HISTORY_FILE = "runs.jsonl"
+HISTORY_ENV = "SPECIFY_NO_HISTORY"
+MAX_BYTES = 1 << 20
+KEEP = 3
+QUANTILES = (0.5, 0.95)
+
+
+def history_dir() -> Path:
+    return Path(user_data_dir("specify-ru")) / "history"
+
+
+def history_enabled() -> bool:
+    return os.getenv(HISTORY_ENV, "").strip().lower() not in ("1", "true", "yes", "on")
+
+
+def _rotated(directory: Path, n: int) -> Path:
+    return directory / (HISTORY_FILE if n == 0 else HISTORY_FILE.replace(".jsonl", f".{n}.jsonl"))
+
+
+def _rotate(directory: Path) -> None:
+    for n in range(KEEP, 0, -1):
+        source = _rotated(directory, n - 1)
+        if source.exists():
+            os.replace(source, _rotated(directory, n))
+
+
+def append_run(record: dict, directory: Optional[Path] = None) -> Path:
+    """Добавить запись о запуске в журнал; при превышении MAX_BYTES журнал ротируется."""
+    directory = Path(directory) if directory else history_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    path = _rotated(directory, 0)
+    try:
+        if path.stat().st_size >= MAX_BYTES:
+            _rotate(directory)
+    except FileNotFoundError:
+        pass
+    line = json.dumps({"v": HISTORY_SCHEMA, **record}, ensure_ascii=False, separators=(",", ":")) + "\n"
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line.encode("utf-8"))
+    finally:
+        os.close(fd)
+    return path
+
+
+def read_runs(directory: Optional[Path] = None) -> Iterator[dict]:
+    """Записи журнала от старых к новым; повреждённые строки пропускаются."""
+    directory = Path(directory) if directory else history_dir()
+    for n in range(KEEP, -1, -1):
+        try:
+            with open(_rotated(directory, n), encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if isinstance(record, dict) and record.get("v") == HISTORY_SCHEMA:
+                        yield record
+        except FileNotFoundError:
+            continue
+
+
+def cache_state(downloaded: int, cache_hits: int) -> str:
+    """hit — ничего не скачано, partial — часть слоёв из кэша, miss — всё из сети."""
+    if not downloaded:
+        return "hit"
+    return "partial" if cache_hits else "miss"
+
+
+def make_record(command: str, *, started: float, exit_code: int, phases: dict[str, float], **fields) -> dict:
+    """Запись о запуске: started — time.time() начала, phases — длительности шагов в секундах."""
+    return {
+        "ts": datetime.fromtimestamp(started, timezone.utc).isoformat(timespec="seconds"),
+        "command": command,
+        "exit": exit_code,
+        "duration": round(time.time() - started, 4),
+        "phases": {key: round(value, 4) for key, value in phases.items()},
+        "platform": sys.platform,
+        **fields,
+    }
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Перцентиль с линейной интерполяцией (как numpy.percentile по умолчанию)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * q
+    low = int(pos)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+
+@dataclass
+class Distribution:
+    values: list[float] = field(default_factory=list)
+
+    def add(self, value: float) -> None:
+        self.values.append(value)
+
+    def as_dict(self) -> dict:
+        return {
+            "count": len(self.values),
+            "sum": round(sum(self.values), 4),
+            "p50": round(percentile(self.values, 0.5), 4),
+            "p95": round(percentile(self.values, 0.95), 4),
+            "max": round(max(self.values, default=0.0), 4),
+        }
+
+
+@dataclass
+class CommandStats:
+    command: str
+    runs: int = 0
+    failures: int = 0
+    downloaded: int = 0
+    cache: dict[str, int] = field(default_factory=dict)
+    duration: Distribution = field(default_factory=Distribution)
+    phases: dict[str, Distribution] = field(default_factory=dict)
+    # ISO week ("2026-W42") -> durations of runs started that week
+    weeks: dict[str, Distribution] = field(default_factory=dict)
+    last_ts: Optional[str] = None
+
+    def as_dict(self) -> dict:
+        return {
+            "command": self.command,
+            "runs": self.runs,
+            "failures": self.failures,
+            "downloaded": self.downloaded,
+            "cache": self.cache,
+            "duration": self.duration.as_dict(),
+            "phases": {key: d.as_dict() for key, d in self.phases.items()},
+            "weeks": {key: d.as_dict() for key, d in sorted(self.weeks.items())},
+            "last_ts": self.last_ts,
+        }
+
+
+def _parse_ts(value) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def summarize(runs: Iterable[dict], *, command: Optional[str] = None, days: Optional[int] = None) -> dict[str, CommandStats]:
+    """Свести записи по командам: перцентили общей длительности и шагов, недельные тренды."""
+    since = datetime.now(timezone.utc) - timedelta(days=days) if days else None
+    stats: dict[str, CommandStats] = {}
+    for run in runs:
+        name = run.get("command")
+        if not name or (command and name != command):
+            continue
+        ts = _parse_ts(run.get("ts"))
+        if since and (ts is None or ts < since):
+            continue
+        entry = stats.setdefault(name, CommandStats(command=name))
+        entry.runs += 1
+        if run.get("exit"):
+            entry.failures += 1
+        entry.downloaded += int(run.get("downloaded") or 0)
+        if run.get("cache"):
+            entry.cache[run["cache"]] = entry.cache.get(run["cache"], 0) + 1
+        duration = float(run.get("duration") or 0.0)
+        entry.duration.add(duration)
+        for phase, seconds in (run.get("phases") or {}).items():
+            entry.phases.setdefault(phase, Distribution()).add(float(seconds))
+        if ts:
+            year, week, _ = ts.isocalendar()
+            entry.weeks.setdefault(f"{year}-W{week:02d}", Distribution()).add(duration)
+            entry.last_ts = max(entry.last_ts or "", run["ts"])
+    return stats
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def to_openmetrics(stats: dict[str, CommandStats]) -> str:
+    """Сводка в формате OpenMetrics (совместим с textfile collector node_exporter)."""
+    # Counts cover the rotating log window rather than growing forever, so they are gauges
+    lines = [
+        "# HELP specify_ru_runs Recorded specify-ru runs in the history window.",
+        "# TYPE specify_ru_runs gauge",
+    ]
+    for name, s in sorted(stats.items()):
+        lines.append(f'specify_ru_runs{{command="{_escape(name)}",status="ok"}} {s.runs - s.failures}')
+        lines.append(f'specify_ru_runs{{command="{_escape(name)}",status="error"}} {s.failures}')
+
+    lines += [
+        "# HELP specify_ru_run_duration_seconds Wall-clock duration of specify-ru runs.",
+        "# TYPE specify_ru_run_duration_seconds summary",
+    ]
+    for name, s in sorted(stats.items()):
+        label = f'command="{_escape(name)}"'
+        for q in QUANTILES:
+            lines.append(f'specify_ru_run_duration_seconds{{{label},quantile="{q}"}} {percentile(s.duration.values, q):.6f}')
+        lines.append(f"specify_ru_run_duration_seconds_sum{{{label}}} {sum(s.duration.values):.6f}")
+        lines.append(f"specify_ru_run_duration_seconds_count{{{label}}} {len(s.duration.values)}")
+
+    lines += [
+        "# HELP specify_ru_phase_duration_seconds Duration of individual run phases.",
+        "# TYPE specify_ru_phase_duration_seconds summary",
+    ]
+    for name, s in sorted(stats.items()):
+        for phase, d in s.phases.items():
+            label = f'command="{_escape(name)}",phase="{_escape(phase)}"'
+            for q in QUANTILES:
+                lines.append(f'specify_ru_phase_duration_seconds{{{label},quantile="{q}"}} {percentile(d.values, q):.6f}')
+            lines.append(f"specify_ru_phase_duration_seconds_sum{{{label}}} {sum(d.values):.6f}")
+            lines.append(f"specify_ru_phase_duration_seconds_count{{{label}}} {len(d.values)}")
+
+    lines += [
+        "# HELP specify_ru_downloaded_bytes Bytes downloaded by recorded runs.",
+        "# TYPE specify_ru_downloaded_bytes gauge",
+        "# UNIT specify_ru_downloaded_bytes bytes",
+    ]
+    for name, s in sorted(stats.items()):
+        lines.append(f'specify_ru_downloaded_bytes{{command="{_escape(name)}"}} {s.downloaded}')
+
+    lines += [
+        "# HELP specify_ru_template_cache_runs Recorded runs by template cache state.",
+        "# TYPE specify_ru_template_cache_runs gauge",
+    ]
+    for name, s in sorted(stats.items()):
+        for state, count in sorted(s.cache.items()):
+            lines.append(f'specify_ru_template_cache_runs{{command="{_escape(name)}",state="{_escape(state)}"}} {count}')
+
+    lines += [
+        "# HELP specify_ru_last_run_timestamp_seconds Start time of the latest recorded run.",
+        "# TYPE specify_ru_last_run_timestamp_seconds gauge",
+        "# UNIT specify_ru_last_run_timestamp_seconds seconds",
+    ]
+    for name, s in sorted(stats.items()):
+        ts = _parse_ts(s.last_ts)
+        if ts:
+            lines.append(f'specify_ru_last_run_timestamp_seconds{{command="{_escape(name)}"}} {ts.timestamp():.0f}')
+
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(path: Path, content: str) -> None:
+    """Записать файл для textfile collector атомарно (права — как у обычного нового файла)."""
+    atomic_write_text(path, content)
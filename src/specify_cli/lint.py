@@ -0,0 +1,377 @@
+"""
+Структурная проверка артефактов всех фич репозитория (`specify-ru lint`).
+
+Правила выводятся из шаблонов (.specify/templates/ в проекте или templates/
+в репозитории шаблонов), поэтому изменения шаблонов сразу меняют проверки:
+
+- разделы второго уровня шаблона должны быть в документе (помеченные
+  «*(обязательно)*» — ошибка, остальные — предупреждение);
+- незаполненные плейсхолдеры шаблона ([конкретная возможность], [DATE], ...);
+- неразрешённые [NEEDS CLARIFICATION];
+- дубли идентификаторов FR/SC, T### и CHK###;
+- образцы задач и пунктов чек-листа, перенесённые из шаблона без изменений.
+
+Файлы проверяются в пуле процессов; результаты кэшируются в
+.specify/cache/lint.json по sha256 содержимого, поэтому повторный запуск
+проверяет только изменившиеся файлы.
+"""
+
+import hashlib
+import json
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, Optional
+
+from .artifacts import Marker, find_markers, parse_spec_text, split_sections, strip_comments
+from .feature import FEATURE_DIR_RE
+from .fsutil import CACHE_DIR, atomic_write_text, project_cache_dir, read_json
+from .tasks_graph import parse_tasks_text
+
+LINT_VERSION = 1
+CACHE_RELATIVE_PATH = CACHE_DIR / "lint.json"
+TEMPLATE_DIRS = (Path(".specify") / "templates", Path("templates"))
+TEMPLATE_FILES = {
+    "spec": "spec-template.md",
+    "plan": "plan-template.md",
+    "tasks": "tasks-template.md",
+    "checklist": "checklist-template.md",
+}
+# Below this many files to check, starting worker processes costs more than it saves
+MIN_PARALLEL = 16
+
+_BRACKET_RE = re.compile(r"\[(?P<text>[^\[\]\n]+)\](?!\()")
+_ANNOTATION_RE = re.compile(r"\s*(?:\*\((?P<note>[^)]*)\)\*|\((?P<plain>[^)]*)\))\s*$")
+_CHECK_ITEM_RE = re.compile(r"^\s*[-*]\s+\[[ xX]\]\s+(?P<id>CHK\d+)\b\s*(?P<text>.*)$")
+# Bracketed tokens that are syntax rather than placeholders: checkboxes and task labels
+_SYNTAX_TOKEN_RE = re.compile(r"^(?:[ xX]|P\??|US\d+|ID|Story|T\d+|CHK\d+|link)$")
+_TRAILING_MARKS = " 🎯⚠️️‍"
+
+
+@dataclass
+class LintIssue:
+    file: str
+    line: int
+    severity: str  # error | warning
+    code: str
+    message: str
+
+    def as_dict(self) -> dict:
+        return {"file": self.file, "line": self.line, "severity": self.severity, "code": self.code, "message": self.message}
+
+
+@dataclass(frozen=True)
+class TemplateRules:
+    """Правила одного вида документа, извлечённые из шаблона."""
+
+    kind: str
+    title: str  # level-1 heading prefix, e.g. "Спецификация фичи"
+    required: tuple[str, ...]  # mandatory level-2 section names
+    expected: tuple[str, ...]  # other level-2 section names of the template
+    placeholders: frozenset[str]  # normalized placeholder keys
+    samples: frozenset[str]  # sample task / checklist item texts
+
+
+@dataclass
+class LintReport:
+    root: Path
+    files: list[str] = field(default_factory=list)
+    issues: list[LintIssue] = field(default_factory=list)
+    cached: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def errors(self) -> int:
+        return sum(1 for i in self.issues if i.severity == "error")
+
+    @property
+    def warnings(self) -> int:
+        return sum(1 for i in self.issues if i.severity == "warning")
+
+    def as_dict(self) -> dict:
+        return {
+            "root": str(self.root),
+            "files": len(self.files),
+            "cached": self.cached,
+            "errors": self.errors,
+            "warnings": self.warnings,
+            "elapsed": round(self.elapsed, 3),
+            "issues": [i.as_dict() for i in self.issues],
+        }
+
+
+def _heading_name(title: str) -> str:
+    """Заголовок без пометок вида *(обязательно)* и эмодзи."""
+    while True:
+        m = _ANNOTATION_RE.search(title)
+        if not m:
+            break
+        title = title[:m.start()]
+    return title.strip(_TRAILING_MARKS).strip()
+
+
+def _placeholder_key(text: str) -> str:
+    # "[конкретная возможность, напр. «...»]" and "[конкретная возможность]" are the same placeholder
+    return re.split(r"[,:;.(«\"]", text, maxsplit=1)[0].strip().lower()
+
+
+def _is_placeholder_token(text: str) -> bool:
+    return not _SYNTAX_TOKEN_RE.match(text.strip()) and not text.upper().startswith("NEEDS CLARIFICATION")
+
+
+def find_template_placeholders(text: str, placeholders: frozenset[str]) -> list[Marker]:
+    """Незаполненные плейсхолдеры шаблона в тексте документа (по ключам TemplateRules.placeholders)."""
+    markers: list[Marker] = []
+    if not placeholders:
+        return markers
+    for lineno, line in enumerate(strip_comments(text).splitlines(), start=1):
+        for m in _BRACKET_RE.finditer(line):
+            if _is_placeholder_token(m.group("text")) and _placeholder_key(m.group("text")) in placeholders:
+                markers.append(Marker("placeholder", lineno, m.group(0)))
+    return markers
+
+
+def build_rules(kind: str, template_text: str) -> TemplateRules:
+    """Извлечь правила из текста шаблона."""
+    text = strip_comments(template_text)
+    sections = split_sections(text)
+    title = next((s.title for s in sections if s.level == 1), "")
+    required: list[str] = []
+    expected: list[str] = []
+    for s in sections:
+        if s.level != 2 or "[" in s.title or re.match(r"^(?:Фаза|Phase)\s+(?:\d+|N)\b", s.title):
+            continue
+        if re.match(r"^(?:Пример|Example)\b", s.title):
+            continue
+        note = s.title.lower()
+        (required if "обязательно" in note or "mandatory" in note else expected).append(_heading_name(s.title))
+
+    placeholders = set()
+    for m in _BRACKET_RE.finditer(text):
+        if _is_placeholder_token(m.group("text")):
+            key = _placeholder_key(m.group("text"))
+            if len(key) >= 3:
+                placeholders.add(key)
+
+    samples = {t.description for t in parse_tasks_text(text)}
+    samples.update(m.group("text").strip() for line in text.splitlines() if (m := _CHECK_ITEM_RE.match(line)))
+    return TemplateRules(
+        kind=kind,
+        title=title.split(":", 1)[0].strip(),
+        required=tuple(required),
+        expected=tuple(expected),
+        placeholders=frozenset(placeholders),
+        samples=frozenset(s for s in samples if s),
+    )
+
+
+def load_rules(root: Path) -> dict[str, TemplateRules]:
+    """Правила для всех видов документов по шаблонам проекта (если шаблон найден)."""
+    rules: dict[str, TemplateRules] = {}
+    for kind, name in TEMPLATE_FILES.items():
+        for base in TEMPLATE_DIRS:
+            path = root / base / name
+            if path.is_file():
+                rules[kind] = build_rules(kind, path.read_text(encoding="utf-8"))
+                break
+    return rules
+
+
+def document_kind(path: Path) -> Optional[str]:
+    if path.name in ("spec.md", "plan.md", "tasks.md"):
+        return path.stem
+    if path.parent.name == "checklists" and path.suffix == ".md":
+        return "checklist"
+    return None
+
+
+def _duplicates(items: Iterable[tuple[str, int]], file: str, what: str) -> list[LintIssue]:
+    seen: dict[str, int] = {}
+    issues = []
+    for ident, line in items:
+        if ident in seen:
+            issues.append(LintIssue(file, line, "error", "duplicate-id", f"{what} {ident} повторяется (впервые — строка {seen[ident]})"))
+        else:
+            seen[ident] = line
+    return issues
+
+
+def lint_text(file: str, kind: str, text: str, rules: Optional[TemplateRules]) -> list[LintIssue]:
+    """Проверить один документ. file — путь для сообщений."""
+    issues: list[LintIssue] = []
+    clean = strip_comments(text)
+    sections = split_sections(clean)
+
+    if rules:
+        heading = next((s for s in sections if s.level == 1), None)
+        if heading is None:
+            issues.append(LintIssue(file, 1, "warning", "title", f"Нет заголовка первого уровня «{rules.title}: …»"))
+        elif rules.title and not heading.title.lower().startswith(rules.title.lower()):
+            issues.append(LintIssue(file, heading.line, "warning", "title", f"Заголовок не соответствует шаблону: ожидается «{rules.title}: …»"))
+        present = {_heading_name(s.title).lower() for s in sections if s.level == 2}
+        for name in rules.required:
+            if name.lower() not in present:
+                issues.append(LintIssue(file, 1, "error", "missing-section", f"Нет обязательного раздела «{name}»"))
+        for name in rules.expected:
+            if name.lower() not in present:
+                issues.append(LintIssue(file, 1, "warning", "missing-section", f"Нет раздела шаблона «{name}»"))
+
+    reported: set[tuple[int, str]] = set()
+    for marker in find_markers(text):
+        if marker.kind == "clarification":
+            issues.append(LintIssue(file, marker.line, "error", "clarification", f"Неразрешённый [NEEDS CLARIFICATION]: {marker.text}"))
+        elif _is_placeholder_token(marker.text[1:-1]):
+            reported.add((marker.line, marker.text))
+            issues.append(LintIssue(file, marker.line, "error", "placeholder", f"Незаполненный плейсхолдер {marker.text}"))
+    if rules:
+        for marker in find_template_placeholders(text, rules.placeholders):
+            if (marker.line, marker.text) not in reported:
+                reported.add((marker.line, marker.text))
+                issues.append(LintIssue(file, marker.line, "error", "placeholder", f"Незаполненный плейсхолдер шаблона {marker.text}"))
+
+    if kind == "spec":
+        spec = parse_spec_text(text)
+        issues += _duplicates(((r.id, r.line) for r in spec.requirements), file, "Требование")
+    elif kind == "tasks":
+        tasks = parse_tasks_text(clean)
+        if not tasks:
+            issues.append(LintIssue(file, 1, "error", "no-items", "Нет ни одной задачи вида «- [ ] T001 …»"))
+        issues += _duplicates(((t.id, t.line) for t in tasks), file, "Задача")
+        if rules:
+            issues += [
+                LintIssue(file, t.line, "warning", "sample", f"Задача {t.id} скопирована из шаблона без изменений")
+                for t in tasks if t.description in rules.samples
+            ]
+    elif kind == "checklist":
+        items = [(m.group("id"), lineno, m.group("text").strip()) for lineno, line in enumerate(clean.splitlines(), start=1) if (m := _CHECK_ITEM_RE.match(line))]
+        if not items:
+            issues.append(LintIssue(file, 1, "error", "no-items", "Нет ни одного пункта вида «- [ ] CHK001 …»"))
+        issues += _duplicates(((ident, line) for ident, line, _ in items), file, "Пункт")
+        if rules:
+            issues += [
+                LintIssue(file, line, "warning", "sample", f"Пункт {ident} скопирован из шаблона без изменений")
+                for ident, line, item in items if item in rules.samples
+            ]
+
+    issues.sort(key=lambda i: (i.line, i.code))
+    return issues
+
+
+def _lint_job(job: tuple[str, str, str, Optional[TemplateRules]]) -> list[dict]:
+    # Runs in a worker process: arguments and results must be picklable
+    file, kind, text, rules = job
+    return [i.as_dict() for i in lint_text(file, kind, text, rules)]
+
+
+def _in_feature_dir(path: Path) -> bool:
+    feature_dir = path.parent.parent if path.parent.name == "checklists" else path.parent
+    return bool(FEATURE_DIR_RE.match(feature_dir.name))
+
+
+def collect_files(root: Path, paths: Iterable[Path] = ()) -> list[Path]:
+    """Документы фич: по умолчанию все spec/plan/tasks и чек-листы в specs/.
+
+    В каталогах учитываются только документы внутри каталогов фич (###-имя),
+    явно указанные файлы проверяются всегда.
+    """
+    targets = list(paths) or [root / "specs"]
+    found: set[Path] = set()
+    for target in targets:
+        target = target.resolve()
+        if target.is_file():
+            if document_kind(target):
+                found.add(target)
+            continue
+        if not target.is_dir():
+            continue
+        for dirpath, dirnames, filenames in os.walk(target):
+            dirnames[:] = [d for d in dirnames if not d.startswith(".") and d != "node_modules"]
+            base = Path(dirpath)
+            found.update(base / name for name in filenames if document_kind(base / name) and _in_feature_dir(base / name))
+    return sorted(found)
+
+
+def _rules_digest(rules: dict[str, TemplateRules]) -> str:
+    h = hashlib.sha256(str(LINT_VERSION).encode())
+    for kind in sorted(rules):
+        r = rules[kind]
+        h.update(repr((kind, r.title, r.required, r.expected, sorted(r.placeholders), sorted(r.samples))).encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+def lint_repo(
+    root: Path,
+    paths: Iterable[Path] = (),
+    *,
+    jobs: Optional[int] = None,
+    use_cache: bool = True,
+) -> LintReport:
+    """Проверить документы фич под root (или только paths).
+
+    jobs — число процессов (по умолчанию по числу CPU). Кэш пишется, только
+    если в root есть каталог .specify/.
+    """
+    started = time.perf_counter()
+    root = Path(root).resolve()
+    report = LintReport(root=root)
+    rules = load_rules(root)
+    digest = _rules_digest(rules)
+
+    cache_path = root / CACHE_RELATIVE_PATH
+    cache = read_json(cache_path) if use_cache else None
+    if not isinstance(cache, dict) or cache.get("version") != LINT_VERSION or cache.get("rules") != digest:
+        cache = {"version": LINT_VERSION, "rules": digest, "files": {}}
+    old: dict = cache["files"]
+    new: dict = {}
+
+    results: dict[str, list[dict]] = {}
+    pending: list[tuple[str, str, str, Optional[TemplateRules]]] = []
+    hashes: dict[str, str] = {}
+    for path in collect_files(root, paths):
+        try:
+            rel = path.relative_to(root).as_posix()
+        except ValueError:
+            rel = str(path)
+        report.files.append(rel)
+        try:
+            data = path.read_bytes()
+        except OSError as e:
+            results[rel] = [LintIssue(rel, 1, "error", "unreadable", str(e)).as_dict()]
+            continue
+        hashes[rel] = hashlib.sha256(data).hexdigest()
+        entry = old.get(rel)
+        if entry and entry.get("hash") == hashes[rel]:
+            results[rel] = entry["issues"]
+            report.cached += 1
+            continue
+        kind = document_kind(path)
+        pending.append((rel, kind, data.decode("utf-8", errors="replace"), rules.get(kind)))
+
+    workers = jobs or os.cpu_count() or 1
+    if workers > 1 and len(pending) >= MIN_PARALLEL:
+        # concurrent.futures.process alone costs ~30 ms to import; small runs never need it
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as pool:
+            chunk = max(1, len(pending) // (workers * 4))
+            for job, issues in zip(pending, pool.map(_lint_job, pending, chunksize=chunk)):
+                results[job[0]] = issues
+    else:
+        for job in pending:
+            results[job[0]] = _lint_job(job)
+
+    for rel in report.files:
+        report.issues += [LintIssue(**i) for i in results.get(rel, [])]
+        if rel in hashes:
+            new[rel] = {"hash": hashes[rel], "issues": results[rel]}
+
+    if use_cache and (pending or len(new) != len(old)) and (root / ".specify").is_dir():
+        # Keep entries for files outside this run's selection so partial runs don't evict them
+        cache["files"] = {**{k: v for k, v in old.items() if (root / k).is_file()}, **new}
+        project_cache_dir(root)
+        # Compact separators keep json on its C encoder; the cache can hold many issues
+        atomic_write_text(cache_path, json.dumps(cache, ensure_ascii=False, separators=(",", ":")))
+    report.elapsed = time.perf_counter() - started
+    return report
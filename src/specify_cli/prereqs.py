@@ -0,0 +1,125 @@
+"""
+Проверка предпосылок фичи — Python-аналог scripts/bash/check-prerequisites.sh.
+
+Возвращает те же структуры, что скрипт печатает в режиме --json, но работает
+в процессе: корень и ветка читаются из .git напрямую, документы проверяются
+одним os.scandir каталога фичи вместо отдельных test/ls -A на каждый файл.
+"""
+
+import os
+from pathlib import Path
+from typing import Optional
+
+from .feature import FeaturePaths, get_feature_paths, is_feature_branch
+
+# Optional documents in the order check-prerequisites.sh reports them
+OPTIONAL_DOCS = ("research.md", "data-model.md", "contracts/", "quickstart.md")
+
+
+class PrerequisiteError(RuntimeError):
+    """Не выполнена предпосылка; lines — сообщения для stderr в формате скрипта."""
+
+    def __init__(self, *lines: str):
+        super().__init__(lines[0] if lines else "")
+        self.lines = list(lines)
+
+
+def check_feature_branch(paths: FeaturePaths) -> Optional[str]:
+    """Проверить имя ветки. Возвращает предупреждение для репозиториев без git."""
+    if not paths.has_git:
+        return "[specify-ru] Предупреждение: git-репозиторий не обнаружен; проверка названия ветки пропущена"
+    if not is_feature_branch(paths.current_branch):
+        raise PrerequisiteError(
+            f"ОШИБКА: Текущая ветка не является фичевой. Текущая ветка: {paths.current_branch}",
+            "Фичевые ветки должны называться в формате: 001-nazvanie-fichi",
+        )
+    return None
+
+
+def paths_payload(paths: FeaturePaths) -> dict:
+    """Содержимое вывода --paths-only."""
+    return {
+        "REPO_ROOT": str(paths.repo_root),
+        "BRANCH": paths.current_branch,
+        "FEATURE_DIR": str(paths.feature_dir),
+        "FEATURE_SPEC": str(paths.feature_spec),
+        "IMPL_PLAN": str(paths.impl_plan),
+        "TASKS": str(paths.tasks),
+    }
+
+
+def _doc_status(feature_dir: Path) -> dict[str, bool]:
+    """Наличие документов фичи за один проход os.scandir."""
+    status = {name: False for name in (*OPTIONAL_DOCS, "tasks.md", "plan.md")}
+    try:
+        entries = list(os.scandir(feature_dir))
+    except OSError:
+        return status
+    for entry in entries:
+        try:
+            if entry.name == "contracts":
+                if entry.is_dir():
+                    with os.scandir(entry.path) as it:
+                        status["contracts/"] = next(it, None) is not None
+            elif entry.name in status and entry.is_file():
+                status[entry.name] = True
+        except OSError:
+            continue
+    return status
+
+
+def check_prerequisites(
+    paths: FeaturePaths,
+    *,
+    require_tasks: bool = False,
+    include_tasks: bool = False,
+) -> tuple[list[str], dict[str, bool]]:
+    """Проверить обязательные артефакты и собрать список доступных документов.
+
+    Returns:
+        Кортеж (AVAILABLE_DOCS, статус каждого потенциального документа для текстового вывода)
+    """
+    if not paths.feature_dir.is_dir():
+        raise PrerequisiteError(
+            f"ERROR: Каталог фичи не найден: {paths.feature_dir}",
+            "Сначала выполните /specify-ru.specify, чтобы создать структуру фичи.",
+        )
+    status = _doc_status(paths.feature_dir)
+    if not status["plan.md"]:
+        raise PrerequisiteError(
+            f"ERROR: plan.md не найден в {paths.feature_dir}",
+            "Сначала выполните /specify-ru.plan, чтобы создать план реализации.",
+        )
+    if require_tasks and not status["tasks.md"]:
+        raise PrerequisiteError(
+            f"ERROR: tasks.md не найден в {paths.feature_dir}",
+            "Сначала выполните /specify-ru.tasks, чтобы создать список задач.",
+        )
+
+    docs = [name for name in OPTIONAL_DOCS if status[name]]
+    if include_tasks and status["tasks.md"]:
+        docs.append("tasks.md")
+    report = {name: status[name] for name in OPTIONAL_DOCS}
+    if include_tasks:
+        report["tasks.md"] = status["tasks.md"]
+    return docs, report
+
+
+def resolve(
+    cwd: Path | None = None,
+    *,
+    require_tasks: bool = False,
+    include_tasks: bool = False,
+    paths_only: bool = False,
+) -> dict:
+    """Полный аналог check-prerequisites.sh --json в виде словаря.
+
+    Raises:
+        PrerequisiteError: если ветка или артефакты не удовлетворяют условиям
+    """
+    paths = get_feature_paths(cwd)
+    check_feature_branch(paths)
+    if paths_only:
+        return paths_payload(paths)
+    docs, _ = check_prerequisites(paths, require_tasks=require_tasks, include_tasks=include_tasks)
+    return {"FEATURE_DIR": str(paths.feature_dir), "AVAILABLE_DOCS": docs}
@@ -0,0 +1,209 @@
+"""
+Инвентаризация проектов Specify в дереве каталогов (`specify-ru scan`).
+
+Обход выполняется параллельно пулом потоков через os.scandir (системный
+вызов отпускает GIL, что заметно на сетевых дисках). Каталоги
+node_modules, .git, виртуальные окружения (по pyvenv.cfg) и кэши
+инструментов пропускаются, а в найденный проект (каталог с .specify/)
+обход дальше не спускается.
+
+Для каждого проекта определяются релиз шаблона (из .specify/install.json,
+который пишет init), тип скриптов и агенты — по каталогам из AGENT_CONFIG.
+
+Результат кэшируется по mtime каталогов: при повторном обходе каталог, mtime
+которого не изменился, не читается заново — используется сохранённый список
+подкаталогов. Изменения глубже по дереву всё равно находятся, потому что
+каждый подкаталог проверяется по своему mtime.
+"""
+
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from . import AGENT_CONFIG
+from .api import INSTALL_RECORD
+from .fsutil import atomic_write_json, read_json
+
+CACHE_VERSION = 1
+BATCH_SIZE = 64
+
+# Never descended into: dependency trees, VCS internals and tool caches
+PRUNE_NAMES = frozenset({
+    "node_modules", ".git", ".hg", ".svn", "__pycache__", ".venv", "venv",
+    ".tox", ".nox", ".mypy_cache", ".pytest_cache", ".ruff_cache", "site-packages",
+    ".gradle", ".terraform", ".cache",
+})
+
+# Copilot's folder is .github/, which most repositories have anyway: require its prompts
+_AGENT_MARKERS = {key: config["folder"].rstrip("/") for key, config in AGENT_CONFIG.items()}
+_AGENT_MARKERS["copilot"] = ".github/prompts"
+
+
+@dataclass
+class ProjectInfo:
+    path: str
+    release: Optional[str] = None
+    agents: list[str] = field(default_factory=list)
+    scripts: list[str] = field(default_factory=list)
+    installed_at: Optional[str] = None
+
+    def as_dict(self) -> dict:
+        return {
+            "path": self.path,
+            "release": self.release,
+            "agents": self.agents,
+            "scripts": self.scripts,
+            "installed_at": self.installed_at,
+        }
+
+
+@dataclass
+class ScanResult:
+    root: Path
+    projects: list[ProjectInfo] = field(default_factory=list)
+    visited: int = 0  # directories checked
+    listed: int = 0  # directories actually read with scandir
+    elapsed: float = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "root": str(self.root),
+            "projects": [p.as_dict() for p in self.projects],
+            "stats": {
+                "visited": self.visited,
+                "listed": self.listed,
+                "reused": self.visited - self.listed,
+                "elapsed": round(self.elapsed, 3),
+            },
+        }
+
+
+def detect_agents(project: Path) -> list[str]:
+    """Агенты, для которых в проекте есть каталог команд (порядок AGENT_CONFIG)."""
+    return [key for key, marker in _AGENT_MARKERS.items() if (project / marker).is_dir()]
+
+
+def _project_info(path: Path) -> ProjectInfo:
+    info = ProjectInfo(path=str(path), agents=detect_agents(path))
+    scripts_dir = path / ".specify" / "scripts"
+    info.scripts = [name for name, sub in (("sh", "bash"), ("ps", "powershell")) if (scripts_dir / sub).is_dir()]
+    record = read_json(path / INSTALL_RECORD)
+    if isinstance(record, dict):
+        info.release = record.get("release") or None
+        info.installed_at = record.get("installed_at")
+    return info
+
+
+def _mtime(path: Path) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _project_signature(path: Path) -> list:
+    # Project data lives in the directory itself, .specify/ and install.json
+    return [_mtime(path), _mtime(path / ".specify"), _mtime(path / INSTALL_RECORD)]
+
+
+def _visit(path: Path, cached: Optional[dict], prune: frozenset[str]) -> tuple[dict, bool]:
+    """Проверить один каталог. Возвращает (запись кэша, был ли выполнен scandir)."""
+    mtime = _mtime(path)
+    if cached and cached.get("mtime") == mtime and mtime is not None:
+        project = cached.get("project")
+        if project is None:
+            return cached, False
+        if cached.get("signature") == _project_signature(path):
+            return cached, False
+        return {**cached, "project": _project_info(path).as_dict(), "signature": _project_signature(path)}, False
+
+    is_project = False
+    try:
+        with os.scandir(path) as entries:
+            names = []
+            for entry in entries:
+                if entry.name == ".specify" and entry.is_dir(follow_symlinks=False):
+                    is_project = True
+                if entry.name == "pyvenv.cfg":
+                    # A virtualenv root: nothing of interest below
+                    return {"mtime": mtime, "subdirs": [], "project": None}, True
+                if entry.is_dir(follow_symlinks=False) and entry.name not in prune:
+                    names.append(entry.name)
+    except OSError:
+        return {"mtime": mtime, "subdirs": [], "project": None}, True
+
+    if is_project:
+        return {"mtime": mtime, "subdirs": [], "project": _project_info(path).as_dict(), "signature": _project_signature(path)}, True
+    return {"mtime": mtime, "subdirs": sorted(names), "project": None}, True
+
+
+def scan_tree(
+    root: Path,
+    *,
+    jobs: int = 8,
+    cache_path: Optional[Path] = None,
+    exclude: tuple[str, ...] = (),
+) -> ScanResult:
+    """Найти проекты Specify под root.
+
+    cache_path — JSON-файл кэша обхода (None — без кэша). exclude — имена
+    каталогов, которые пропускаются дополнительно к PRUNE_NAMES.
+    """
+    started = time.perf_counter()
+    root = Path(root).resolve()
+    result = ScanResult(root=root)
+    prune = PRUNE_NAMES | frozenset(exclude)
+
+    cache = read_json(cache_path) if cache_path else None
+    if not isinstance(cache, dict) or cache.get("version") != CACHE_VERSION or cache.get("root") != str(root) or cache.get("exclude") != sorted(exclude):
+        cache = {"version": CACHE_VERSION, "root": str(root), "exclude": sorted(exclude), "dirs": {}}
+    old_dirs: dict = cache["dirs"]
+    new_dirs: dict = {}
+
+    def visit_batch(batch: list[tuple[str, Path]]) -> list[tuple[str, Path, dict, bool]]:
+        return [(key, path, *_visit(path, old_dirs.get(key), prune)) for key, path in batch]
+
+    def submit(pool: ThreadPoolExecutor, queue: list[tuple[str, Path]]) -> None:
+        # One task per directory costs more than a cached stat: hand directories out in batches
+        for start in range(0, len(queue), BATCH_SIZE):
+            pending.add(pool.submit(visit_batch, queue[start:start + BATCH_SIZE]))
+
+    pending: set = set()
+    with ThreadPoolExecutor(max_workers=max(1, jobs), thread_name_prefix="specify-scan") as pool:
+        submit(pool, [(".", root)])
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            queue: list[tuple[str, Path]] = []
+            for future in done:
+                for key, path, entry, listed in future.result():
+                    new_dirs[key] = entry
+                    result.visited += 1
+                    result.listed += int(listed)
+                    if entry.get("project"):
+                        result.projects.append(ProjectInfo(**entry["project"]))
+                        continue
+                    for name in entry["subdirs"]:
+                        queue.append((name if key == "." else f"{key}/{name}", path / name))
+            submit(pool, queue)
+
+    result.projects.sort(key=lambda p: p.path)
+    result.elapsed = time.perf_counter() - started
+    if cache_path:
+        cache["dirs"] = new_dirs
+        atomic_write_json(cache_path, cache)
+    return result
+
+
+def to_csv(result: ScanResult) -> str:
+    import csv
+    import io
+
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(["path", "release", "agents", "scripts", "installed_at"])
+    for p in result.projects:
+        writer.writerow([p.path, p.release or "", ";".join(p.agents), ";".join(p.scripts), p.installed_at or ""])
+    return out.getvalue()
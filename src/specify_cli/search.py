@@ -0,0 +1,399 @@
+"""
+Полнотекстовый поиск по артефактам всех фич (`specify-ru search`).
+
+spec.md, plan.md, research.md и tasks.md из specs/NNN-*/ разбиваются на
+разделы по заголовкам, и каждый раздел попадает в инвертированный индекс в
+SQLite (.specify/cache/search.db): термин -> (раздел, частота). Термины
+получаются приведением к нижнему регистру, заменой «ё» на «е», отбрасыванием
+стоп-слов и стеммингом (алгоритм Snowball для русского, облегчённое
+отсечение окончаний для английского), поэтому «авторизации» находит
+«авторизация», а «exports» — «export». Идентификаторы вроде FR-007 и T012
+остаются одним термином.
+
+Разделы ранжируются по BM25; слова заголовка раздела весят вдвое больше.
+Индекс обновляется перед каждым запросом, но перечитываются только файлы, у
+которых изменились размер или mtime и затем sha256 содержимого.
+"""
+
+import hashlib
+import math
+import re
+import sqlite3
+import time
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from .artifacts import split_sections, strip_comments
+from .feature import FEATURE_DIR_RE
+from .fsutil import CACHE_DIR, project_cache_dir
+
+SCHEMA_VERSION = 1
+DB_RELATIVE_PATH = CACHE_DIR / "search.db"
+DOCS = ("spec", "plan", "research", "tasks")
+DEFAULT_LIMIT = 10
+
+# Okapi BM25 parameters; titles count TITLE_WEIGHT times
+K1 = 1.2
+B = 0.75
+TITLE_WEIGHT = 2
+
+_SCHEMA = """
+CREATE TABLE files (path TEXT PRIMARY KEY, feature TEXT NOT NULL, kind TEXT NOT NULL, mtime_ns INTEGER, size INTEGER, hash TEXT);
+CREATE TABLE sections (id INTEGER PRIMARY KEY, path TEXT NOT NULL, title TEXT, line INTEGER, length INTEGER, body TEXT);
+CREATE INDEX sections_path ON sections (path);
+CREATE TABLE postings (term TEXT NOT NULL, section INTEGER NOT NULL, tf INTEGER NOT NULL, PRIMARY KEY (term, section)) WITHOUT ROWID;
+CREATE INDEX postings_section ON postings (section);
+"""
+
+_TOKEN_RE = re.compile(r"[a-zа-я]+-\d+|[0-9a-zа-я]+")
+
+_STOPWORDS = frozenset(
+    """
+    а без более бы был была были было быть в вам вас весь во вот все всего всех вы где да даже для до его ее ей если есть
+    еще же за здесь и из или им их к как какой когда кто ли либо между меня мне можно мы на над нам нас не него нее нет ни
+    них но ну о об однако он она они оно от по под после при про с со так также такой там те тем то того тоже той только
+    том ты у уже хотя чем через что чтобы эта эти это этого этой этом этот эту я
+    a an and are as at be by for from has have in is it its of on or that the this to was were will with
+    """.split()
+)
+
+# Snowball Russian stemmer suffixes; the first set of a pair only applies after «а» or «я»
+_VOWELS = "аеиоуыэюя"
+_PERFECTIVE_GERUND = (frozenset({"вшись", "вши", "в"}), frozenset({"ившись", "ывшись", "ивши", "ывши", "ив", "ыв"}))
+_REFLEXIVE = frozenset({"ся", "сь"})
+_ADJECTIVE = frozenset({
+    "ими", "ыми", "его", "ого", "ему", "ому",
+    "ее", "ие", "ые", "ое", "ей", "ий", "ый", "ой", "ем", "им", "ым", "ом", "их", "ых", "ую", "юю", "ая", "яя", "ою", "ею",
+})
+_PARTICIPLE = (frozenset({"ем", "нн", "вш", "ющ", "щ"}), frozenset({"ивш", "ывш", "ующ"}))
+_VERB = (
+    frozenset({"ете", "йте", "ешь", "нно", "ла", "на", "ли", "ем", "ло", "но", "ет", "ют", "ны", "ть", "й", "л", "н"}),
+    frozenset({
+        "ейте", "уйте", "ила", "ыла", "ена", "ите", "или", "ыли", "ило", "ыло", "ено", "ует", "уют", "ены", "ить", "ыть",
+        "ишь", "ей", "уй", "ил", "ыл", "им", "ым", "ен", "ят", "ит", "ыт", "ую", "ю",
+    }),
+)
+_NOUN = frozenset({
+    "иями", "ями", "ами", "ией", "иям", "ием", "иях",
+    "ев", "ов", "ие", "ье", "еи", "ии", "ей", "ой", "ий", "ям", "ем", "ам", "ом", "ах", "ях", "ию", "ью", "ия", "ья",
+    "а", "е", "и", "й", "о", "у", "ы", "ь", "ю", "я",
+})
+_SUPERLATIVE = frozenset({"ейше", "ейш"})
+_DERIVATIONAL = frozenset({"ость", "ост"})
+
+
+def _regions(word: str) -> tuple[int, int]:
+    """Начала областей RV и R2 алгоритма Snowball."""
+    rv = next((i + 1 for i, ch in enumerate(word) if ch in _VOWELS), len(word))
+
+    def after_vowel_consonant(start: int) -> int:
+        for i in range(start + 1, len(word)):
+            if word[i] not in _VOWELS and word[i - 1] in _VOWELS:
+                return i + 1
+        return len(word)
+
+    r1 = after_vowel_consonant(0)
+    return rv, after_vowel_consonant(r1) if r1 < len(word) else len(word)
+
+
+def _longest(word: str, start: int, suffixes) -> Optional[str]:
+    # Suffixes are at most six letters: test each length once, longest first
+    for n in range(min(6, len(word) - start), 0, -1):
+        if word[-n:] in suffixes:
+            return word[-n:]
+    return None
+
+
+def _strip_grouped(word: str, start: int, groups) -> Optional[str]:
+    """Снять самое длинное окончание; окончания первой группы — только после «а» или «я»."""
+    first, second = groups
+    suffix = _longest(word, start, first | second)
+    if suffix is None:
+        return None
+    stem = word[: -len(suffix)]
+    if suffix in second:
+        return stem
+    if len(stem) > start and stem[-1] in "ая":
+        return stem
+    return None
+
+
+def stem_russian(word: str) -> str:
+    """Основа русского слова по алгоритму Snowball (Porter)."""
+    rv, r2 = _regions(word)
+    if rv >= len(word):
+        return word
+
+    stripped = _strip_grouped(word, rv, _PERFECTIVE_GERUND)
+    if stripped is not None:
+        word = stripped
+    else:
+        reflexive = _longest(word, rv, _REFLEXIVE)
+        if reflexive:
+            word = word[: -len(reflexive)]
+        adjective = _longest(word, rv, _ADJECTIVE)
+        if adjective:
+            word = word[: -len(adjective)]
+            participle = _strip_grouped(word, rv, _PARTICIPLE)
+            if participle is not None:
+                word = participle
+        else:
+            verb = _strip_grouped(word, rv, _VERB)
+            if verb is not None:
+                word = verb
+            else:
+                noun = _longest(word, rv, _NOUN)
+                if noun:
+                    word = word[: -len(noun)]
+
+    if word.endswith("и") and len(word) - 1 >= rv:
+        word = word[:-1]
+    derivational = _longest(word, r2, _DERIVATIONAL)
+    if derivational:
+        word = word[: -len(derivational)]
+    if word.endswith("нн") and len(word) - 2 >= rv:
+        word = word[:-1]
+    else:
+        superlative = _longest(word, rv, _SUPERLATIVE)
+        if superlative:
+            word = word[: -len(superlative)]
+            if word.endswith("нн"):
+                word = word[:-1]
+        elif word.endswith("ь") and len(word) - 1 >= rv:
+            word = word[:-1]
+    return word
+
+
+def stem_english(word: str) -> str:
+    """Облегчённое отсечение английских окончаний (множественное число, -ing, -ed)."""
+    if len(word) <= 3:
+        return word
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith(("sses", "xes", "ches", "shes")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        word = word[:-1]
+    for suffix in ("ing", "ed"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[: -len(suffix)]
+            if len(word) > 3 and word[-1] == word[-2] and word[-1] not in "lsz":
+                word = word[:-1]
+            break
+    return word
+
+
+@lru_cache(maxsize=65536)
+def _stem(token: str) -> str:
+    if token[0].isdigit() or "-" in token:
+        return token
+    if token[0] >= "а":
+        return stem_russian(token)
+    return stem_english(token)
+
+
+def tokenize(text: str) -> list[str]:
+    """Термины текста в порядке появления (с повторами)."""
+    terms = []
+    for token in _TOKEN_RE.findall(text.lower().replace("ё", "е")):
+        if len(token) < 2 or token in _STOPWORDS:
+            continue
+        terms.append(_stem(token))
+    return terms
+
+
+class SearchError(Exception):
+    """Запрос не может быть выполнен (например, в нём нет значимых слов)."""
+
+
+@dataclass
+class UpdateStats:
+    files: int = 0
+    indexed: int = 0  # files re-tokenised because their content changed
+    unchanged: int = 0  # files skipped by size/mtime or hash
+    removed: int = 0
+
+    def as_dict(self) -> dict:
+        return {"files": self.files, "indexed": self.indexed, "unchanged": self.unchanged, "removed": self.removed}
+
+
+@dataclass
+class Hit:
+    path: str
+    feature: str
+    kind: str
+    title: str
+    line: int
+    score: float
+    snippet: str
+
+    def as_dict(self) -> dict:
+        return {
+            "path": self.path,
+            "feature": self.feature,
+            "kind": self.kind,
+            "title": self.title,
+            "line": self.line,
+            "location": f"{self.path}:{self.line}",
+            "score": round(self.score, 4),
+            "snippet": self.snippet,
+        }
+
+
+def open_index(root: Path) -> sqlite3.Connection:
+    """Открыть (и при необходимости создать или пересоздать) базу поискового индекса."""
+    project_cache_dir(root)
+    conn = sqlite3.connect(root / DB_RELATIVE_PATH)
+    conn.row_factory = sqlite3.Row
+    if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+        with conn:
+            for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall():
+                conn.execute(f'DROP TABLE "{name}"')
+            conn.executescript(_SCHEMA)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    return conn
+
+
+def _documents(root: Path) -> dict[str, tuple[str, str, Path]]:
+    """Относительный путь -> (фича, вид документа, путь) для всех индексируемых файлов."""
+    specs = root / "specs"
+    docs: dict[str, tuple[str, str, Path]] = {}
+    if not specs.is_dir():
+        return docs
+    for entry in sorted(specs.iterdir()):
+        if entry.is_dir() and FEATURE_DIR_RE.match(entry.name):
+            for kind in DOCS:
+                path = entry / f"{kind}.md"
+                if path.is_file():
+                    docs[path.relative_to(root).as_posix()] = (entry.name, kind, path)
+    return docs
+
+
+def _delete_file(conn: sqlite3.Connection, rel: str) -> None:
+    conn.execute("DELETE FROM postings WHERE section IN (SELECT id FROM sections WHERE path = ?)", (rel,))
+    conn.execute("DELETE FROM sections WHERE path = ?", (rel,))
+
+
+def _index_file(conn: sqlite3.Connection, rel: str, text: str) -> None:
+    _delete_file(conn, rel)
+    for section in split_sections(strip_comments(text)):
+        counts = Counter(tokenize(section.body))
+        for term in tokenize(section.title):
+            counts[term] += TITLE_WEIGHT
+        if not counts:
+            continue
+        cursor = conn.execute(
+            "INSERT INTO sections (path, title, line, length, body) VALUES (?, ?, ?, ?, ?)",
+            (rel, section.title, section.line, sum(counts.values()), section.body),
+        )
+        conn.executemany("INSERT INTO postings VALUES (?, ?, ?)", [(term, cursor.lastrowid, tf) for term, tf in counts.items()])
+
+
+def update_index(conn: sqlite3.Connection, root: Path) -> UpdateStats:
+    """Привести индекс в соответствие с specs/, перечитав только изменившиеся файлы."""
+    stats = UpdateStats()
+    known = {row["path"]: row for row in conn.execute("SELECT * FROM files")}
+    current = _documents(root)
+    stats.files = len(current)
+
+    with conn:
+        for rel in set(known) - set(current):
+            _delete_file(conn, rel)
+            conn.execute("DELETE FROM files WHERE path = ?", (rel,))
+            stats.removed += 1
+        for rel, (feature, kind, path) in current.items():
+            st = path.stat()
+            row = known.get(rel)
+            if row and row["mtime_ns"] == st.st_mtime_ns and row["size"] == st.st_size:
+                stats.unchanged += 1
+                continue
+            data = path.read_bytes()
+            digest = hashlib.sha256(data).hexdigest()
+            conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)", (rel, feature, kind, st.st_mtime_ns, st.st_size, digest))
+            if row and row["hash"] == digest:
+                stats.unchanged += 1
+                continue
+            _index_file(conn, rel, data.decode("utf-8", errors="replace"))
+            stats.indexed += 1
+    return stats
+
+
+def _snippet(body: str, terms: set[str], limit: int = 200) -> str:
+    """Первая строка раздела, содержащая термин запроса (или первая непустая строка)."""
+    lines = [line.strip() for line in body.splitlines() if line.strip()]
+    line = next((line for line in lines if terms & set(tokenize(line))), lines[0] if lines else "")
+    return line if len(line) <= limit else line[: limit - 1] + "…"
+
+
+def search(
+    conn: sqlite3.Connection,
+    query: str,
+    *,
+    limit: int = DEFAULT_LIMIT,
+    feature: Optional[str] = None,
+    kinds: Optional[tuple[str, ...]] = None,
+) -> list[Hit]:
+    """Разделы, лучше всего отвечающие запросу, по убыванию BM25."""
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms:
+        raise SearchError(f"В запросе «{query}» нет значимых слов")
+    total, avg_length = conn.execute("SELECT COUNT(*), AVG(length) FROM sections").fetchone()
+    if not total:
+        return []
+
+    scores: dict[int, float] = {}
+    for term in terms:
+        rows = conn.execute(
+            "SELECT p.section, p.tf, s.length FROM postings p JOIN sections s ON s.id = p.section WHERE p.term = ?", (term,)
+        ).fetchall()
+        if not rows:
+            continue
+        idf = math.log(1 + (total - len(rows) + 0.5) / (len(rows) + 0.5))
+        for section, tf, length in rows:
+            scores[section] = scores.get(section, 0.0) + idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / avg_length))
+
+    where, params = "", ()
+    if feature:
+        where += " AND (f.feature = ? OR f.feature LIKE ?)"
+        params += (feature, f"{feature}-%")
+    if kinds:
+        where += f" AND f.kind IN ({','.join('?' * len(kinds))})"
+        params += tuple(kinds)
+
+    hits: list[Hit] = []
+    query_terms = set(terms)
+    # Fetch details in score order until enough sections pass the filters
+    for section in sorted(scores, key=lambda s: (-scores[s], s)):
+        row = conn.execute(
+            f"SELECT s.path, s.title, s.line, s.body, f.feature, f.kind FROM sections s JOIN files f ON f.path = s.path WHERE s.id = ?{where}",
+            (section, *params),
+        ).fetchone()
+        if row is None:
+            continue
+        hits.append(Hit(
+            path=row["path"],
+            feature=row["feature"],
+            kind=row["kind"],
+            title=row["title"],
+            line=row["line"],
+            score=scores[section],
+            snippet=_snippet(row["body"], query_terms),
+        ))
+        if len(hits) >= limit:
+            break
+    return hits
+
+
+def run_search(root: Path, query: str, **kwargs) -> tuple[list[Hit], UpdateStats, float]:
+    """Обновить индекс и выполнить запрос; возвращает (результаты, статистику обновления, секунды)."""
+    started = time.perf_counter()
+    conn = open_index(root)
+    try:
+        stats = update_index(conn, root)
+        hits = search(conn, query, **kwargs)
+    finally:
+        conn.close()
+    return hits, stats, time.perf_counter() - started
@@ -0,0 +1,433 @@
+"""
+Демон `specify-ru serve`: инициализация проектов с прогретыми кэшами.
+
+Процесс держит в памяти описание последнего релиза (с TTL), распакованные
+шаблоны для каждой пары агент/скрипт и пул HTTP-соединений, поэтому запрос
+на создание проекта стоит только записи файлов. Запросы принимаются по HTTP
+на localhost или через Unix-сокет и выполняются ограниченным пулом потоков
+с очередью фиксированной длины; при переполнении сервер отвечает 503.
+
+Эндпоинты (тела запросов и ответов — JSON):
+
+    GET  /health    состояние, релиз, загрузка пула
+    GET  /metrics   метрики в текстовом формате Prometheus
+    POST /scaffold  {"path", "agent", "script"?, "merge"?, "git"?}
+    POST /upgrade   {"path", "agent"?, "script"?} — обновить файлы шаблона, сохранив .specify/memory/
+    POST /check     {"tools"?} — доступность git и CLI агентов
+
+У демона нет аутентификации, поэтому рекомендуемый транспорт — Unix-сокет
+с правами 0600. Чтобы страница в браузере не могла обратиться к демону на
+localhost, отклоняются запросы с заголовком Origin, POST без
+Content-Type: application/json (такой запрос требует CORS preflight) и, для
+TCP, запросы с Host не на loopback (защита от DNS rebinding).
+"""
+
+import ipaddress
+import json
+import os
+import socketserver
+import stat
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Optional
+
+from . import AGENT_CONFIG, SCRIPT_TYPE_CHOICES, check_tool
+from .api import (
+    DownloadError,
+    InvalidOptionError,
+    ProjectExistsError,
+    ReleaseError,
+    Template,
+    fetch_release,
+    load_template,
+    materialize,
+)
+
+if TYPE_CHECKING:
+    import httpx
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 7411
+DEFAULT_RELEASE_TTL = 300.0
+MAX_BODY = 64 * 1024
+
+# User-owned files that an upgrade must never overwrite
+UPGRADE_PRESERVE = (".specify/memory/*",)
+
+
+class ServiceError(Exception):
+    """Ошибка запроса с HTTP-кодом ответа."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _error_status(error: Exception) -> int:
+    if isinstance(error, ServiceError):
+        return error.status
+    if isinstance(error, InvalidOptionError):
+        return 400
+    if isinstance(error, ProjectExistsError):
+        return 409
+    if isinstance(error, (ReleaseError, DownloadError)):
+        return 502
+    return 500
+
+
+class ScaffoldService:
+    """Прогретое состояние демона и обработчики запросов (без привязки к транспорту)."""
+
+    def __init__(
+        self,
+        client: "httpx.Client",
+        *,
+        workers: int = 4,
+        queue_size: int = 16,
+        release_ttl: float = DEFAULT_RELEASE_TTL,
+        cache_dir: Optional[Path] = None,
+        github_token: Optional[str] = None,
+        root: Optional[Path] = None,
+    ):
+        self.client = client
+        self.workers = workers
+        self.queue_size = queue_size
+        self.release_ttl = release_ttl
+        self.cache_dir = cache_dir
+        self.github_token = github_token
+        self.root = root.resolve() if root else None
+        self.started = time.time()
+
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="specify-serve")
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._lock = threading.Lock()
+        self._release: Optional[dict] = None
+        self._release_at = 0.0
+        self._release_lock = threading.Lock()
+        self._templates: dict[tuple[str, str], Template] = {}
+        self._template_locks: dict[tuple[str, str], threading.Lock] = {}
+
+        self._pending = 0
+        self._running = 0
+        self._counters: dict[str, int] = {}
+        self._requests: dict[tuple[str, int], int] = {}
+        self._durations: dict[str, list[float]] = {}  # endpoint -> [sum, count]
+
+    # -- warm state -------------------------------------------------------
+
+    def _count(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def release(self) -> dict:
+        """Описание последнего релиза; запрашивается не чаще раза в release_ttl секунд."""
+        with self._release_lock:
+            if self._release is None or time.monotonic() - self._release_at > self.release_ttl:
+                release = fetch_release(self.client, github_token=self.github_token)
+                if self._release is None or release.get("tag_name") != self._release.get("tag_name"):
+                    with self._lock:
+                        self._templates.clear()
+                self._release = release
+                self._release_at = time.monotonic()
+                self._count("release_refresh")
+            return self._release
+
+    def template(self, agent: str, script: str) -> Template:
+        """Распакованный в память шаблон текущего релиза; загружается один раз на пару агент/скрипт."""
+        release = self.release()
+        key = (agent, script)
+        with self._lock:
+            cached = self._templates.get(key)
+            if cached is not None and cached.release == release["tag_name"]:
+                self._counters["template_hits"] = self._counters.get("template_hits", 0) + 1
+                return cached
+            key_lock = self._template_locks.setdefault(key, threading.Lock())
+        # Per-key lock: concurrent first requests for one agent download its template once
+        with key_lock:
+            with self._lock:
+                cached = self._templates.get(key)
+            if cached is not None and cached.release == release["tag_name"]:
+                self._count("template_hits")
+                return cached
+            template = load_template(agent, script, client=self.client, release=release, cache_dir=self.cache_dir, github_token=self.github_token)
+            with self._lock:
+                self._templates[key] = template
+            self._count("template_misses")
+            self._count("downloaded_bytes", template.downloaded)
+            return template
+
+    def warm(self, agent: str, script: str) -> Template:
+        return self.template(agent, script)
+
+    # -- requests ---------------------------------------------------------
+
+    def _project_path(self, payload: dict) -> Path:
+        raw = payload.get("path")
+        if not isinstance(raw, str) or not raw:
+            raise ServiceError(400, "Поле path обязательно")
+        path = Path(raw).expanduser()
+        if not path.is_absolute():
+            raise ServiceError(400, "Поле path должно быть абсолютным путём")
+        path = path.resolve()
+        if self.root and not path.is_relative_to(self.root):
+            raise ServiceError(403, f"Путь вне разрешённого корня {self.root}")
+        return path
+
+    def scaffold(self, payload: dict) -> dict:
+        path = self._project_path(payload)
+        agent = payload.get("agent")
+        if not agent:
+            raise ServiceError(400, "Поле agent обязательно")
+        script = payload.get("script") or "sh"
+        if agent not in AGENT_CONFIG or script not in SCRIPT_TYPE_CHOICES:
+            raise InvalidOptionError(f"Некорректная пара агент/скрипт: {agent}/{script}")
+        template = self.template(agent, script)
+        result = materialize(template, path, merge=bool(payload.get("merge")), git=payload.get("git", True) is not False)
+        self._count("files_written", len(template.files))
+        return result.as_dict()
+
+    def upgrade(self, payload: dict) -> dict:
+        path = self._project_path(payload)
+        if not (path / ".specify").is_dir():
+            raise ServiceError(404, f"{path} не является проектом Specify (нет .specify/)")
+        agent = payload.get("agent") or detect_agent(path)
+        if not agent:
+            raise ServiceError(400, "Не удалось определить агента проекта; передайте поле agent")
+        script = payload.get("script") or detect_script(path)
+        template = self.template(agent, script)
+        result = materialize(template, path, merge=True, git=False, preserve=UPGRADE_PRESERVE)
+        return result.as_dict()
+
+    def check(self, payload: dict) -> dict:
+        tools = payload.get("tools") or ["git", *AGENT_CONFIG]
+        return {"tools": {tool: check_tool(tool) for tool in tools if isinstance(tool, str)}}
+
+    def submit(self, handler: Callable[[dict], dict], payload: dict) -> dict:
+        """Выполнить обработчик в пуле; ServiceError(503), если пул и очередь заняты."""
+        if not self._slots.acquire(blocking=False):
+            self._count("rejected")
+            raise ServiceError(503, "Очередь запросов заполнена, повторите позже")
+        with self._lock:
+            self._pending += 1
+
+        def run() -> dict:
+            with self._lock:
+                self._pending -= 1
+                self._running += 1
+            try:
+                return handler(payload)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                self._slots.release()
+
+        return self._pool.submit(run).result()
+
+    def record(self, endpoint: str, status: int, seconds: float) -> None:
+        with self._lock:
+            self._requests[(endpoint, status)] = self._requests.get((endpoint, status), 0) + 1
+            total = self._durations.setdefault(endpoint, [0.0, 0])
+            total[0] += seconds
+            total[1] += 1
+
+    def health(self) -> dict:
+        with self._lock:
+            return {
+                "status": "ok",
+                "uptime": round(time.time() - self.started, 3),
+                "release": (self._release or {}).get("tag_name"),
+                "templates": sorted(f"{a}:{s}" for a, s in self._templates),
+                "workers": self.workers,
+                "running": self._running,
+                "queued": self._pending,
+                "queue_size": self.queue_size,
+            }
+
+    def metrics(self) -> str:
+        """Метрики в текстовом формате экспозиции Prometheus."""
+        with self._lock:
+            counters = dict(self._counters)
+            requests = dict(self._requests)
+            durations = {k: tuple(v) for k, v in self._durations.items()}
+            running, pending, templates = self._running, self._pending, len(self._templates)
+        lines = [
+            "# HELP specify_serve_requests_total Обработанные запросы по эндпоинтам и кодам ответа.",
+            "# TYPE specify_serve_requests_total counter",
+        ]
+        for (endpoint, status), value in sorted(requests.items()):
+            lines.append(f'specify_serve_requests_total{{endpoint="{endpoint}",status="{status}"}} {value}')
+        lines += [
+            "# HELP specify_serve_request_duration_seconds Время обработки запросов.",
+            "# TYPE specify_serve_request_duration_seconds summary",
+        ]
+        for endpoint, (total, count) in sorted(durations.items()):
+            lines.append(f'specify_serve_request_duration_seconds_sum{{endpoint="{endpoint}"}} {total:.6f}')
+            lines.append(f'specify_serve_request_duration_seconds_count{{endpoint="{endpoint}"}} {count}')
+        for name, help_text in (
+            ("template_hits", "Запросы, обслуженные шаблоном из памяти."),
+            ("template_misses", "Загрузки шаблона в память."),
+            ("release_refresh", "Запросы описания релиза к GitHub API."),
+            ("downloaded_bytes", "Байты, скачанные при загрузке шаблонов."),
+            ("files_written", "Файлы, записанные при создании проектов."),
+            ("rejected", "Запросы, отклонённые из-за заполненной очереди."),
+        ):
+            lines += [
+                f"# HELP specify_serve_{name}_total {help_text}",
+                f"# TYPE specify_serve_{name}_total counter",
+                f"specify_serve_{name}_total {counters.get(name, 0)}",
+            ]
+        for name, value, help_text in (
+            ("workers", self.workers, "Размер пула потоков."),
+            ("running", running, "Выполняющиеся запросы."),
+            ("queued", pending, "Запросы в очереди."),
+            ("templates_cached", templates, "Шаблоны, распакованные в память."),
+            ("uptime_seconds", round(time.time() - self.started, 3), "Время работы демона."),
+        ):
+            lines += [
+                f"# HELP specify_serve_{name} {help_text}",
+                f"# TYPE specify_serve_{name} gauge",
+                f"specify_serve_{name} {value}",
+            ]
+        return "\n".join(lines) + "\n"
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True)
+
+
+def detect_agent(path: Path) -> Optional[str]:
+    """Агент проекта по каталогу с командами; .github/ проверяется последним — он бывает и без Copilot."""
+    agents = sorted(AGENT_CONFIG, key=lambda key: AGENT_CONFIG[key]["folder"] == ".github/")
+    for key in agents:
+        if (path / AGENT_CONFIG[key]["folder"]).is_dir():
+            return key
+    return None
+
+
+def _is_loopback_host(host: str) -> bool:
+    """Заголовок Host указывает на loopback (localhost, 127.0.0.0/8, ::1), с портом или без."""
+    host = host.strip().lower()
+    if host.startswith("["):
+        host = host[1:].split("]", 1)[0]
+    elif host.count(":") == 1:
+        host = host.split(":", 1)[0]
+    if host == "localhost" or host.endswith(".localhost"):
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def detect_script(path: Path) -> str:
+    return "ps" if (path / ".specify" / "scripts" / "powershell").is_dir() else "sh"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "specify-ru-serve"
+    protocol_version = "HTTP/1.1"
+
+    routes = {
+        ("POST", "/scaffold"): "scaffold",
+        ("POST", "/upgrade"): "upgrade",
+        ("POST", "/check"): "check",
+    }
+
+    @property
+    def service(self) -> ScaffoldService:
+        return self.server.service
+
+    def _send(self, status: int, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if status == 503:
+            self.send_header("Retry-After", "1")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, payload: dict) -> None:
+        self._send(status, json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8")
+
+    def _check_request(self, method: str) -> None:
+        """Отклонить запросы, которые мог отправить браузер со сторонней страницы."""
+        if self.headers.get("Origin") is not None:
+            raise ServiceError(403, "Запросы из браузера (с заголовком Origin) не принимаются")
+        if isinstance(self.client_address, tuple) and self.client_address and not _is_loopback_host(self.headers.get("Host") or ""):
+            raise ServiceError(403, "Заголовок Host должен указывать на localhost")
+        if method == "POST":
+            content_type = (self.headers.get("Content-Type") or "").split(";", 1)[0].strip().lower()
+            if content_type != "application/json":
+                raise ServiceError(415, "Ожидается Content-Type: application/json")
+
+    def _dispatch(self, method: str) -> None:
+        started = time.perf_counter()
+        endpoint = self.path.split("?", 1)[0]
+        status = 200
+        try:
+            self._check_request(method)
+            if method == "GET" and endpoint == "/health":
+                self._send_json(200, self.service.health())
+            elif method == "GET" and endpoint == "/metrics":
+                self._send(200, self.service.metrics().encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8")
+            elif (method, endpoint) in self.routes:
+                length = int(self.headers.get("Content-Length") or 0)
+                if length > MAX_BODY:
+                    raise ServiceError(413, "Слишком большое тело запроса")
+                try:
+                    payload = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError as e:
+                    raise ServiceError(400, f"Некорректный JSON: {e}")
+                if not isinstance(payload, dict):
+                    raise ServiceError(400, "Тело запроса должно быть JSON-объектом")
+                handler = getattr(self.service, self.routes[(method, endpoint)])
+                self._send_json(200, self.service.submit(handler, payload))
+            else:
+                endpoint = "other"
+                raise ServiceError(404, "Неизвестный эндпоинт")
+        except Exception as e:
+            status = _error_status(e)
+            # The request body may be unread: do not reuse the connection
+            self.close_connection = True
+            self._send_json(status, {"error": type(e).__name__, "message": str(e)})
+        finally:
+            self.service.record(endpoint, status, time.perf_counter() - started)
+
+    def do_GET(self) -> None:
+        self._dispatch("GET")
+
+    def do_POST(self) -> None:
+        self._dispatch("POST")
+
+    def address_string(self) -> str:
+        # Unix socket peers have no (host, port) address
+        return self.client_address[0] if isinstance(self.client_address, tuple) and self.client_address else "unix"
+
+    def log_message(self, format: str, *args) -> None:
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(service: ScaffoldService, *, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, socket_path: Optional[Path] = None, verbose: bool = False) -> socketserver.BaseServer:
+    """HTTP-сервер демона на host:port или на Unix-сокете socket_path."""
+    if socket_path is not None:
+        # Remove a stale socket left by a crashed daemon, but never a regular file
+        if socket_path.exists() and stat.S_ISSOCK(socket_path.stat().st_mode):
+            socket_path.unlink()
+        server = _UnixHTTPServer(str(socket_path), _Handler)
+        os.chmod(socket_path, 0o600)
+    else:
+        server = _HTTPServer((host, port), _Handler)
+    server.service = service
+    server.verbose = verbose
+    return server
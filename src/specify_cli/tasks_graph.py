@@ -0,0 +1,413 @@
+"""
+Граф зависимостей задач из tasks.md.
+
+Разбирает строки `- [ ] T012 [P] [US1] Описание в src/models/user.py (зависит от T010)`
+и строит DAG из явных («зависит от T012, T013») и неявных зависимостей, которые
+задаёт формат шаблона tasks-template.md:
+
+- внутри фазы задачи без [P] выполняются последовательно, а подряд идущие
+  задачи с [P] образуют группу, выполняемую параллельно между соседними
+  последовательными задачами;
+- фазы без меток историй (Setup, Foundational, Polish) блокируют всё, что идёт
+  после них, и сами ждут все предыдущие фазы;
+- фазы историй ([US#]) зависят только от последней общей фазы и могут
+  выполняться параллельно друг с другом.
+
+По графу находятся циклы, ссылки на несуществующие задачи, конфликты по файлам
+между задачами, которые могут выполняться одновременно, критический путь и
+волны параллельного выполнения (задачи одной волны не конфликтуют по файлам).
+"""
+
+import heapq
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+_TASK_RE = re.compile(r"^\s*[-*]\s+\[(?P<done>[ xX])\]\s+(?P<id>T\d+)\b\s*(?P<rest>.*)$")
+_PHASE_RE = re.compile(r"^##\s+(?P<title>.+?)\s*$")
+_STORY_RE = re.compile(r"\[(US\d+)\]")
+_PARALLEL_RE = re.compile(r"\[P\]")
+_LEADING_TAGS_RE = re.compile(r"^(?:\s*\[(?:P|US\d+)\])+\s*")
+_DEPENDS_RE = re.compile(
+    r"(?:завис\w*\s+от|depends\s+on|requires|после|after)\s*:?\s*"
+    r"(?P<refs>T\d+(?:\s*(?:,|;|\bи\b|\band\b|&|[–—-])\s*T\d+)*)",
+    re.IGNORECASE,
+)
+_REF_TOKEN_RE = re.compile(r"T(\d+)|[–—-]")
+# ASCII only (\w would also match Cyrillic words around the paths); [placeholders] are kept whole
+_PATH_SEGMENT = r"(?:[A-Za-z0-9_.\-]|\[[^\]\s/]*\])+"
+_PATH_RE = re.compile(
+    r"(?<![A-Za-z0-9_./\-\[\]])"
+    rf"(?:(?:{_PATH_SEGMENT}/)+(?:{_PATH_SEGMENT})?|(?:[A-Za-z0-9_\-]|\[[^\]\s/]*\])+\.[A-Za-z][A-Za-z0-9]{{0,7}})"
+    r"(?![A-Za-z0-9_/\-\]])"
+)
+# Acronyms such as I/O or CI/CD look like paths but are not
+_ACRONYM_RE = re.compile(r"[A-Z]+(?:/[A-Z]+)+")
+
+
+@dataclass
+class Task:
+    """Задача из tasks.md."""
+
+    id: str
+    description: str
+    line: int
+    phase: str = ""
+    story: Optional[str] = None
+    parallel: bool = False
+    done: bool = False
+    files: list[str] = field(default_factory=list)
+    explicit_deps: list[str] = field(default_factory=list)
+    deps: list[str] = field(default_factory=list)
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "description": self.description,
+            "line": self.line,
+            "phase": self.phase,
+            "story": self.story,
+            "parallel": self.parallel,
+            "done": self.done,
+            "files": self.files,
+            "explicit_deps": self.explicit_deps,
+            "depends_on": self.deps,
+        }
+
+
+@dataclass
+class TaskGraph:
+    """Результат анализа tasks.md."""
+
+    tasks: list[Task]
+    duplicates: list[str] = field(default_factory=list)
+    missing: list[dict] = field(default_factory=list)
+    cycles: list[list[str]] = field(default_factory=list)
+    conflicts: list[dict] = field(default_factory=list)
+    waves: list[list[str]] = field(default_factory=list)
+    critical_path: list[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.cycles
+
+    def as_dict(self) -> dict:
+        return {
+            "tasks": [t.as_dict() for t in self.tasks],
+            "duplicates": self.duplicates,
+            "missing": self.missing,
+            "cycles": self.cycles,
+            "conflicts": self.conflicts,
+            "waves": self.waves,
+            "critical_path": self.critical_path,
+        }
+
+
+def _expand_refs(refs: str) -> list[str]:
+    """"T012, T013" -> [T012, T013]; "T012–T014" -> [T012, T013, T014]."""
+    out: list[str] = []
+    range_open = False
+    for m in _REF_TOKEN_RE.finditer(refs):
+        if m.group(1) is None:
+            range_open = bool(out)
+            continue
+        digits = m.group(1)
+        if range_open:
+            start = int(out[-1][1:])
+            out.extend(f"T{n:0{len(digits)}d}" for n in range(start + 1, int(digits) + 1))
+            range_open = False
+        else:
+            out.append(f"T{digits}")
+    return out
+
+
+def _extract_files(text: str) -> list[str]:
+    files: list[str] = []
+    for m in _PATH_RE.finditer(text):
+        path = m.group(0).rstrip(".,;:")
+        if path.startswith("./"):
+            path = path[2:]
+        if _ACRONYM_RE.fullmatch(path):
+            continue
+        if path and path not in files:
+            files.append(path)
+    return files
+
+
+def parse_tasks_text(text: str) -> list[Task]:
+    """Разобрать задачи tasks.md за один проход; фаза — ближайший заголовок второго уровня."""
+    tasks: list[Task] = []
+    phase = ""
+    for lineno, line in enumerate(text.splitlines(), start=1):
+        header = _PHASE_RE.match(line)
+        if header:
+            phase = header.group("title")
+            continue
+        m = _TASK_RE.match(line)
+        if not m:
+            continue
+        rest = m.group("rest")
+        story = _STORY_RE.search(rest)
+        description = _LEADING_TAGS_RE.sub("", rest).strip()
+        deps: list[str] = []
+        for dm in _DEPENDS_RE.finditer(description):
+            deps.extend(ref for ref in _expand_refs(dm.group("refs")) if ref not in deps)
+        tasks.append(Task(
+            id=m.group("id"),
+            description=description,
+            line=lineno,
+            phase=phase,
+            story=story.group(1) if story else None,
+            parallel=bool(_PARALLEL_RE.search(rest)),
+            done=m.group("done") != " ",
+            files=_extract_files(_DEPENDS_RE.sub("", description)),
+            explicit_deps=deps,
+        ))
+    return tasks
+
+
+def parse_tasks(tasks_path: Path) -> list[Task]:
+    return parse_tasks_text(tasks_path.read_text(encoding="utf-8"))
+
+
+def _phases(tasks: list[Task]) -> list[list[Task]]:
+    phases: list[list[Task]] = []
+    for task in tasks:
+        if phases and phases[-1][0].phase == task.phase:
+            phases[-1].append(task)
+        else:
+            phases.append([task])
+    return phases
+
+
+def _implicit_deps(tasks: list[Task]) -> dict[str, set[str]]:
+    """Неявные зависимости из порядка задач, меток [P] и фаз."""
+    deps: dict[str, set[str]] = {t.id: set() for t in tasks}
+    barrier: set[str] = set()  # sinks of the last shared phase
+    open_sinks: set[str] = set()  # sinks of story phases after that barrier
+
+    for phase in _phases(tasks):
+        is_story = any(t.story for t in phase)
+        current = set(barrier) if is_story else barrier | open_sinks
+        group: list[str] = []
+        for task in phase:
+            if task.parallel:
+                deps[task.id] |= current
+                group.append(task.id)
+            else:
+                deps[task.id] |= set(group) if group else current
+                current = {task.id}
+                group = []
+        sinks = set(group) if group else current
+        if is_story:
+            open_sinks |= sinks
+        else:
+            barrier, open_sinks = sinks, set()
+    return deps
+
+
+def _find_cycles(order: list[str], succ: dict[str, list[str]]) -> list[list[str]]:
+    """Найти циклы (по одному на каждую сильно связную компоненту), алгоритм Тарьяна без рекурсии."""
+    index: dict[str, int] = {}
+    low: dict[str, int] = {}
+    on_stack: set[str] = set()
+    stack: list[str] = []
+    cycles: list[list[str]] = []
+    counter = 0
+
+    for root in order:
+        if root in index:
+            continue
+        work = [(root, iter(succ[root]))]
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, it = work[-1]
+            child = next(it, None)
+            if child is not None:
+                if child not in index:
+                    index[child] = low[child] = counter
+                    counter += 1
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(succ[child])))
+                elif child in on_stack:
+                    low[node] = min(low[node], index[child])
+                continue
+            work.pop()
+            if work:
+                low[work[-1][0]] = min(low[work[-1][0]], low[node])
+            if low[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                if len(component) > 1 or node in succ[node]:
+                    position = {tid: i for i, tid in enumerate(order)}
+                    cycles.append(sorted(component, key=position.__getitem__))
+    return cycles
+
+
+def _paths_overlap(a: str, b: str) -> bool:
+    if a == b:
+        return True
+    return (a.endswith("/") and b.startswith(a)) or (b.endswith("/") and a.startswith(b))
+
+
+def build_graph(tasks: list[Task], *, implicit: bool = True) -> TaskGraph:
+    """Построить DAG задач и вычислить циклы, конфликты, критический путь и волны.
+
+    При implicit=False учитываются только явные зависимости из описаний задач.
+    """
+    graph = TaskGraph(tasks=[])
+    by_id: dict[str, Task] = {}
+    for task in tasks:
+        if task.id in by_id:
+            graph.duplicates.append(task.id)
+            continue
+        by_id[task.id] = task
+        graph.tasks.append(task)
+    tasks = graph.tasks
+    order = [t.id for t in tasks]
+    position = {tid: i for i, tid in enumerate(order)}
+
+    deps = _implicit_deps(tasks) if implicit else {tid: set() for tid in order}
+    for task in tasks:
+        for ref in task.explicit_deps:
+            if ref not in by_id:
+                graph.missing.append({"task": task.id, "ref": ref})
+            else:
+                deps[task.id].add(ref)
+    for task in tasks:
+        task.deps = sorted(deps[task.id], key=position.__getitem__)
+
+    succ: dict[str, list[str]] = {tid: [] for tid in order}
+    for task in tasks:
+        for dep in task.deps:
+            succ[dep].append(task.id)
+
+    graph.cycles = _find_cycles(order, succ)
+    if graph.cycles:
+        return graph
+
+    # Topological order (Kahn), ties broken by position in the file
+    indegree = {tid: len(deps[tid]) for tid in order}
+    heap = [position[tid] for tid in order if indegree[tid] == 0]
+    heapq.heapify(heap)
+    topo: list[str] = []
+    while heap:
+        tid = order[heapq.heappop(heap)]
+        topo.append(tid)
+        for child in succ[tid]:
+            indegree[child] -= 1
+            if indegree[child] == 0:
+                heapq.heappush(heap, position[child])
+
+    # Reachability as bitsets: two tasks may run concurrently unless one reaches the other
+    ancestors: dict[str, int] = {}
+    for tid in topo:
+        mask = 0
+        for dep in deps[tid]:
+            mask |= ancestors[dep] | (1 << position[dep])
+        ancestors[tid] = mask
+
+    def ordered(a: str, b: str) -> bool:
+        return bool(ancestors[b] >> position[a] & 1 or ancestors[a] >> position[b] & 1)
+
+    conflicting: dict[str, set[str]] = {tid: set() for tid in order}
+    pending = [t for t in tasks if not t.done]
+    for i, a in enumerate(pending):
+        for b in pending[i + 1:]:
+            shared = [fa for fa in a.files for fb in b.files if _paths_overlap(fa, fb)]
+            if shared and not ordered(a.id, b.id):
+                graph.conflicts.append({
+                    "tasks": [a.id, b.id],
+                    "paths": sorted(set(shared)),
+                    "parallel_marked": a.parallel and b.parallel,
+                })
+                conflicting[a.id].add(b.id)
+                conflicting[b.id].add(a.id)
+
+    # Critical path over pending work (completed tasks count as satisfied dependencies)
+    length: dict[str, int] = {}
+    best_prev: dict[str, Optional[str]] = {}
+    for tid in topo:
+        if by_id[tid].done:
+            continue
+        prev = max((d for d in deps[tid] if d in length), key=lambda d: (length[d], -position[d]), default=None)
+        length[tid] = (length[prev] if prev else 0) + 1
+        best_prev[tid] = prev
+    if length:
+        node: Optional[str] = max(length, key=lambda t: (length[t], -position[t]))
+        path: list[str] = []
+        while node:
+            path.append(node)
+            node = best_prev[node]
+        graph.critical_path = path[::-1]
+
+    # Waves: earliest level after all dependencies, bumped past waves holding a conflicting task
+    wave_of: dict[str, int] = {}
+    for tid in topo:
+        if by_id[tid].done:
+            continue
+        wave = max((wave_of[d] + 1 for d in deps[tid] if d in wave_of), default=0)
+        while any(wave_of.get(other) == wave for other in conflicting[tid]):
+            wave += 1
+        wave_of[tid] = wave
+    if wave_of:
+        graph.waves = [[] for _ in range(max(wave_of.values()) + 1)]
+        for tid in order:
+            if tid in wave_of:
+                graph.waves[wave_of[tid]].append(tid)
+    return graph
+
+
+def load_graph(tasks_path: Path, *, implicit: bool = True) -> TaskGraph:
+    return build_graph(parse_tasks(tasks_path), implicit=implicit)
+
+
+def _dot_escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _dot_quote(value: str) -> str:
+    return f'"{_dot_escape(value)}"'
+
+
+def to_dot(graph: TaskGraph, *, label_width: int = 40) -> str:
+    """Представление графа в формате Graphviz DOT; критический путь выделен красным."""
+    critical = set(graph.critical_path)
+    critical_edges = set(zip(graph.critical_path, graph.critical_path[1:]))
+    cyclic = {tid for cycle in graph.cycles for tid in cycle}
+    lines = ["digraph tasks {", "  rankdir=LR;", '  node [shape=box, fontname="Helvetica"];']
+
+    for n, phase_tasks in enumerate(_phases(graph.tasks)):
+        lines.append(f"  subgraph cluster_{n} {{")
+        lines.append(f"    label={_dot_quote(phase_tasks[0].phase)};")
+        for task in phase_tasks:
+            text = task.description if len(task.description) <= label_width else task.description[:label_width - 1] + "…"
+            attrs = [f'label="{_dot_escape(task.id)}\\n{_dot_escape(text)}"']
+            if task.parallel:
+                attrs.append("style=rounded")
+            if task.done:
+                attrs.append("color=gray, fontcolor=gray")
+            elif task.id in cyclic or task.id in critical:
+                attrs.append("color=red")
+            lines.append(f"    {_dot_quote(task.id)} [{', '.join(attrs)}];")
+        lines.append("  }")
+
+    for task in graph.tasks:
+        for dep in task.deps:
+            style = " [color=red, penwidth=2]" if (dep, task.id) in critical_edges else ""
+            lines.append(f"  {_dot_quote(dep)} -> {_dot_quote(task.id)}{style};")
+    for conflict in graph.conflicts:
+        a, b = conflict["tasks"]
+        lines.append(f"  {_dot_quote(a)} -> {_dot_quote(b)} [dir=none, style=dashed, color=orange, constraint=false];")
+    lines.append("}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,382 @@
+"""
+Индекс трассировки требований по всем фичам (`specify-ru trace`).
+
+Из каждого specs/NNN-*/ в SQLite (.specify/cache/trace.db) попадают
+требования FR/NFR/SC, пользовательские истории, задачи T### и упомянутые в
+них файлы, а также покрытие требований задачами (как в `specify-ru analyze`).
+Индекс обновляется при каждом запросе, но перечитываются только файлы, у
+которых изменились размер или mtime и затем sha256 содержимого; остальные
+фичи не трогаются.
+
+Вопрос «какие требования изменились с прошлого релиза» решается сравнением
+с состоянием spec.md в git на теге релиза. Разобранный снимок коммита
+сохраняется в той же базе, поэтому повторные запросы не обращаются к git.
+"""
+
+import hashlib
+import re
+import sqlite3
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from .analyze import compute_coverage
+from .artifacts import parse_spec_text
+from .feature import FEATURE_DIR_RE
+from .fsutil import CACHE_DIR, project_cache_dir
+from .tasks_graph import parse_tasks_text
+
+SCHEMA_VERSION = 1
+DB_RELATIVE_PATH = CACHE_DIR / "trace.db"
+DOCS = ("spec", "tasks")
+
+_REQUIREMENT_ID_RE = re.compile(r"^(?:FR|NFR|SC)-\d+$")
+_STORY_ID_RE = re.compile(r"^US\d+$")
+_TASK_ID_RE = re.compile(r"^T\d+$")
+_TEST_PATH_RE = re.compile(r"(?:^|/)(?:tests?|__tests__|spec)/|(?:^|/)test_[^/]*$|_test\.\w+$|\.(?:test|spec)\.\w+$")
+_TEST_WORD_RE = re.compile(r"\b(?:тест\w*|test\w*)\b", re.IGNORECASE)
+
+_SCHEMA = """
+CREATE TABLE files (path TEXT PRIMARY KEY, feature TEXT NOT NULL, kind TEXT NOT NULL, mtime_ns INTEGER, size INTEGER, hash TEXT);
+CREATE TABLE requirements (feature TEXT, id TEXT, kind TEXT, text TEXT, line INTEGER, hash TEXT, PRIMARY KEY (feature, id));
+CREATE TABLE stories (feature TEXT, id TEXT, title TEXT, priority TEXT, line INTEGER, PRIMARY KEY (feature, id));
+CREATE TABLE tasks (feature TEXT, id TEXT, description TEXT, story TEXT, phase TEXT, done INTEGER, line INTEGER, test INTEGER, PRIMARY KEY (feature, id));
+CREATE TABLE task_files (feature TEXT, task TEXT, path TEXT, test INTEGER);
+CREATE INDEX task_files_path ON task_files (path);
+CREATE INDEX task_files_task ON task_files (feature, task);
+CREATE TABLE coverage (feature TEXT, requirement TEXT, task TEXT, match TEXT);
+CREATE INDEX coverage_requirement ON coverage (feature, requirement);
+CREATE INDEX coverage_task ON coverage (feature, task);
+CREATE TABLE snapshot_commits (commit_sha TEXT PRIMARY KEY);
+CREATE TABLE snapshots (commit_sha TEXT, feature TEXT, id TEXT, hash TEXT, text TEXT);
+CREATE INDEX snapshots_commit ON snapshots (commit_sha);
+"""
+
+
+class TraceError(Exception):
+    """Запрос не может быть выполнен (например, неизвестная ссылка git)."""
+
+
+@dataclass
+class UpdateStats:
+    features: int = 0
+    parsed: int = 0  # features re-parsed because a document changed
+    unchanged: int = 0  # files skipped by size/mtime or hash
+    removed: int = 0  # features or documents dropped from the index
+
+    def as_dict(self) -> dict:
+        return {"features": self.features, "parsed": self.parsed, "unchanged": self.unchanged, "removed": self.removed}
+
+
+def open_index(root: Path) -> sqlite3.Connection:
+    """Открыть (и при необходимости создать или пересоздать) базу индекса проекта."""
+    project_cache_dir(root)
+    conn = sqlite3.connect(root / DB_RELATIVE_PATH)
+    conn.row_factory = sqlite3.Row
+    if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+        with conn:
+            for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall():
+                conn.execute(f'DROP TABLE "{name}"')
+            conn.executescript(_SCHEMA)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    return conn
+
+
+def _hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _is_test(path: str) -> bool:
+    return bool(_TEST_PATH_RE.search(path))
+
+
+def _feature_docs(root: Path) -> dict[str, dict[str, Path]]:
+    specs = root / "specs"
+    docs: dict[str, dict[str, Path]] = {}
+    if not specs.is_dir():
+        return docs
+    for entry in sorted(specs.iterdir()):
+        if entry.is_dir() and FEATURE_DIR_RE.match(entry.name):
+            docs[entry.name] = {kind: entry / f"{kind}.md" for kind in DOCS if (entry / f"{kind}.md").is_file()}
+    return docs
+
+
+def _delete_feature(conn: sqlite3.Connection, feature: str) -> None:
+    for table in ("requirements", "stories", "tasks", "task_files", "coverage"):
+        conn.execute(f"DELETE FROM {table} WHERE feature = ?", (feature,))
+
+
+def _index_feature(conn: sqlite3.Connection, feature: str, texts: dict[str, str]) -> None:
+    _delete_feature(conn, feature)
+    spec = parse_spec_text(texts.get("spec", ""))
+    tasks = parse_tasks_text(texts.get("tasks", ""))
+    # Duplicated IDs keep their first occurrence, like analyze does
+    conn.executemany(
+        "INSERT OR IGNORE INTO requirements VALUES (?, ?, ?, ?, ?, ?)",
+        [(feature, r.id, r.kind, r.text, r.line, _hash(r.text.encode("utf-8"))[:16]) for r in spec.requirements],
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO stories VALUES (?, ?, ?, ?, ?)",
+        [(feature, s.id, s.title, s.priority, s.line) for s in spec.stories],
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO tasks VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            (feature, t.id, t.description, t.story, t.phase, int(t.done), t.line,
+             int(any(_is_test(f) for f in t.files) or bool(_TEST_WORD_RE.search(t.description))))
+            for t in tasks
+        ],
+    )
+    conn.executemany(
+        "INSERT INTO task_files VALUES (?, ?, ?, ?)",
+        [(feature, t.id, f, int(_is_test(f))) for t in tasks for f in t.files],
+    )
+    conn.executemany(
+        "INSERT INTO coverage VALUES (?, ?, ?, ?)",
+        [(feature, c.requirement, task, c.match) for c in compute_coverage(spec, tasks) for task in c.tasks],
+    )
+
+
+def update_index(conn: sqlite3.Connection, root: Path) -> UpdateStats:
+    """Привести индекс в соответствие с specs/, перечитав только изменившиеся фичи."""
+    stats = UpdateStats()
+    known = {row["path"]: row for row in conn.execute("SELECT * FROM files")}
+    known_paths: dict[str, set[str]] = {}
+    for rel, row in known.items():
+        known_paths.setdefault(row["feature"], set()).add(rel)
+    current = _feature_docs(root)
+    stats.features = len(current)
+
+    with conn:
+        for feature in set(known_paths) - set(current):
+            _delete_feature(conn, feature)
+            conn.execute("DELETE FROM files WHERE feature = ?", (feature,))
+            stats.removed += 1
+
+        for feature, docs in current.items():
+            changed = False
+            contents: dict[str, bytes] = {}
+            seen: set[str] = set()
+            for kind, path in docs.items():
+                rel = path.relative_to(root).as_posix()
+                seen.add(rel)
+                st = path.stat()
+                row = known.get(rel)
+                if row and row["mtime_ns"] == st.st_mtime_ns and row["size"] == st.st_size:
+                    stats.unchanged += 1
+                    continue
+                data = path.read_bytes()
+                contents[kind] = data
+                digest = _hash(data)
+                conn.execute(
+                    "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                    (rel, feature, kind, st.st_mtime_ns, st.st_size, digest),
+                )
+                if row and row["hash"] == digest:
+                    stats.unchanged += 1
+                else:
+                    changed = True
+            for rel in known_paths.get(feature, set()) - seen:
+                conn.execute("DELETE FROM files WHERE path = ?", (rel,))
+                stats.removed += 1
+                changed = True
+            if not changed:
+                continue
+            # Coverage links spec and tasks, so a change to either re-indexes the whole feature
+            texts = {
+                kind: (contents[kind] if kind in contents else path.read_bytes()).decode("utf-8", errors="replace")
+                for kind, path in docs.items()
+            }
+            _index_feature(conn, feature, texts)
+            stats.parsed += 1
+    return stats
+
+
+def _feature_filter(feature: Optional[str], column: str = "feature") -> tuple[str, tuple]:
+    if not feature:
+        return "", ()
+    return f" AND ({column} = ? OR {column} LIKE ?)", (feature, f"{feature}-%")
+
+
+def _task_rows(conn: sqlite3.Connection, feature: str, ids: list[str]) -> list[dict]:
+    tasks = []
+    for task_id in ids:
+        row = conn.execute("SELECT * FROM tasks WHERE feature = ? AND id = ?", (feature, task_id)).fetchone()
+        if row is None:
+            continue
+        files = [r["path"] for r in conn.execute("SELECT path FROM task_files WHERE feature = ? AND task = ?", (feature, task_id))]
+        tasks.append({
+            "id": row["id"],
+            "description": row["description"],
+            "story": row["story"],
+            "done": bool(row["done"]),
+            "test": bool(row["test"]),
+            "line": row["line"],
+            "files": files,
+        })
+    return tasks
+
+
+def _sorted_ids(ids) -> list[str]:
+    return sorted(set(ids), key=lambda i: (re.sub(r"\d+", "", i), int(re.sub(r"\D", "", i) or 0)))
+
+
+def lookup(conn: sqlite3.Connection, ident: str, *, feature: Optional[str] = None) -> list[dict]:
+    """Найти требование (FR/NFR/SC-###), историю (US#), задачу (T###) или файл во всех фичах."""
+    key = ident.strip()
+    upper = key.upper()
+    where, params = _feature_filter(feature)
+    results: list[dict] = []
+
+    if _REQUIREMENT_ID_RE.match(upper):
+        for row in conn.execute(f"SELECT * FROM requirements WHERE id = ?{where} ORDER BY feature", (upper, *params)).fetchall():
+            links = conn.execute(
+                "SELECT task, match FROM coverage WHERE feature = ? AND requirement = ?", (row["feature"], upper)
+            ).fetchall()
+            match = {r["task"]: r["match"] for r in links}
+            tasks = _task_rows(conn, row["feature"], _sorted_ids(match))
+            for task in tasks:
+                task["match"] = match[task["id"]]
+            results.append({
+                "type": "requirement",
+                "feature": row["feature"],
+                "id": row["id"],
+                "text": row["text"],
+                "location": f"specs/{row['feature']}/spec.md:{row['line']}",
+                "tasks": tasks,
+                "tests": [t["id"] for t in tasks if t["test"]],
+                "files": sorted({f for t in tasks for f in t["files"]}),
+            })
+    elif _STORY_ID_RE.match(upper):
+        for row in conn.execute(f"SELECT * FROM stories WHERE id = ?{where} ORDER BY feature", (upper, *params)).fetchall():
+            ids = [r["id"] for r in conn.execute("SELECT id FROM tasks WHERE feature = ? AND story = ?", (row["feature"], upper))]
+            tasks = _task_rows(conn, row["feature"], _sorted_ids(ids))
+            requirements = [
+                r["requirement"] for r in conn.execute(
+                    f"SELECT DISTINCT requirement FROM coverage WHERE feature = ? AND task IN ({','.join('?' * len(ids))})",
+                    (row["feature"], *ids),
+                )
+            ] if ids else []
+            results.append({
+                "type": "story",
+                "feature": row["feature"],
+                "id": row["id"],
+                "title": row["title"],
+                "priority": row["priority"],
+                "location": f"specs/{row['feature']}/spec.md:{row['line']}",
+                "tasks": tasks,
+                "requirements": _sorted_ids(requirements),
+                "files": sorted({f for t in tasks for f in t["files"]}),
+            })
+    elif _TASK_ID_RE.match(upper):
+        for row in conn.execute(f"SELECT feature FROM tasks WHERE id = ?{where} ORDER BY feature", (upper, *params)).fetchall():
+            task = _task_rows(conn, row["feature"], [upper])[0]
+            match = {
+                r["requirement"]: r["match"]
+                for r in conn.execute("SELECT requirement, match FROM coverage WHERE feature = ? AND task = ?", (row["feature"], upper))
+            }
+            results.append({
+                "type": "task",
+                "feature": row["feature"],
+                **task,
+                "location": f"specs/{row['feature']}/tasks.md:{task['line']}",
+                "requirements": [{"id": rid, "match": match[rid]} for rid in _sorted_ids(match)],
+            })
+    else:
+        path = key.removeprefix("./")
+        rows = conn.execute(
+            f"SELECT DISTINCT feature, task FROM task_files WHERE (path = ? OR path LIKE ?){where} ORDER BY feature, task",
+            (path, f"%/{path}", *params),
+        ).fetchall()
+        by_feature: dict[str, list[str]] = {}
+        for r in rows:
+            by_feature.setdefault(r["feature"], []).append(r["task"])
+        for feat, ids in by_feature.items():
+            requirements = [
+                r["requirement"] for r in conn.execute(
+                    f"SELECT DISTINCT requirement FROM coverage WHERE feature = ? AND task IN ({','.join('?' * len(ids))})",
+                    (feat, *ids),
+                )
+            ]
+            results.append({
+                "type": "path",
+                "feature": feat,
+                "id": path,
+                "tasks": _task_rows(conn, feat, _sorted_ids(ids)),
+                "requirements": _sorted_ids(requirements),
+            })
+    return results
+
+
+def _git(root: Path, *args: str, input: Optional[bytes] = None) -> bytes:
+    try:
+        result = subprocess.run(["git", *args], cwd=root, input=input, capture_output=True, check=True)
+    except FileNotFoundError as e:
+        raise TraceError("git не найден") from e
+    except subprocess.CalledProcessError as e:
+        raise TraceError(e.stderr.decode("utf-8", errors="replace").strip() or f"git {' '.join(args)}: код {e.returncode}") from e
+    return result.stdout
+
+
+def latest_tag(root: Path) -> str:
+    """Последний тег, достижимый из HEAD, — «прошлый релиз»."""
+    return _git(root, "describe", "--tags", "--abbrev=0").decode().strip()
+
+
+def _snapshot(conn: sqlite3.Connection, root: Path, commit: str) -> dict[tuple[str, str], tuple[str, str]]:
+    """Требования всех фич на коммите: (фича, ID) -> (хэш, текст); разбирается один раз на коммит."""
+    if conn.execute("SELECT 1 FROM snapshot_commits WHERE commit_sha = ?", (commit,)).fetchone() is None:
+        names = _git(root, "ls-tree", "-r", "--name-only", commit, "--", "specs").decode("utf-8").splitlines()
+        specs = [n for n in names if (parts := n.split("/")) and len(parts) == 3 and FEATURE_DIR_RE.match(parts[1]) and parts[2] == "spec.md"]
+        rows = []
+        if specs:
+            # One git process for all blobs instead of a `git show` per feature
+            out = _git(root, "cat-file", "--batch", input="".join(f"{commit}:{n}\n" for n in specs).encode("utf-8"))
+            pos = 0
+            for name in specs:
+                header_end = out.index(b"\n", pos)
+                size = int(out[pos:header_end].split()[2])
+                text = out[header_end + 1:header_end + 1 + size].decode("utf-8", errors="replace")
+                pos = header_end + 1 + size + 1
+                feature = name.split("/")[1]
+                seen: set[str] = set()
+                for r in parse_spec_text(text).requirements:
+                    if r.id not in seen:
+                        seen.add(r.id)
+                        rows.append((commit, feature, r.id, _hash(r.text.encode("utf-8"))[:16], r.text))
+        with conn:
+            conn.executemany("INSERT INTO snapshots VALUES (?, ?, ?, ?, ?)", rows)
+            conn.execute("INSERT INTO snapshot_commits VALUES (?)", (commit,))
+    return {
+        (r["feature"], r["id"]): (r["hash"], r["text"])
+        for r in conn.execute("SELECT feature, id, hash, text FROM snapshots WHERE commit_sha = ?", (commit,))
+    }
+
+
+def changed_requirements(conn: sqlite3.Connection, root: Path, ref: str, *, feature: Optional[str] = None) -> list[dict]:
+    """Требования, добавленные, изменённые или удалённые относительно ref (тега, ветки, коммита)."""
+    commit = _git(root, "rev-parse", "--verify", f"{ref}^{{commit}}").decode().strip()
+    before = _snapshot(conn, root, commit)
+    where, params = _feature_filter(feature)
+    now = {
+        (r["feature"], r["id"]): (r["hash"], r["text"])
+        for r in conn.execute(f"SELECT feature, id, hash, text FROM requirements WHERE 1 = 1{where}", params)
+    }
+    if feature:
+        before = {k: v for k, v in before.items() if k[0] == feature or k[0].startswith(f"{feature}-")}
+
+    changes = []
+    for key in sorted(set(before) | set(now), key=lambda k: (k[0], _sorted_ids([k[1]]))):
+        old, new = before.get(key), now.get(key)
+        if old and new and old[0] == new[0]:
+            continue
+        status = "added" if old is None else "removed" if new is None else "changed"
+        changes.append({
+            "feature": key[0],
+            "id": key[1],
+            "status": status,
+            "text": (new or old)[1],
+            "previous": old[1] if status == "changed" else None,
+        })
+    return changes
@@ -0,0 +1,253 @@
+"""
+Проверка целостности установленного шаблона (`specify-ru verify`).
+
+init записывает .specify/manifest.json: sha256, размер и ожидаемый бит
+исполнения каждого файла из .specify/scripts/, .specify/templates/ и файлов
+команд агентов. verify сверяет с ним файлы проекта и сообщает об
+отсутствующих, изменённых и лишних файлах, а также о скриптах без права на
+выполнение (то, что должен гарантировать make_scripts_executable).
+
+Хэши считаются в пуле потоков. Файлы, у которых размер и mtime совпадают с
+прошлой проверкой, не читаются: хэш берётся из .specify/cache/verify.json.
+Записи моложе двух секунд в кэш не попадают — их mtime ещё может не
+отличаться от mtime следующей правки.
+
+--repair восстанавливает только повреждённые файлы: из слоёв шаблона в
+пользовательском кэше (по sha256 из манифеста) или, для файлов команд,
+повторным рендерингом из .specify/templates/commands.
+"""
+
+import hashlib
+import json
+import os
+import stat
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from . import _layer_cache_dir
+from .agents import COMMAND_FORMATS, AgentsError, command_files
+from .api import COMMAND_FILE_PREFIX, MANIFEST_PREFIXES, MANIFEST_RELATIVE_PATH, ExtractError, read_archives, read_manifest
+from .fsutil import CACHE_DIR, atomic_write_text, new_file_mode, project_cache_dir, read_json
+
+CACHE_RELATIVE_PATH = CACHE_DIR / "verify.json"
+CACHE_VERSION = 1
+_RACY_WINDOW_NS = 2_000_000_000
+_STATUS_ORDER = ("missing", "modified", "mode", "extra")
+
+
+class VerifyError(Exception):
+    """Проверка невозможна (например, в проекте нет манифеста)."""
+
+
+@dataclass
+class FileIssue:
+    path: str
+    status: str  # missing | modified | mode | extra
+
+    def as_dict(self) -> dict:
+        return {"path": self.path, "status": self.status}
+
+
+@dataclass
+class VerifyReport:
+    root: Path
+    checked: int = 0
+    hashed: int = 0  # files actually read (the rest came from the cache)
+    issues: list[FileIssue] = field(default_factory=list)
+    repaired: list[str] = field(default_factory=list)
+    unrepaired: list[str] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    def count(self, status: str) -> int:
+        return sum(1 for i in self.issues if i.status == status)
+
+    def as_dict(self) -> dict:
+        return {
+            "root": str(self.root),
+            "checked": self.checked,
+            "hashed": self.hashed,
+            "ok": not self.issues,
+            "summary": {status: self.count(status) for status in _STATUS_ORDER},
+            "issues": [i.as_dict() for i in self.issues],
+            "repaired": self.repaired,
+            "unrepaired": self.unrepaired,
+            "elapsed": round(self.elapsed, 3),
+        }
+
+
+def _hash_file(path: Path) -> Optional[str]:
+    h = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                h.update(chunk)
+    except OSError:
+        return None
+    return h.hexdigest()
+
+
+def _extra_files(root: Path, known: dict) -> list[str]:
+    """Файлы в каталогах шаблона, которых нет в манифесте (в каталогах агентов — только speckit.*)."""
+    extra: list[str] = []
+    for prefix in MANIFEST_PREFIXES:
+        for dirpath, _, filenames in os.walk(root / prefix):
+            base = Path(dirpath).relative_to(root).as_posix()
+            extra += [f"{base}/{name}" for name in filenames if f"{base}/{name}" not in known]
+    command_dirs = {rel.rsplit("/", 1)[0] for rel in known if "/" in rel and not rel.startswith(MANIFEST_PREFIXES)}
+    for directory in command_dirs:
+        try:
+            names = os.listdir(root / directory)
+        except OSError:
+            continue
+        extra += [f"{directory}/{name}" for name in names if name.startswith(COMMAND_FILE_PREFIX) and f"{directory}/{name}" not in known]
+    return extra
+
+
+def verify_project(root: Path, *, jobs: Optional[int] = None, use_cache: bool = True) -> VerifyReport:
+    """Сверить файлы проекта с .specify/manifest.json."""
+    started = time.perf_counter()
+    root = Path(root).resolve()
+    manifest = read_manifest(root)
+    if manifest is None:
+        raise VerifyError(
+            f"В {root} нет {MANIFEST_RELATIVE_PATH.as_posix()}: манифест создаёт specify-ru init, "
+            "переустановите шаблон командой specify-ru init --here --force"
+        )
+    report = VerifyReport(root=root)
+    expected: dict = manifest["files"]
+
+    cache_path = root / CACHE_RELATIVE_PATH
+    cache = read_json(cache_path) if use_cache else None
+    if not isinstance(cache, dict) or cache.get("version") != CACHE_VERSION:
+        cache = {"version": CACHE_VERSION, "files": {}}
+    old: dict = cache["files"]
+    new: dict = {}
+
+    digests: dict[str, Optional[str]] = {}
+    pending: list[tuple[str, os.stat_result]] = []
+    issues: dict[str, str] = {}
+    for rel, entry in expected.items():
+        report.checked += 1
+        try:
+            st = os.stat(root / rel)
+        except OSError:
+            issues[rel] = "missing"
+            continue
+        if not stat.S_ISREG(st.st_mode) or st.st_size != entry["size"]:
+            issues[rel] = "modified"
+            continue
+        cached = old.get(rel)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            digests[rel] = cached[2]
+            new[rel] = cached
+        else:
+            pending.append((rel, st))
+        if entry.get("exec") and not st.st_mode & stat.S_IXUSR:
+            issues[rel] = "mode"
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=jobs or min(32, (os.cpu_count() or 1) + 4)) as pool:
+            for (rel, st), digest in zip(pending, pool.map(lambda item: _hash_file(root / item[0]), pending)):
+                digests[rel] = digest
+                report.hashed += 1
+                if digest and time.time_ns() - st.st_mtime_ns > _RACY_WINDOW_NS:
+                    new[rel] = [st.st_size, st.st_mtime_ns, digest]
+
+    for rel, digest in digests.items():
+        if digest != expected[rel]["sha256"]:
+            # Content drift matters more than a missing exec bit
+            issues[rel] = "modified"
+    for rel in _extra_files(root, expected):
+        issues[rel] = "extra"
+
+    report.issues = sorted(
+        (FileIssue(rel, status) for rel, status in issues.items()),
+        key=lambda i: (_STATUS_ORDER.index(i.status), i.path),
+    )
+    if use_cache and new != old and (root / ".specify").is_dir():
+        project_cache_dir(root)
+        atomic_write_text(cache_path, json.dumps({"version": CACHE_VERSION, "files": new}, separators=(",", ":")))
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+def _write_file(path: Path, data: bytes, executable: bool) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp_name, new_file_mode(executable))
+        os.replace(tmp_name, path)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+
+
+def _rendered_commands(root: Path, rel: str, rendered: dict) -> dict[str, str]:
+    directory = rel.rsplit("/", 1)[0]
+    agent = next((key for key, fmt in COMMAND_FORMATS.items() if fmt.directory == directory), None)
+    if agent is None:
+        return {}
+    if agent not in rendered:
+        try:
+            rendered[agent] = command_files(root, agent)
+        except (AgentsError, OSError):
+            rendered[agent] = {}
+    return rendered[agent]
+
+
+def repair_project(report: VerifyReport, *, cache_dir: Optional[Path] = None) -> None:
+    """Восстановить отсутствующие и изменённые файлы и вернуть бит исполнения скриптам.
+
+    Лишние файлы не удаляются. Результат дописывается в report.repaired / report.unrepaired.
+    """
+    root = report.root
+    expected = read_manifest(root)
+    if expected is None:
+        return
+    files: dict = expected["files"]
+    broken = [i.path for i in report.issues if i.status in ("missing", "modified")]
+
+    for rel in (i.path for i in report.issues if i.status == "mode"):
+        try:
+            path = root / rel
+            mode = path.stat().st_mode
+            os.chmod(path, mode | ((mode & 0o444) >> 2) | stat.S_IXUSR)
+            report.repaired.append(rel)
+        except OSError:
+            report.unrepaired.append(rel)
+
+    archived: dict[str, bytes] = {}
+    cache = Path(cache_dir) if cache_dir else _layer_cache_dir()
+    layers = [cache / f"{digest}.zip" for digest in expected.get("sources") or []]
+    if broken and layers and all(p.is_file() for p in layers):
+        try:
+            archived, _ = read_archives(layers)
+        except ExtractError:
+            archived = {}
+
+    # Template files first: command files are re-rendered from .specify/templates/commands
+    rendered: dict[str, dict[str, str]] = {}
+    for rel in sorted(broken, key=lambda r: (not r.startswith(MANIFEST_PREFIXES), r)):
+        entry = files[rel]
+        data = archived.get(rel)
+        if data is None or hashlib.sha256(data).hexdigest() != entry["sha256"]:
+            text = _rendered_commands(root, rel, rendered).get(rel)
+            data = text.encode("utf-8") if text is not None else None
+        if data is None or hashlib.sha256(data).hexdigest() != entry["sha256"]:
+            report.unrepaired.append(rel)
+            continue
+        try:
+            _write_file(root / rel, data, entry.get("exec", False))
+        except OSError:
+            report.unrepaired.append(rel)
+            continue
+        report.repaired.append(rel)
+        if rel.startswith(".specify/templates/commands/"):
+            rendered.clear()
@@ -0,0 +1,392 @@
+"""
+Наблюдение за артефактами и инкрементальная перегенерация (`specify-ru watch`).
+
+На Linux изменения отслеживаются через inotify (libc через ctypes, без
+дополнительных зависимостей): процесс спит в select() на дескрипторе
+inotify и не расходует CPU, пока файлы не меняются. На других платформах,
+а также если inotify недоступен или исчерпан лимит max_user_watches,
+используется опрос mtime с заданным интервалом.
+
+Наблюдаются specs/ (рекурсивно, включая plan.md фич) и .specify/memory/.
+Серия правок (сохранение редактором, git checkout) схлопывается в одну
+пачку: обработка начинается, когда события стихают на debounce секунд.
+По пачке перегенерируется только затронутое:
+
+- появление или удаление каталогов фич — индекс .specify/cache/index.json;
+- документы фичи — индекс трассировки, lint изменившихся файлов и сводка
+  analyze этой фичи;
+- plan.md текущей фичи — контекстные файлы агентов (как update-context);
+- .specify/memory/ — только событие: context pack сравнивает хэши разделов
+  и сам включит изменённую конституцию в следующий дайджест.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+from .agent_context import AgentContextError, update_agent_contexts
+from .analyze import analyze_feature
+from .feature import get_feature_paths
+from .feature_index import load_index
+from .lint import collect_files, lint_repo
+from .trace import open_index, update_index
+
+DEFAULT_DEBOUNCE = 0.3
+DEFAULT_INTERVAL = 1.0
+# A steady stream of events must not postpone regeneration forever
+MAX_DELAY_FACTOR = 10
+
+MEMORY_RELATIVE_PATH = Path(".specify") / "memory"
+ANALYZED_DOCS = ("spec.md", "plan.md", "tasks.md")
+
+# <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+IN_NONBLOCK = 0o4000
+
+_TREE_MASK = (
+    IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+)
+# The repository root is watched only to notice specs/ or .specify/ appearing
+_ROOT_MASK = IN_CREATE | IN_MOVED_TO | IN_ONLYDIR
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class WatchError(Exception):
+    """Наблюдение не может быть запущено этим способом."""
+
+
+def watched_roots(repo_root: Path) -> list[Path]:
+    return [repo_root / "specs", repo_root / MEMORY_RELATIVE_PATH]
+
+
+class InotifyWatcher:
+    """Рекурсивное наблюдение через inotify; wait() блокируется в select()."""
+
+    backend = "inotify"
+
+    def __init__(self, repo_root: Path):
+        if not sys.platform.startswith("linux"):
+            raise WatchError("inotify доступен только в Linux")
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise WatchError("libc без inotify")
+        self._libc = libc
+        self._libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.repo_root = repo_root
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise WatchError(f"inotify_init1: {os.strerror(ctypes.get_errno())}")
+        self._dirs: dict[int, Path] = {}
+        self._buffer = b""
+        try:
+            self._add(repo_root, _ROOT_MASK)
+            for root in watched_roots(repo_root):
+                self._add_tree(root)
+        except WatchError:
+            self.close()
+            raise
+
+    def _add(self, path: Path, mask: int) -> None:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd >= 0:
+            self._dirs[wd] = path
+            return
+        err = ctypes.get_errno()
+        if err == errno.ENOSPC:
+            raise WatchError("исчерпан лимит fs.inotify.max_user_watches")
+        # ENOENT / ENOTDIR: the directory vanished before we got to it
+
+    def _add_tree(self, root: Path) -> list[Path]:
+        """Поставить наблюдение на каталог и все его подкаталоги; вернуть найденные файлы."""
+        files: list[Path] = []
+        if not root.is_dir():
+            return files
+        stack = [root]
+        while stack:
+            path = stack.pop()
+            self._add(path, _TREE_MASK)
+            try:
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(Path(entry.path))
+                        else:
+                            files.append(Path(entry.path))
+            except OSError:
+                continue
+        return files
+
+    def _read(self) -> set[Path]:
+        changed: set[Path] = set()
+        while True:
+            try:
+                chunk = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not chunk:
+                break
+            self._buffer += chunk
+        data, offset = self._buffer, 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            end = offset + _EVENT_HEADER.size + length
+            if end > len(data):
+                break
+            name = data[offset + _EVENT_HEADER.size:end].rstrip(b"\0")
+            offset = end
+
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped: treat every watched tree as changed
+                changed.update(watched_roots(self.repo_root))
+                continue
+            base = self._dirs.get(wd)
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            if base is None:
+                continue
+            path = base / os.fsdecode(name) if name else base
+            if base == self.repo_root:
+                if path in watched_roots(self.repo_root) or path == self.repo_root / ".specify":
+                    for root in watched_roots(self.repo_root):
+                        changed.add(root)
+                        changed.update(self._add_tree(root))
+                continue
+            changed.add(path)
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                # Files may land in a new directory before its watch exists
+                changed.update(self._add_tree(path))
+        self._buffer = data[offset:]
+        return changed
+
+    def wait(self, timeout: Optional[float]) -> set[Path]:
+        """Дождаться событий (None — без ограничения) и вернуть изменившиеся пути."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        return self._read() if ready else set()
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class PollingWatcher:
+    """Запасной вариант: сравнение mtime/размера файлов раз в interval секунд."""
+
+    backend = "poll"
+
+    def __init__(self, repo_root: Path, interval: float = DEFAULT_INTERVAL):
+        self.repo_root = repo_root
+        self.interval = interval
+        self._state = self._snapshot()
+
+    def _snapshot(self) -> dict[Path, tuple[int, int]]:
+        state: dict[Path, tuple[int, int]] = {}
+        for root in watched_roots(self.repo_root):
+            stack = [root]
+            while stack:
+                path = stack.pop()
+                try:
+                    with os.scandir(path) as entries:
+                        for entry in entries:
+                            try:
+                                st = entry.stat(follow_symlinks=False)
+                            except OSError:
+                                continue
+                            state[Path(entry.path)] = (st.st_mtime_ns, st.st_size)
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(Path(entry.path))
+                except OSError:
+                    continue
+        return state
+
+    def wait(self, timeout: Optional[float]) -> set[Path]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            delay = self.interval if deadline is None else min(self.interval, max(0.0, deadline - time.monotonic()))
+            time.sleep(delay)
+            state = self._snapshot()
+            changed = {p for p in state.keys() | self._state.keys() if state.get(p) != self._state.get(p)}
+            self._state = state
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    def close(self) -> None:
+        pass
+
+
+def open_watcher(repo_root: Path, *, poll: bool = False, interval: float = DEFAULT_INTERVAL):
+    """inotify, если доступен; иначе — опрос. Возвращает (наблюдатель, причина отката или None)."""
+    if not poll:
+        try:
+            return InotifyWatcher(repo_root), None
+        except (WatchError, OSError) as e:
+            return PollingWatcher(repo_root, interval), str(e)
+    return PollingWatcher(repo_root, interval), None
+
+
+@dataclass
+class ChangeSet:
+    """Пачка изменений, разобранная по затронутым результатам."""
+
+    index: bool = False  # feature directories appeared or disappeared
+    memory: list[str] = field(default_factory=list)
+    features: dict[str, set[Path]] = field(default_factory=dict)
+
+    def __bool__(self) -> bool:
+        return self.index or bool(self.memory) or bool(self.features)
+
+
+def classify(repo_root: Path, paths: Iterable[Path]) -> ChangeSet:
+    specs = repo_root / "specs"
+    memory = repo_root / MEMORY_RELATIVE_PATH
+    changes = ChangeSet()
+    for path in paths:
+        if path == memory or memory in path.parents:
+            changes.memory.append(path.relative_to(repo_root).as_posix())
+            continue
+        try:
+            parts = path.relative_to(specs).parts
+        except ValueError:
+            continue
+        if len(parts) <= 1:
+            # specs/ itself or a feature directory: the set of features may differ
+            changes.index = True
+            if parts:
+                changes.features.setdefault(parts[0], set())
+            continue
+        if parts[-1].endswith(".md"):
+            changes.features.setdefault(parts[0], set()).add(path)
+    changes.memory.sort()
+    return changes
+
+
+class Regenerator:
+    """Перегенерация результатов по ChangeSet; каждое действие сообщается через emit."""
+
+    def __init__(self, repo_root: Path, emit: Callable[[dict], None], *, agent: Optional[str] = None):
+        self.repo_root = repo_root
+        self.emit = emit
+        self.agent = agent
+        self._trace = None
+
+    def close(self) -> None:
+        if self._trace is not None:
+            self._trace.close()
+            self._trace = None
+
+    def _run(self, action: str, func: Callable[[], dict], **fields) -> None:
+        started = time.perf_counter()
+        try:
+            payload = {"status": "ok", **func()}
+        except (OSError, AgentContextError, ValueError) as e:
+            payload = {"status": "error", "error": str(e)}
+        self.emit({"action": action, **fields, **payload, "elapsed": round(time.perf_counter() - started, 4)})
+
+    def apply(self, changes: ChangeSet) -> None:
+        if changes.index:
+            self._run("index", self._refresh_index)
+        if changes.features:
+            self._run("trace", self._refresh_trace)
+        for feature, files in sorted(changes.features.items()):
+            feature_dir = self.repo_root / "specs" / feature
+            if not feature_dir.is_dir():
+                continue
+            # An empty list would make collect_files fall back to the whole specs/ tree
+            lint_targets = collect_files(self.repo_root, files) if files else []
+            if lint_targets:
+                self._run("lint", lambda: self._lint(lint_targets), feature=feature)
+            if files and all((feature_dir / name).is_file() for name in ANALYZED_DOCS):
+                self._run("summary", lambda: self._summary(feature_dir), feature=feature)
+
+        paths = get_feature_paths(self.repo_root)
+        touched = changes.features.get(paths.current_branch, set())
+        if paths.impl_plan in touched and paths.impl_plan.is_file():
+            self._run("context", lambda: self._context(paths), feature=paths.current_branch)
+        if changes.memory:
+            self.emit({"action": "memory", "status": "ok", "files": changes.memory})
+
+    def _refresh_index(self) -> dict:
+        index = load_index(self.repo_root)
+        return {"features": len(index.entries)}
+
+    def _refresh_trace(self) -> dict:
+        if self._trace is None:
+            self._trace = open_index(self.repo_root)
+        return update_index(self._trace, self.repo_root).as_dict()
+
+    def _lint(self, files: list[Path]) -> dict:
+        report = lint_repo(self.repo_root, files, jobs=1)
+        return {
+            "files": report.files,
+            "errors": report.errors,
+            "warnings": report.warnings,
+            "issues": [i.as_dict() for i in report.issues],
+        }
+
+    def _summary(self, feature_dir: Path) -> dict:
+        return {"metrics": analyze_feature(feature_dir, self.repo_root).metrics}
+
+    def _context(self, paths) -> dict:
+        _, results = update_agent_contexts(paths, self.agent)
+        files = [
+            {"path": r.path.relative_to(self.repo_root).as_posix(), "status": r.status, **({"error": r.error} if r.error else {})}
+            for r in results
+        ]
+        return {"status": "error" if any(r.status == "error" for r in results) else "ok", "files": files}
+
+
+def watch(
+    repo_root: Path,
+    emit: Callable[[dict], None],
+    *,
+    poll: bool = False,
+    interval: float = DEFAULT_INTERVAL,
+    debounce: float = DEFAULT_DEBOUNCE,
+    agent: Optional[str] = None,
+    on_start: Optional[Callable[[str, Optional[str]], None]] = None,
+) -> None:
+    """Наблюдать за проектом до KeyboardInterrupt, перегенерируя затронутое по каждой пачке."""
+    repo_root = Path(repo_root).resolve()
+    watcher, fallback = open_watcher(repo_root, poll=poll, interval=interval)
+    regenerator = Regenerator(repo_root, emit, agent=agent)
+    if on_start:
+        on_start(watcher.backend, fallback)
+    try:
+        while True:
+            pending = watcher.wait(None)
+            if not pending:
+                continue
+            # Collect the rest of the burst: stop once it has been quiet for `debounce`
+            deadline = time.monotonic() + debounce * MAX_DELAY_FACTOR
+            while time.monotonic() < deadline:
+                more = watcher.wait(debounce)
+                if not more:
+                    break
+                pending |= more
+            changes = classify(repo_root, pending)
+            if changes:
+                regenerator.apply(changes)
+    finally:
+        regenerator.close()
+        watcher.close()